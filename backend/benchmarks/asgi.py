@@ -0,0 +1,81 @@
+"""A minimal ASGI client for benchmarks.
+
+Calls the app directly with a hand built scope, so a benchmark
+measures the server's own cost rather than an HTTP client's.
+"""
+
+import orjson
+
+
+async def request(
+    app, method, path, body=None, query=b"", headers=()
+):
+    """Sends one HTTP request to an ASGI app
+
+    Args:
+        app: the ASGI app
+        method (str): HTTP method
+        path (str): request path
+        body (optional): JSON body
+        query (bytes, optional): query string
+        headers (optional): extra (name, value) header pairs
+
+    Returns:
+        tuple: the status code and the response body
+    """
+    body = b"" if body is None else orjson.dumps(body)
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": query,
+        "headers": [
+            (b"content-type", b"application/json"),
+            *headers,
+        ],
+        "client": ("127.0.0.1", 1),
+        "server": ("bench", 80),
+    }
+    status = None
+    chunks = []
+
+    async def receive():
+        return {"type": "http.request", "body": body}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return status, b"".join(chunks)
+
+
+async def play(app, games):
+    """Plays games through /start, /hit, /state and /stick
+
+    Returns:
+        int: the requests made; a game that busts on its hit is not
+            stuck
+    """
+    requests = 0
+    for _ in range(games):
+        _, body = await request(app, "POST", "/start")
+        game_id = orjson.loads(body)["game_id"]
+        ids = {"game_id": game_id}
+        _, body = await request(app, "POST", "/hit", ids)
+        await request(
+            app, "GET", "/state", query=f"game_id={game_id}".encode()
+        )
+        if not orjson.loads(body)["game_state"]["game_over"]:
+            await request(app, "POST", "/stick", ids)
+            requests += 1
+        requests += 3
+    return requests
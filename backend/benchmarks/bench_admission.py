@@ -0,0 +1,168 @@
+"""API latency at twice capacity, with and without admission control.
+
+First measures the app's capacity by playing games back to back,
+then offers it twice that many requests a second, arriving at random
+(open loop, so arrivals do not wait for answers) for SECONDS. A third
+of the requests start games, the rest hit or stick in them.
+Latency is timed from each request's arrival, so time spent queued
+on the event loop counts.
+
+Without admission control the queue grows for as long as the
+overload lasts and so does latency. With it, requests the app
+cannot answer within the target are refused with a fast 503 and
+the latency of those served stays near the target.
+
+Run from the backend directory:
+
+    PYTHONPATH=. python benchmarks/bench_admission.py \\
+        [seconds] [target ms]
+"""
+
+import asyncio
+import os
+import sys
+import time
+from random import Random
+
+os.environ.setdefault("DECK_POOL_DEPTH", "0")
+
+import orjson  # noqa: E402
+
+import src.pontoon as pontoon  # noqa: E402
+from benchmarks.asgi import play, request  # noqa: E402
+from benchmarks.loadgen import percentile  # noqa: E402
+from src.admission import Admission  # noqa: E402
+from src.admission import AdmissionMiddleware  # noqa: E402
+from src.store import MemoryGameStore  # noqa: E402
+
+OVERLOAD = 2
+
+
+async def capacity(app, seconds=2.0) -> float:
+    """Requests a second served one after another"""
+    requests = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        requests += await play(app, 10)
+    return requests / (time.perf_counter() - start)
+
+
+class Run:
+    """Latencies by status for one run, and the games in play"""
+
+    def __init__(self, app, seed=1) -> None:
+        self.app = app
+        self.rng = Random(seed)
+        self.latencies = {}
+        self.ready = []
+        self.hit = set()
+
+    def next_request(self):
+        """Picks a request: a start, or a hit or stick in a game"""
+        if not self.ready or self.rng.random() < 1 / 3:
+            return "/start", None
+        index = self.rng.randrange(len(self.ready))
+        self.ready[index], self.ready[-1] = (
+            self.ready[-1],
+            self.ready[index],
+        )
+        game_id = self.ready.pop()
+        path = "/stick" if game_id in self.hit else "/hit"
+        return path, game_id
+
+    async def send(self, arrival, path, game_id):
+        body = None if game_id is None else {"game_id": game_id}
+        try:
+            status, content = await request(
+                self.app, "POST", path, body
+            )
+        except Exception:
+            status = 500
+        done = time.perf_counter()
+        self.latencies.setdefault(status, []).append(done - arrival)
+        if status != 200:
+            if game_id is not None:
+                self.ready.append(game_id)
+            return
+        data = orjson.loads(content)
+        if path == "/start":
+            self.ready.append(data["game_id"])
+        elif path == "/hit":
+            if data["game_state"]["game_over"]:
+                self.hit.discard(game_id)
+            else:
+                self.hit.add(game_id)
+                self.ready.append(game_id)
+        else:
+            self.hit.discard(game_id)
+
+    async def offer(self, rate, seconds) -> float:
+        """Sends Poisson arrivals at rate a second, then drains
+
+        Returns:
+            float: seconds until the last request was answered
+        """
+        tasks = set()
+        start = arrival = time.perf_counter()
+        end = arrival + seconds
+        while arrival < end:
+            now = time.perf_counter()
+            while arrival <= min(now, end):
+                task = asyncio.create_task(
+                    self.send(arrival, *self.next_request())
+                )
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                arrival += self.rng.expovariate(rate)
+            await asyncio.sleep(max(0.0, arrival - now))
+        await asyncio.gather(*tasks)
+        return time.perf_counter() - start
+
+
+def report(name, run, seconds, elapsed) -> None:
+    served = sorted(run.latencies.get(200, []))
+    shed = len(run.latencies.get(503, []))
+    every = sorted(
+        latency
+        for latencies in run.latencies.values()
+        for latency in latencies
+    )
+    print(
+        f"{name:12}{len(every) / seconds:>10,.0f}"
+        f"{len(served) / elapsed:>10,.0f}"
+        f"{shed / max(1, len(every)):>8.1%}"
+        f"{percentile(served, 0.5) * 1e3:>10.1f}"
+        f"{percentile(served, 0.99) * 1e3:>10.1f}"
+        f"{percentile(every, 0.99) * 1e3:>10.1f}"
+        f"{len(pontoon.games):>10,}"
+    )
+
+
+async def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    target = float(sys.argv[2]) / 1e3 if len(sys.argv) > 2 else 0.05
+    rate = await capacity(pontoon.app) * OVERLOAD
+    print(f"offering {rate:,.0f} requests/s ({OVERLOAD}x capacity)")
+    print(
+        f"{'':12}{'offered/s':>10}{'served/s':>10}{'shed':>8}"
+        f"{'p50 ms':>10}{'p99 ms':>10}{'p99 all':>10}"
+        f"{'games':>10}"
+    )
+    admission = Admission(target=target)
+    for name, app in (
+        ("no limits", pontoon.app),
+        ("admission", AdmissionMiddleware(pontoon.app, admission)),
+    ):
+        pontoon.games = MemoryGameStore()
+        run = Run(app)
+        elapsed = await run.offer(rate, seconds)
+        report(name, run, seconds, elapsed)
+    shed = {
+        labels[0][1]: value
+        for _, labels, value in admission.shed.samples()
+    }
+    print(f"shed by reason: {shed}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,73 @@
+"""Cost of the outcome analytics, on and off the request path.
+
+Times what a finished game costs the request (Analytics.submit, a
+queue append), what it costs the background thread (Outcomes.add)
+and a /stats snapshot after increasing numbers of games, which
+should not grow with them.
+
+Run from the backend directory:
+
+    PYTHONPATH=. python benchmarks/bench_analytics.py [games]
+"""
+
+import sys
+import time
+import timeit
+from random import Random
+
+from src.analytics import Analytics, Outcomes
+
+
+def results(count, seed=1):
+    rng = Random(seed)
+    return [
+        {
+            "player_value": rng.randint(12, 31),
+            "dealer_value": rng.randint(17, 26),
+            "status": rng.choice(("win", "loss", "tie")),
+        }
+        for _ in range(count)
+    ]
+
+
+def main():
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    batch = results(games)
+
+    analytics = Analytics(max_pending=games)
+    start = time.perf_counter()
+    for result in batch:
+        analytics.submit(result)
+    submitted = time.perf_counter() - start
+    analytics.flush()
+    counted = time.perf_counter() - start
+    analytics.close()
+    print(
+        f"submit, request path     {submitted / games * 1e6:8.2f} µs"
+    )
+    print(
+        f"submit to counted        {counted / games * 1e6:8.2f} µs"
+    )
+
+    outcomes = Outcomes()
+    now = time.time()
+    seconds = timeit.timeit(
+        lambda: outcomes.add(20, 18, "win", now), number=games
+    )
+    print(
+        f"Outcomes.add             {seconds / games * 1e6:8.2f} µs"
+    )
+
+    outcomes = Outcomes()
+    for count in (1_000, 10_000, 100_000):
+        while sum(outcomes.totals.values()) < count:
+            outcomes.add(20, 18, "win", now)
+        seconds = min(
+            timeit.repeat(outcomes.snapshot, number=100, repeat=5)
+        )
+        micros = seconds / 100 * 1e6
+        print(f"snapshot after {count:>7,} {micros:8.2f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""Load test: async handlers against the old threadpool handlers.
+
+Each simulated player starts a game, hits, sticks and reads the
+state, with CONCURRENCY players in flight at once. The store can be
+given an artificial latency to stand in for a database; the async
+app waits on it with asyncio.sleep, as an async driver would, while
+the threadpool app blocks one of its worker threads.
+
+Run from the backend directory:
+
+    PYTHONPATH=. python benchmarks/bench_api_concurrency.py \\
+        [concurrency] [store latency ms]
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+import uuid
+
+import httpx
+from fastapi import FastAPI, HTTPException
+
+import src.pontoon as pontoon
+from src.pontoon_logic import Pontoon
+from src.responses import GameJSONResponse, state_bytes
+from src.responses import state_fragment
+from src.store import MemoryGameStore
+
+
+class SlowStore(MemoryGameStore):
+    def __init__(self, latency):
+        super().__init__(ttl=None)
+        self.latency = latency
+
+    def get(self, game_id):
+        time.sleep(self.latency)
+        return super().get(game_id)
+
+    def put(self, game_id, game):
+        time.sleep(self.latency)
+        super().put(game_id, game)
+
+    async def aget(self, game_id):
+        await asyncio.sleep(self.latency)
+        return MemoryGameStore.get(self, game_id)
+
+    async def aput(self, game_id, game):
+        await asyncio.sleep(self.latency)
+        MemoryGameStore.put(self, game_id, game)
+
+
+def threadpool_app(games):
+    """The API as it was before the handlers went async"""
+    app = FastAPI(default_response_class=GameJSONResponse)
+
+    def load_game(game_id):
+        game = games.get(game_id)
+        if not game:
+            raise HTTPException(404, detail="Invalid game_id")
+        return game
+
+    @app.post("/start")
+    def start_game():
+        game_id = str(uuid.uuid4())
+        game = Pontoon()
+        game.start_game()
+        games.put(game_id, game)
+        return GameJSONResponse(
+            {"game_id": game_id, "game_state": state_fragment(game)}
+        )
+
+    @app.post("/hit")
+    def hit(game_id: pontoon.GameID):
+        game = load_game(game_id.game_id)
+        result = game.player_hit()
+        games.put(game_id.game_id, game)
+        return GameJSONResponse(
+            {"result": result, "game_state": state_fragment(game)}
+        )
+
+    @app.post("/stick")
+    def stick(game_id: pontoon.GameID):
+        game = load_game(game_id.game_id)
+        result = game.player_stick()
+        games.put(game_id.game_id, game)
+        return GameJSONResponse(
+            {"result": result, "game_state": state_fragment(game)}
+        )
+
+    @app.get("/state")
+    def state(game_id: str):
+        return GameJSONResponse(state_bytes(load_game(game_id)))
+
+    return app
+
+
+async def player(client, latencies):
+    async def timed(request):
+        start = time.perf_counter()
+        response = await request
+        latencies.append(time.perf_counter() - start)
+        response.raise_for_status()
+        return response
+
+    response = await timed(client.post("/start"))
+    game_id = response.json()["game_id"]
+    body = {"game_id": game_id}
+    response = await timed(client.post("/hit", json=body))
+    if not response.json()["game_state"]["game_over"]:
+        await timed(client.post("/stick", json=body))
+    await timed(client.get("/state", params=body))
+
+
+async def run(app, concurrency):
+    latencies = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+        start = time.perf_counter()
+        await asyncio.gather(
+            *[player(client, latencies) for _ in range(concurrency)]
+        )
+        elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1e3,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1e3,
+    }
+
+
+def main():
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    latency = (
+        float(sys.argv[2]) / 1e3 if len(sys.argv) > 2 else 0.002
+    )
+
+    apps = {
+        "threadpool": threadpool_app(SlowStore(latency)),
+        "async": pontoon.app,
+    }
+    pontoon.games = SlowStore(latency)
+
+    print(
+        f"{concurrency} concurrent games, store latency {latency}s"
+    )
+    print(f"{'':12}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for name, app in apps.items():
+        result = asyncio.run(run(app, concurrency))
+        print(
+            f"{name:12}{result['rps']:>10.0f}"
+            f"{result['p50_ms']:>10.1f}{result['p99_ms']:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
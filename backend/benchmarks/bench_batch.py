@@ -0,0 +1,78 @@
+"""Actions per second: one request per action against /batch.
+
+A bot drives GAMES games, each taking a hit and then reading its
+state, first with a /hit and a /state request per game and then
+with /batch requests of BATCH_SIZE actions. Requests go through the
+ASGI app in process, so the numbers leave out the network round
+trip that batching also saves.
+
+Run from the backend directory:
+
+    PYTHONPATH=. python benchmarks/bench_batch.py \\
+        [games] [batch size]
+"""
+
+import asyncio
+import sys
+import time
+
+import httpx
+
+import src.pontoon as pontoon
+
+
+async def start_games(client, games):
+    responses = await asyncio.gather(
+        *[client.post("/start") for _ in range(games)]
+    )
+    return [response.json()["game_id"] for response in responses]
+
+
+async def single(client, game_ids):
+    for game_id in game_ids:
+        response = await client.post(
+            "/hit", json={"game_id": game_id}
+        )
+        response.raise_for_status()
+        response = await client.get(
+            "/state", params={"game_id": game_id}
+        )
+        response.raise_for_status()
+
+
+async def batched(client, game_ids, batch_size):
+    actions = [
+        {"game_id": game_id, "action": action}
+        for game_id in game_ids
+        for action in ("hit", "state")
+    ]
+    for start in range(0, len(actions), batch_size):
+        end = start + batch_size
+        chunk = actions[start:end]
+        response = await client.post(
+            "/batch", json={"actions": chunk}
+        )
+        response.raise_for_status()
+
+
+async def main(games, batch_size):
+    transport = httpx.ASGITransport(app=pontoon.app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+        print(f"{'':10}{'actions/s':>12}")
+        for name, drive in (
+            ("single", lambda ids: single(client, ids)),
+            ("batch", lambda ids: batched(client, ids, batch_size)),
+        ):
+            game_ids = await start_games(client, games)
+            start = time.perf_counter()
+            await drive(game_ids)
+            elapsed = time.perf_counter() - start
+            print(f"{name:10}{games * 2 / elapsed:>12,.0f}")
+
+
+if __name__ == "__main__":
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    asyncio.run(main(games, batch_size))
@@ -0,0 +1,124 @@
+"""Memory and throughput of the compact cards against the old ones.
+
+Run from the backend directory:
+
+    PYTHONPATH=. python benchmarks/bench_cards.py
+"""
+
+import timeit
+import tracemalloc
+from collections import deque
+from random import shuffle
+
+from src.cards import Card, Deck
+
+TABLES = 10_000
+
+
+class LegacyCard:
+    """The dict-backed Card the compact encoding replaced"""
+
+    def __init__(self, rank, suit):
+        if rank not in range(0, 14) or suit not in range(1, 5):
+            raise ValueError("Invalid rank or suit")
+        self.rank = rank
+        self.suit = suit
+
+    def __eq__(self, other):
+        if not isinstance(other, LegacyCard):
+            return False
+        return self.suit == other.suit and self.rank == other.rank
+
+
+class LegacyDeck(deque):
+    """The deque of Card objects the bytearray Deck replaced"""
+
+    def __init__(self, ranks=range(1, 14), suits=range(1, 5)):
+        deque.__init__(
+            self,
+            [
+                LegacyCard(rank, suit)
+                for rank in ranks
+                for suit in suits
+            ],
+        )
+
+    def shuffle(self):
+        shuffle(self)
+
+
+def deck_memory(deck_class, tables=TABLES):
+    """Bytes allocated to hold one shuffled deck per table"""
+    tracemalloc.start()
+    decks = []
+    for _ in range(tables):
+        deck = deck_class()
+        deck.shuffle()
+        decks.append(deck)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size
+
+
+def deal_round(deck_class):
+    deck = deck_class()
+    deck.shuffle()
+    return [deck.pop() for _ in range(4)]
+
+
+def rounds_per_second(deck_class, number=20_000):
+    seconds = timeit.timeit(
+        lambda: deal_round(deck_class), number=number
+    )
+    return number / seconds
+
+
+def card_equality_per_second(card_class, number=500_000):
+    a, b = card_class(1, 4), card_class(1, 4)
+    seconds = timeit.timeit(lambda: a == b, number=number)
+    return number / seconds
+
+
+def membership_per_second(deck_class, card_class, number=200_000):
+    """Checks for the last card in a six deck shoe, a full scan"""
+    deck = deck_class()
+    for _ in range(5):
+        deck.extend(deck_class())
+    card = card_class(13, 4)
+    seconds = timeit.timeit(lambda: card in deck, number=number)
+    return number / seconds
+
+
+def main():
+    rows = [
+        (
+            "memory for %d decks (MiB)" % TABLES,
+            deck_memory(LegacyDeck) / 2**20,
+            deck_memory(Deck) / 2**20,
+        ),
+        (
+            "build+shuffle+deal rounds/s",
+            rounds_per_second(LegacyDeck),
+            rounds_per_second(Deck),
+        ),
+        (
+            "card equality checks/s",
+            card_equality_per_second(LegacyCard),
+            card_equality_per_second(Card),
+        ),
+        (
+            "card in deck checks/s",
+            membership_per_second(LegacyDeck, LegacyCard),
+            membership_per_second(Deck, Card),
+        ),
+    ]
+    print(f"{'':32}{'legacy':>14}{'compact':>14}{'ratio':>8}")
+    for name, legacy, compact in rows:
+        print(
+            f"{name:32}{legacy:14.2f}{compact:14.2f}"
+            f"{compact / legacy:8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
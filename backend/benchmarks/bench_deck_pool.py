@@ -0,0 +1,57 @@
+"""Latency of starting games with and without the deck pool.
+
+Games are started in bursts, with a pause between bursts for the
+pool to refill, and the latency of Pontoon() + start_game is
+recorded for each game.
+
+Run from the backend directory:
+
+    PYTHONPATH=. python benchmarks/bench_deck_pool.py [burst size]
+"""
+
+import sys
+import time
+
+from src.deck_pool import DeckPool
+from src.pontoon_logic import Pontoon
+
+BURSTS = 20
+
+
+def start_latencies(deck_provider, burst, secure=False):
+    latencies = []
+    for _ in range(BURSTS):
+        for _ in range(burst):
+            start = time.perf_counter()
+            Pontoon(deck_provider=deck_provider).start_game()
+            latencies.append(time.perf_counter() - start)
+        time.sleep(0.05)
+    latencies.sort()
+    return latencies
+
+
+def report(name, latencies):
+    def percentile(p):
+        return latencies[int(len(latencies) * p)] * 1e6
+
+    print(
+        f"{name:16}{percentile(0.5):>10.1f}{percentile(0.99):>10.1f}"
+        f"{latencies[-1] * 1e6:>10.1f}"
+    )
+
+
+def main():
+    burst = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    print(f"bursts of {burst} starts, latency in µs")
+    print(f"{'':16}{'p50':>10}{'p99':>10}{'max':>10}")
+    report("no pool", start_latencies(None, burst))
+    for secure in (False, True):
+        pool = DeckPool(depth=burst, secure=secure)
+        pool.fill()
+        name = "secure pool" if secure else "pool"
+        report(name, start_latencies(pool, burst))
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Event log: append throughput and replay time for 100k games.
+
+Writes GAMES games to a log as the API does (a deal, a hit for two
+in three games, then a stick), then times recovery from the bare log
+and from a snapshot taken halfway through.
+
+Run from the backend directory:
+
+    PYTHONPATH=. python benchmarks/bench_events.py [games]
+"""
+
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+from src.deck_pool import DeckPool
+from src.events import HIT, STICK, EventLog, replay, write_snapshot
+from src.pontoon_logic import Pontoon
+
+
+def write_games(log, games, pool):
+    for index in range(games):
+        game_id = str(uuid.uuid4())
+        game = Pontoon(deck_provider=pool)
+        game.start_game()
+        log.start(game_id, game)
+        if index % 3:
+            game.player_hit()
+            log.append(game_id, HIT)
+        if not game.game_over:
+            game.player_stick()
+            log.append(game_id, STICK)
+
+
+def main():
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    pool = DeckPool(depth=0)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "games.log")
+        snapshot = os.path.join(directory, "games.snapshot")
+
+        log = EventLog(path)
+        start = time.perf_counter()
+        write_games(log, games // 2, pool)
+        log.flush()
+        write_snapshot(snapshot, *replay(path))
+        write_games(log, games - games // 2, pool)
+        log.close()
+        elapsed = time.perf_counter() - start
+        size = os.path.getsize(path)
+        print(
+            f"wrote {games:,} games, {size / 2**20:.1f} MiB, "
+            f"{log.syncs:,} fsyncs in {elapsed:.2f}s"
+        )
+
+        for name, snapshot_path in (
+            ("full log", None),
+            ("snapshot + tail", snapshot),
+        ):
+            start = time.perf_counter()
+            replayed, _ = replay(path, snapshot_path)
+            elapsed = time.perf_counter() - start
+            assert len(replayed) == games
+            print(f"replay {name:16}{elapsed:>8.2f}s")
+
+
+if __name__ == "__main__":
+    main()
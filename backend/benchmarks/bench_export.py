@@ -0,0 +1,89 @@
+"""Memory and speed of exporting finished games.
+
+Fills a memory store with finished games, then streams them through
+the binary and NDJSON exports into a sink that only counts bytes.
+The peak memory allocated during the export should stay flat as the
+number of games grows, apart from the store's list of ids taken at
+the start of the walk (8 bytes a game). Exporting every game through
+its /state JSON, held in a list, is shown for contrast.
+
+Run from the backend directory:
+
+    PYTHONPATH=. python benchmarks/bench_export.py [games ...]
+"""
+
+import sys
+import time
+import tracemalloc
+
+from src.export import CHUNKS, finished_games
+from src.pontoon_logic import Pontoon
+from src.responses import state_bytes
+from src.sharding import new_id
+from src.store import MemoryGameStore
+
+
+def fill(count):
+    store = MemoryGameStore(max_games=count, ttl=None)
+    for seed in range(count):
+        game = Pontoon()
+        game.start_game(seed=seed)
+        game.player_stick()
+        store.put(new_id(), game)
+    return store
+
+
+def measure(export):
+    """Runs an export, returning bytes, seconds and peak memory"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = export()
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, seconds, peak
+
+
+def streamed(store, format):
+    return lambda: sum(
+        len(chunk) for chunk in CHUNKS[format](finished_games(store))
+    )
+
+
+def collected(store):
+    def export():
+        states = [
+            state_bytes(game) for _, game in finished_games(store)
+        ]
+        return sum(map(len, states))
+
+    return export
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [
+        10_000,
+        50_000,
+        200_000,
+    ]
+    print(
+        f"{'games':>8}  {'format':<10}{'bytes/game':>11}"
+        f"{'games/s':>11}{'peak MiB':>10}"
+    )
+    for count in counts:
+        store = fill(count)
+        rows = [
+            ("binary", streamed(store, "binary")),
+            ("ndjson", streamed(store, "ndjson")),
+            ("collected", collected(store)),
+        ]
+        for name, export in rows:
+            size, seconds, peak = measure(export)
+            print(
+                f"{count:>8,}  {name:<10}{size / count:>11.1f}"
+                f"{count / seconds:>11,.0f}{peak / 2**20:>10.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
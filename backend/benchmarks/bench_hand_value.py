@@ -0,0 +1,81 @@
+"""Hand scoring: per-card rescans against running totals and batches.
+
+Run from the backend directory:
+
+    PYTHONPATH=. python benchmarks/bench_hand_value.py
+"""
+
+import random
+import time
+
+from src.cards import Deck
+from src.hand_value import (
+    Hand,
+    batch_hand_values,
+    hand_value,
+    ranks_array,
+)
+
+N_HANDS = 100_000
+
+
+def rescan_value(hand):
+    """The per-card loop Pontoon.get_hand_value used to run"""
+    value = 0
+    aces = 0
+    for card in hand:
+        rank = card.get_rank()
+        if rank == 1:
+            aces += 1
+            value += 11
+        elif rank > 10:
+            value += 10
+        else:
+            value += rank
+    while value > 21 and aces:
+        value -= 10
+        aces -= 1
+    return value
+
+
+def make_hands(n=N_HANDS, seed=0):
+    rng = random.Random(seed)
+    hands = []
+    for _ in range(n):
+        deck = Deck()
+        deck.shuffle()
+        hands.append([deck.pop() for _ in range(rng.randint(2, 5))])
+    return hands
+
+
+def hands_per_second(func, hands):
+    start = time.perf_counter()
+    for hand in hands:
+        func(hand)
+    return len(hands) / (time.perf_counter() - start)
+
+
+def main():
+    hands = make_hands()
+    tracked = [Hand(hand) for hand in hands]
+    ranks = ranks_array(hands)
+
+    start = time.perf_counter()
+    batch_hand_values(ranks)
+    batch_rate = len(hands) / (time.perf_counter() - start)
+
+    rows = [
+        ("per-card rescan", hands_per_second(rescan_value, hands)),
+        ("lookup table rescan", hands_per_second(hand_value, hands)),
+        (
+            "running totals (Hand)",
+            hands_per_second(hand_value, tracked),
+        ),
+        ("numpy batch", batch_rate),
+    ]
+    for name, rate in rows:
+        print(f"{name:24}{rate:16,.0f} hands/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Request overhead of metrics: the app with and without them.
+
+Each round plays GAMES games through /start, /hit, /state and
+/stick, calling the ASGI app directly so the client's own cost does
+not hide the server's. Rounds alternate between the plain app and
+the app with MetricsMiddleware and the hot path timers, and the
+best round of each is compared. With METRICS unset the app is the
+plain one, so only the enabled overhead is measured. The deck pool
+is off unless DECK_POOL_DEPTH is set, as its refill thread makes
+rounds too noisy to compare.
+
+Run from the backend directory:
+
+    PYTHONPATH=. python benchmarks/bench_metrics.py [games] [rounds]
+"""
+
+import asyncio
+import gc
+import os
+import sys
+import time
+
+os.environ.setdefault("DECK_POOL_DEPTH", "0")
+
+import src.pontoon as pontoon  # noqa: E402
+from benchmarks.asgi import play  # noqa: E402
+from src import metrics  # noqa: E402
+
+
+async def timed_round(app, games, instrumented):
+    if instrumented:
+        metrics.instrument()
+    else:
+        metrics.uninstrument()
+    gc.collect()
+    start = time.perf_counter()
+    requests = await play(app, games)
+    return (time.perf_counter() - start) / requests
+
+
+def per_call(func, calls=200_000):
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - start) / calls
+
+
+async def middleware_cost(calls=50_000):
+    async def empty(scope, receive, send):
+        pass
+
+    measured = metrics.MetricsMiddleware(
+        empty, metrics.Histogram("bench_seconds", "", "endpoint")
+    )
+    scope = {"type": "http"}
+    costs = []
+    for app in (empty, measured):
+        start = time.perf_counter()
+        for _ in range(calls):
+            await app(scope, None, None)
+        costs.append((time.perf_counter() - start) / calls)
+    return costs[1] - costs[0]
+
+
+def timer_cost():
+    def empty():
+        pass
+
+    histogram = metrics.Histogram("bench_seconds", "", "path")
+    timed = metrics.timed(empty, histogram, "empty")
+    return per_call(timed) - per_call(empty)
+
+
+async def main(games, rounds):
+    plain = pontoon.app
+    measured = metrics.MetricsMiddleware(plain)
+    await play(plain, games)
+    best = {"off": float("inf"), "on": float("inf")}
+    order = [("off", plain), ("on", measured)]
+    for _ in range(rounds):
+        order.reverse()
+        for name, app in order:
+            elapsed = await timed_round(app, games, name == "on")
+            best[name] = min(best[name], elapsed)
+    metrics.uninstrument()
+    print(f"{'metrics':10}{'requests/s':>12}{'µs/request':>12}")
+    for name, elapsed in best.items():
+        print(
+            f"{name:10}{1 / elapsed:>12,.0f}{elapsed * 1e6:>12.1f}"
+        )
+    print(f"measured overhead: {best['on'] / best['off'] - 1:.2%}")
+
+    # The rounds differ by a few percent from noise alone, so also
+    # build the overhead up from its parts
+    calls = metrics.Histogram("bench_seconds", "", "path")
+    metrics.instrument(histogram=calls)
+    requests = await play(plain, games)
+    metrics.uninstrument()
+    timers = (
+        sum(
+            count
+            for name, _, count in calls.samples()
+            if name.endswith("_count")
+        )
+        / requests
+    )
+    cost = await middleware_cost() + timers * timer_cost()
+    print(
+        f"timers per request {timers:.1f}, "
+        f"cost per request {cost * 1e6:.2f} µs, "
+        f"estimated overhead: {cost / best['off']:.2%}"
+    )
+
+
+if __name__ == "__main__":
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    asyncio.run(main(games, rounds))
@@ -0,0 +1,61 @@
+"""Rendering /hit responses: jsonable_encoder against orjson.
+
+Compares the old path (jsonable_encoder with a Card encoder, then
+JSONResponse), orjson with a default hook for cards, and the
+pre-rendered state fragment now used by the API.
+
+Run from the backend directory:
+
+    PYTHONPATH=. python benchmarks/bench_responses.py
+"""
+
+import timeit
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from src.cards import Card
+from src.pontoon_logic import Pontoon
+from src.responses import GameJSONResponse, state_fragment
+
+NUMBER = 20_000
+
+CARD_ENCODER = {
+    Card: lambda card: {"rank": card.rank, "suit": card.suit}
+}
+
+
+def jsonable(game):
+    content = {"result": "ok", "game_state": game.get_game_state()}
+    return JSONResponse(
+        jsonable_encoder(content, custom_encoder=CARD_ENCODER)
+    )
+
+
+def orjson_default(game):
+    content = {"result": "ok", "game_state": game.get_game_state()}
+    return GameJSONResponse(content)
+
+
+def fragment(game):
+    return GameJSONResponse(
+        {"result": "ok", "game_state": state_fragment(game)}
+    )
+
+
+def main():
+    game = Pontoon()
+    game.start_game(seed=7)
+    game.player_hit()
+    print(f"{'':16}{'µs/response':>12}")
+    for name, render in (
+        ("jsonable", jsonable),
+        ("orjson default", orjson_default),
+        ("state fragment", fragment),
+    ):
+        seconds = timeit.timeit(lambda: render(game), number=NUMBER)
+        print(f"{name:16}{seconds / NUMBER * 1e6:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Rummy hand evaluation on 7, 10 and 13 card hands.
+
+"typical" hands are dealt from a shuffled deck. "worst" is the hand,
+among a few thousand dealt from the 20 lowest cards, whose search
+visits the most positions: dense in overlapping runs and sets.
+Evaluations are cold, with the memo cleared before each. "turn" is
+one incremental turn on a RummyHand as during play: draw, choose
+the best discard and discard it.
+
+Run from the backend directory:
+
+    PYTHONPATH=. python benchmarks/bench_rummy.py
+"""
+
+import random
+import time
+
+from src.cards import Card, Deck
+from src.rummy import RummyHand, _arrange, arrange
+
+HANDS = 2_000
+
+
+def mask_of(cards):
+    return sum(1 << card.code for card in cards)
+
+
+def typical_hands(size, rng):
+    hands = []
+    for _ in range(HANDS):
+        deck = Deck()
+        deck.shuffle(rng)
+        hands.append(mask_of(deck.pop() for _ in range(size)))
+    return hands
+
+
+def worst_hand(size, rng):
+    pool = [
+        Card(rank, suit)
+        for rank in range(1, 6)
+        for suit in range(1, 5)
+    ]
+    worst, positions = 0, 0
+    for _ in range(HANDS):
+        mask = mask_of(rng.sample(pool, size))
+        _arrange.cache_clear()
+        arrange(mask)
+        if _arrange.cache_info().currsize > positions:
+            worst, positions = mask, _arrange.cache_info().currsize
+    return worst
+
+
+def cold_us(hands):
+    elapsed = 0.0
+    for mask in hands:
+        _arrange.cache_clear()
+        start = time.perf_counter()
+        arrange(mask)
+        elapsed += time.perf_counter() - start
+    return elapsed / len(hands) * 1e6
+
+
+def turn_us(size, rng):
+    deck = Deck()
+    deck.shuffle(rng)
+    hand = RummyHand(deck.pop() for _ in range(size))
+    _arrange.cache_clear()
+    start = time.perf_counter()
+    for _ in range(HANDS):
+        hand.add(deck.pop())
+        card, _ = hand.best_discard()
+        hand.remove(card)
+        deck.appendleft(card)
+    return (time.perf_counter() - start) / HANDS * 1e6
+
+
+def main():
+    rng = random.Random(1)
+    columns = ("typical µs", "worst µs", "turn µs")
+    print(f"{'cards':>6}" + "".join(f"{c:>12}" for c in columns))
+    for size in (7, 10, 13):
+        typical = cold_us(typical_hands(size, rng))
+        worst = cold_us([worst_hand(size, rng)] * 200)
+        print(
+            f"{size:>6}{typical:>12.1f}{worst:>12.1f}"
+            f"{turn_us(size, rng):>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Encoding games: compact binary against pickle and JSON.
+
+Run from the backend directory:
+
+    PYTHONPATH=. python benchmarks/bench_serialization.py
+"""
+
+import json
+import pickle
+import timeit
+
+from src.cards import Card, Deck
+from src.hand_value import Hand
+from src.pontoon_logic import Pontoon
+from src.serialization import dumps, loads
+
+NUMBER = 20_000
+
+
+def json_dumps(game):
+    def cards(hand):
+        return [[card.rank, card.suit] for card in hand]
+
+    return json.dumps(
+        {
+            "player_hand": cards(game.player_hand),
+            "dealer_hand": cards(game.dealer_hand),
+            "deck": cards(game.deck),
+            "game_over": game.game_over,
+            "player_stuck": game.player_stuck,
+        }
+    ).encode()
+
+
+def json_loads(data):
+    state = json.loads(data)
+
+    def cards(items):
+        return [Card(rank, suit) for rank, suit in items]
+
+    game = Pontoon()
+    game.player_hand = Hand(cards(state["player_hand"]))
+    game.dealer_hand = Hand(cards(state["dealer_hand"]))
+    game.deck = Deck([])
+    game.deck.extend(cards(state["deck"]))
+    game.game_over = state["game_over"]
+    game.player_stuck = state["player_stuck"]
+    return game
+
+
+def pickle_dumps(game):
+    return pickle.dumps(game, pickle.HIGHEST_PROTOCOL)
+
+
+def measure(name, encode, decode, game):
+    data = encode(game)
+    encode_us = timeit.timeit(lambda: encode(game), number=NUMBER)
+    decode_us = timeit.timeit(lambda: decode(data), number=NUMBER)
+    print(
+        f"{name:16}{len(data):>8}"
+        f"{encode_us / NUMBER * 1e6:>12.2f}"
+        f"{decode_us / NUMBER * 1e6:>12.2f}"
+    )
+
+
+def main():
+    unseeded = Pontoon()
+    unseeded.start_game()
+    unseeded.player_hit()
+    seeded = Pontoon()
+    seeded.start_game(seed=2024)
+    seeded.player_hit()
+
+    print(f"{'':16}{'bytes':>8}{'encode µs':>12}{'decode µs':>12}")
+    measure("binary", dumps, loads, unseeded)
+    measure("binary (seed)", dumps, loads, seeded)
+    measure("pickle", pickle_dumps, pickle.loads, unseeded)
+    measure("json", json_dumps, json_loads, unseeded)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""API throughput as shard workers are added.
+
+For each worker count, starts that many shard worker processes and
+as many load processes. Each load process runs its own Dispatcher,
+as the dispatcher would run under several uvicorn workers, and
+keeps PLAYERS games in flight through /start, /hit, /state and
+/stick for SECONDS. Throughput should grow with workers up to the
+number of cores, where load and workers begin to share them.
+
+Run from the backend directory:
+
+    PYTHONPATH=. python benchmarks/bench_sharding.py \\
+        [seconds] [players]
+"""
+
+import asyncio
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("DECK_POOL_DEPTH", "0")
+
+from benchmarks.asgi import play  # noqa: E402
+from src.dispatcher import Dispatcher, start_workers  # noqa: E402
+
+
+async def drive(paths, seconds, players):
+    dispatcher = Dispatcher(paths)
+    await dispatcher.connect()
+    stop_at = time.perf_counter() + seconds
+
+    async def player():
+        requests = 0
+        while time.perf_counter() < stop_at:
+            requests += await play(dispatcher, 1)
+        return requests
+
+    counts = await asyncio.gather(
+        *[player() for _ in range(players)]
+    )
+    await dispatcher.close()
+    return sum(counts)
+
+
+def load(paths, seconds, players, results):
+    results.put(asyncio.run(drive(paths, seconds, players)))
+
+
+def measure(workers, seconds, players):
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as directory:
+        servers, paths = start_workers(workers, directory)
+        results = context.Queue()
+        loaders = [
+            context.Process(
+                target=load, args=(paths, seconds, players, results)
+            )
+            for _ in range(workers)
+        ]
+        try:
+            for loader in loaders:
+                loader.start()
+            requests = sum(results.get() for _ in loaders)
+        finally:
+            for process in loaders + servers:
+                process.terminate()
+                process.join()
+    return requests / seconds
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    players = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    cores = os.cpu_count() or 1
+    counts = sorted({1, 2, 4, 8, cores} & set(range(1, cores + 1)))
+    if counts == [1]:
+        counts = [1, 2]
+    print(f"{cores} cores")
+    print(
+        f"{'workers':>8}{'requests/s':>14}{'speedup':>10}{'eff.':>8}"
+    )
+    base = None
+    for workers in counts:
+        rate = measure(workers, seconds, players)
+        base = base or rate
+        print(
+            f"{workers:>8}{rate:>14,.0f}{rate / base:>10.2f}"
+            f"{rate / base / workers:>8.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
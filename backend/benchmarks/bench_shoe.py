@@ -0,0 +1,42 @@
+"""Rounds per second: a fresh deck every round against a shoe.
+
+Each round deals a player and a dealer hand and plays the dealer
+out, as Pontoon.player_stick does after a stand on two cards.
+
+Run from the backend directory:
+
+    PYTHONPATH=. python benchmarks/bench_shoe.py
+"""
+
+import timeit
+
+from src.deck_pool import DeckPool
+from src.pontoon_logic import Pontoon
+from src.shoe import Shoe
+
+ROUNDS = 50_000
+
+
+def rounds_per_second(deck_provider):
+    game = Pontoon(deck_provider=deck_provider)
+
+    def play():
+        game.start_game()
+        game.player_stick()
+
+    return ROUNDS / timeit.timeit(play, number=ROUNDS)
+
+
+def main():
+    pool = DeckPool(depth=0)
+    print(f"{'':16}{'rounds/s':>12}")
+    for name, provider in (
+        ("fresh deck", pool),
+        ("6 deck shoe", Shoe(decks=6)),
+        ("8 deck shoe", Shoe(decks=8)),
+    ):
+        print(f"{name:16}{rounds_per_second(provider):>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
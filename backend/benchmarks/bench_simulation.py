@@ -0,0 +1,34 @@
+"""Simulation throughput and scaling with worker processes.
+
+Run from the backend directory:
+
+    PYTHONPATH=. python benchmarks/bench_simulation.py [rounds]
+"""
+
+import os
+import sys
+
+from src.simulation import simulate
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 4_000_000
+    cores = os.cpu_count() or 1
+    workers = sorted({1, 2, 4, 8, cores} & set(range(1, cores + 1)))
+
+    base = None
+    print(
+        f"{'workers':>8}{'rounds/s':>16}{'speedup':>10}{'eff.':>8}"
+    )
+    for count in workers:
+        result = simulate(rounds, workers=count, seed=0)
+        rate = result.rounds_per_second
+        base = base or rate
+        print(
+            f"{count:>8}{rate:>16,.0f}{rate / base:>10.2f}"
+            f"{rate / base / count:>8.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Cost of polling an unchanged game's state.
+
+Compares rendering the state on every call with the views cached
+against the game's state version, for get_game_state and
+state_bytes, then times /state through the ASGI app with and
+without If-None-Match.
+
+Run from the backend directory:
+
+    PYTHONPATH=. python benchmarks/bench_state_cache.py [calls]
+"""
+
+import asyncio
+import os
+import sys
+import time
+import timeit
+
+os.environ.setdefault("DECK_POOL_DEPTH", "0")
+
+import orjson  # noqa: E402
+
+import src.pontoon as pontoon  # noqa: E402
+from benchmarks.asgi import request  # noqa: E402
+from src.pontoon_logic import Pontoon  # noqa: E402
+from src.responses import _render_state  # noqa: E402
+from src.responses import state_bytes, state_etag  # noqa: E402
+
+
+def per_call(func, calls):
+    return min(timeit.repeat(func, number=calls, repeat=5)) / calls
+
+
+async def poll(calls, conditional):
+    _, body = await request(pontoon.app, "POST", "/start")
+    game_id = orjson.loads(body)["game_id"]
+    query = f"game_id={game_id}".encode()
+    etag = state_etag(pontoon.games.get(game_id)).encode()
+    headers = [(b"if-none-match", etag)] if conditional else []
+    statuses = set()
+    best = float("inf")
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(calls):
+            status, _ = await request(
+                pontoon.app,
+                "GET",
+                "/state",
+                query=query,
+                headers=headers,
+            )
+            statuses.add(status)
+        best = min(best, time.perf_counter() - start)
+    return best / calls, statuses
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    game = Pontoon()
+    game.start_game(seed=1)
+    rows = [
+        ("get_game_state, rendered", lambda: game._game_state()),
+        ("get_game_state, cached", game.get_game_state),
+        ("state_bytes, rendered", lambda: _render_state(game)),
+        ("state_bytes, cached", lambda: state_bytes(game)),
+    ]
+    print(f"{'':28}{'µs/call':>10}")
+    for name, func in rows:
+        print(f"{name:28}{per_call(func, calls) * 1e6:>10.2f}")
+
+    for name, conditional in (
+        ("/state", False),
+        ("/state, If-None-Match", True),
+    ):
+        seconds, statuses = asyncio.run(
+            poll(calls // 10, conditional)
+        )
+        print(f"{name:28}{seconds * 1e6:>10.2f}  {sorted(statuses)}")
+
+
+if __name__ == "__main__":
+    main()
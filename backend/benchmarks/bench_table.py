@@ -0,0 +1,60 @@
+"""CPU per player-round: separate games against a shared table.
+
+Every player hits below 15 and then sticks. "separate" plays each
+player as their own Pontoon game, with its own deck and dealer, as
+/start does; "table" seats them all at one Table, dealing from one
+shoe and playing the dealer once per round.
+
+Run from the backend directory:
+
+    PYTHONPATH=. python benchmarks/bench_table.py
+"""
+
+import time
+
+from src.pontoon_logic import Pontoon
+from src.table import Table
+
+PLAYER_ROUNDS = 70_000
+
+
+def separate(seats):
+    games = [Pontoon() for _ in range(seats)]
+    for _ in range(PLAYER_ROUNDS // seats):
+        for game in games:
+            game.start_game()
+            while game.player_hand.value < 15:
+                game.player_hit()
+            if not game.game_over:
+                game.player_stick()
+
+
+def table(seats):
+    table = Table(seats=seats)
+    for _ in range(PLAYER_ROUNDS // seats):
+        table.start_round()
+        for seat, hand in enumerate(table.hands):
+            while table.turn == seat and hand.value < 15:
+                table.player_hit(seat)
+            if table.turn == seat:
+                table.player_stick(seat)
+
+
+def cpu_per_player(play, seats):
+    start = time.process_time()
+    play(seats)
+    rounds = PLAYER_ROUNDS // seats * seats
+    return (time.process_time() - start) / rounds * 1e6
+
+
+def main():
+    print(f"{'seats':>6}{'separate µs':>14}{'table µs':>12}")
+    for seats in (1, 4, 7):
+        print(
+            f"{seats:>6}{cpu_per_player(separate, seats):>14.2f}"
+            f"{cpu_per_player(table, seats):>12.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
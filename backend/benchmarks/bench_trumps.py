@@ -0,0 +1,66 @@
+"""Whist AI: search speed and deals solved per move.
+
+Plays the opening lead of a few deals with choose_move at several
+time budgets, in process and across a process pool, and reports
+nodes searched per second and deals solved per move.
+
+Run from the backend directory:
+
+    PYTHONPATH=. python benchmarks/bench_trumps.py [workers]
+"""
+
+import os
+import sys
+import timeit
+from concurrent.futures import ProcessPoolExecutor
+
+from src.trumps import Trumps, choose_move
+
+DEALS = 5
+BUDGETS = (0.05, 0.1, 0.2)
+
+
+def report(name, budget, executor=None, jobs=None):
+    nodes = samples = seconds = 0
+    for seed in range(DEALS):
+        result = choose_move(
+            Trumps(seed=seed),
+            0,
+            budget=budget,
+            executor=executor,
+            jobs=jobs,
+            seed=seed,
+        )
+        nodes += result.nodes
+        samples += result.samples
+        seconds += result.seconds
+    print(
+        f"{name:12}{budget * 1000:>8.0f}{nodes / seconds:>14,.0f}"
+        f"{samples / DEALS:>10.1f}{seconds / DEALS * 1000:>10.1f}"
+    )
+
+
+def main():
+    workers = (
+        int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count()
+    )
+    game = Trumps(seed=0)
+    seconds = timeit.timeit(
+        lambda: game.legal_mask(1), number=100_000
+    )
+    print(f"legal_mask {seconds * 10:.2f} µs")
+    print(
+        f"{'':12}{'ms':>8}{'nodes/s':>14}"
+        f"{'deals':>10}{'took ms':>10}"
+    )
+    for budget in BUDGETS:
+        report("in process", budget)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Start the workers before timing
+        list(executor.map(abs, range(workers)))
+        for budget in BUDGETS:
+            report(f"{workers} workers", budget, executor, workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,444 @@
+"""Closed-loop load generator for the Pontoon API.
+
+Each simulated player plays sessions back to back: /start, /hit
+while their hand is under a threshold, then /stick, pausing for a
+think time drawn from an exponential distribution between requests.
+A player only sends its next request once the last one is answered,
+so the offered load follows the server's speed.
+
+Each concurrency level runs for a fixed time and reports
+throughput, latency percentiles and error rates per endpoint. The
+server's resident memory is sampled as games accumulate, to show
+how it grows per stored game.
+
+The load goes to the app in process through ASGI by default, to a
+uvicorn server started for the run with --uvicorn, or to a running
+server with --url; none needs network access beyond localhost.
+
+Run from the backend directory:
+
+    PYTHONPATH=. python benchmarks/loadgen.py \\
+        --concurrency 10,100,1000 --duration 10 --think 0.05
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import socket
+import subprocess
+import sys
+import time
+from random import Random
+
+import httpx
+import orjson
+
+from benchmarks.asgi import request
+
+ENDPOINTS = ("/start", "/hit", "/stick")
+PERCENTILES = (0.5, 0.95, 0.99, 0.999)
+
+
+def rss_bytes(pid="self"):
+    """Returns a process's resident memory, or None if unknown"""
+    try:
+        with open(f"/proc/{pid}/status") as file:
+            for line in file:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def percentile(ordered: list, fraction: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    if not ordered:
+        return float("nan")
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+class Stats:
+    """Latencies and errors per endpoint for one run"""
+
+    def __init__(self) -> None:
+        self.latencies = {endpoint: [] for endpoint in ENDPOINTS}
+        self.errors = dict.fromkeys(ENDPOINTS, 0)
+        self.sessions = 0
+
+    def record(self, endpoint, seconds, ok) -> None:
+        self.latencies[endpoint].append(seconds)
+        if not ok:
+            self.errors[endpoint] += 1
+
+    @property
+    def requests(self) -> int:
+        return sum(map(len, self.latencies.values()))
+
+    def summary(self, elapsed: float) -> dict:
+        endpoints = {}
+        for endpoint, values in self.latencies.items():
+            ordered = sorted(values)
+            endpoints[endpoint] = {
+                "requests": len(values),
+                "error_rate": (
+                    self.errors[endpoint] / len(values)
+                    if values
+                    else 0.0
+                ),
+                **{
+                    f"p{fraction * 100:g}": percentile(
+                        ordered, fraction
+                    )
+                    for fraction in PERCENTILES
+                },
+            }
+        return {
+            "seconds": elapsed,
+            "sessions_per_second": self.sessions / elapsed,
+            "requests_per_second": self.requests / elapsed,
+            "endpoints": endpoints,
+        }
+
+
+class InProcessTarget:
+    """Sends requests straight to the ASGI app"""
+
+    def __init__(self) -> None:
+        import src.pontoon as pontoon
+
+        self.pontoon = pontoon
+        self.pid = "self"
+
+    async def __aenter__(self):
+        self._lifespan = self.pontoon.lifespan(self.pontoon.app)
+        await self._lifespan.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._lifespan.__aexit__(*exc_info)
+
+    async def call(self, path, body):
+        return await request(self.pontoon.app, "POST", path, body)
+
+    def games(self):
+        return len(self.pontoon.games)
+
+
+class HTTPTarget:
+    """Sends requests to a server over HTTP
+
+    Args:
+        url (str): the server's base URL
+        pid (int, optional): the server's process, to sample its
+            memory
+    """
+
+    def __init__(self, url, pid=None, connections=100) -> None:
+        self.url = url
+        self.pid = pid
+        self.connections = connections
+        self.started = 0
+
+    async def __aenter__(self):
+        limits = httpx.Limits(
+            max_connections=self.connections,
+            max_keepalive_connections=self.connections,
+        )
+        self.client = httpx.AsyncClient(
+            base_url=self.url, limits=limits, timeout=30
+        )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.client.aclose()
+
+    async def call(self, path, body):
+        response = await self.client.post(path, json=body)
+        if path == "/start":
+            self.started += 1
+        return response.status_code, response.content
+
+    def games(self):
+        # Games the server holds are not visible over HTTP, so count
+        # the ones this generator started
+        return self.started
+
+
+async def timed_call(target, stats, path, body=None):
+    start = time.perf_counter()
+    try:
+        status, content = await target.call(path, body)
+        ok = 200 <= status < 300
+    except Exception:
+        content, ok = None, False
+    stats.record(path, time.perf_counter() - start, ok)
+    return orjson.loads(content) if ok else None
+
+
+async def player(target, stats, stop_at, think, stand, rng):
+    """Plays sessions until stop_at"""
+
+    async def pause():
+        await asyncio.sleep(
+            rng.expovariate(1 / think) if think else 0
+        )
+
+    while time.perf_counter() < stop_at:
+        started = await timed_call(target, stats, "/start")
+        if started is None:
+            await pause()
+            continue
+        game = {"game_id": started["game_id"]}
+        state = started["game_state"]
+        while (
+            not state["game_over"] and state["player_value"] < stand
+        ):
+            await pause()
+            result = await timed_call(target, stats, "/hit", game)
+            if result is None:
+                break
+            state = result["game_state"]
+        else:
+            if not state["game_over"]:
+                await pause()
+                await timed_call(target, stats, "/stick", game)
+            stats.sessions += 1
+        await pause()
+
+
+async def sample_memory(target, samples, interval):
+    start = time.perf_counter()
+    while True:
+        samples.append(
+            (
+                time.perf_counter() - start,
+                target.games(),
+                rss_bytes(target.pid),
+            )
+        )
+        await asyncio.sleep(interval)
+
+
+async def run_level(
+    target, concurrency, duration, think, stand, seed
+):
+    stats = Stats()
+    rng = Random(seed)
+    start = time.perf_counter()
+    stop_at = start + duration
+    await asyncio.gather(
+        *[
+            player(
+                target,
+                stats,
+                stop_at,
+                think,
+                stand,
+                Random(rng.random()),
+            )
+            for _ in range(concurrency)
+        ]
+    )
+    return stats.summary(time.perf_counter() - start)
+
+
+def bytes_per_game(samples):
+    """Least squares slope of RSS against games held"""
+    points = [(games, rss) for _, games, rss in samples if rss]
+    if len(points) < 2:
+        return None
+    mean_games = sum(games for games, _ in points) / len(points)
+    mean_rss = sum(rss for _, rss in points) / len(points)
+    spread = sum((games - mean_games) ** 2 for games, _ in points)
+    if not spread:
+        return None
+    return (
+        sum(
+            (games - mean_games) * (rss - mean_rss)
+            for games, rss in points
+        )
+        / spread
+    )
+
+
+async def run(target, levels, duration, think, stand, interval):
+    samples = []
+    results = []
+    async with target:
+        sampler = asyncio.create_task(
+            sample_memory(target, samples, interval)
+        )
+        for index, concurrency in enumerate(levels):
+            summary = await run_level(
+                target, concurrency, duration, think, stand, index
+            )
+            results.append({"concurrency": concurrency, **summary})
+            print_level(results[-1])
+        sampler.cancel()
+    return {
+        "levels": results,
+        "memory": [
+            {"seconds": seconds, "games": games, "rss_bytes": rss}
+            for seconds, games, rss in samples
+        ],
+        "rss_bytes_per_game": bytes_per_game(samples),
+    }
+
+
+def print_level(result) -> None:
+    print(
+        f"concurrency {result['concurrency']}: "
+        f"{result['sessions_per_second']:,.0f} sessions/s, "
+        f"{result['requests_per_second']:,.0f} requests/s"
+    )
+    print(
+        f"  {'endpoint':10}{'requests':>10}{'errors':>8}"
+        + "".join(f"{'p' + f'{p * 100:g}':>10}" for p in PERCENTILES)
+    )
+    for endpoint, stats in result["endpoints"].items():
+        print(
+            f"  {endpoint:10}{stats['requests']:>10,}"
+            f"{stats['error_rate']:>8.1%}"
+            + "".join(
+                f"{stats[f'p{p * 100:g}'] * 1e3:>8.2f}ms"
+                for p in PERCENTILES
+            )
+        )
+
+
+def print_memory(report) -> None:
+    memory = [row for row in report["memory"] if row["rss_bytes"]]
+    if not memory:
+        print("server memory not available")
+        return
+    first, last = memory[0], memory[-1]
+    print(
+        f"RSS {first['rss_bytes'] / 2**20:,.1f} MiB with "
+        f"{first['games']:,} games -> "
+        f"{last['rss_bytes'] / 2**20:,.1f} MiB with "
+        f"{last['games']:,} games"
+    )
+    slope = report["rss_bytes_per_game"]
+    if slope is not None:
+        print(f"about {slope:,.0f} bytes per game")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_uvicorn(port: int):
+    """Starts the app under uvicorn and waits until it accepts"""
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "src.pontoon:app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ],
+        env={**os.environ, "PYTHONPATH": os.getcwd()},
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("uvicorn exited during startup")
+        try:
+            socket.create_connection(
+                ("127.0.0.1", port), 0.1
+            ).close()
+            return server
+        except OSError:
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError("uvicorn did not start")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description=__doc__.split("\n")[0]
+    )
+    parser.add_argument(
+        "--concurrency",
+        default="10,100,1000",
+        help="comma separated players per level",
+    )
+    parser.add_argument(
+        "--duration",
+        type=float,
+        default=10,
+        help="seconds per level",
+    )
+    parser.add_argument(
+        "--think", type=float, default=0.05, help="mean think time"
+    )
+    parser.add_argument(
+        "--stand", type=int, default=17, help="hit below this value"
+    )
+    parser.add_argument(
+        "--sample-interval",
+        type=float,
+        default=0.5,
+        help="seconds between memory samples",
+    )
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--url", help="base URL of a running server")
+    target.add_argument(
+        "--uvicorn",
+        action="store_true",
+        help="start a local uvicorn server for the run",
+    )
+    parser.add_argument("--output", help="file to save results to")
+    args = parser.parse_args(argv)
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    server = None
+    if args.uvicorn:
+        port = free_port()
+        server = start_uvicorn(port)
+        target = HTTPTarget(
+            f"http://127.0.0.1:{port}", server.pid, max(levels)
+        )
+    elif args.url:
+        target = HTTPTarget(args.url, connections=max(levels))
+    else:
+        target = InProcessTarget()
+    try:
+        report = asyncio.run(
+            run(
+                target,
+                levels,
+                args.duration,
+                args.think,
+                args.stand,
+                args.sample_interval,
+            )
+        )
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+    print_memory(report)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    errors = sum(
+        stats["requests"] * stats["error_rate"]
+        for level in report["levels"]
+        for stats in level["endpoints"].values()
+    )
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,262 @@
+"""Benchmark suite for catching performance regressions.
+
+Three levels:
+
+- micro: Card creation and equality, Deck building, shuffling and
+  popping, hand values and game state,
+- macro: whole Pontoon rounds played through the game logic,
+- api: /start, /hit, /stick sequences through the ASGI app in
+  process.
+
+Each benchmark reports the best seconds per operation over several
+repeats. Results are saved as JSON, and --compare checks them
+against a saved baseline, exiting with status 1 if any benchmark
+is slower by more than --threshold. Baselines only mean something
+on the machine that recorded them.
+
+Run from the backend directory:
+
+    PYTHONPATH=. python benchmarks/suite.py [--level micro] \\
+        [--output results.json] [--compare baseline.json]
+
+or use make benchmark, make benchmark-baseline and
+make benchmark-compare.
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import sys
+import timeit
+from random import Random
+
+import orjson
+
+os.environ.setdefault("DECK_POOL_DEPTH", "0")
+
+import src.pontoon as pontoon  # noqa: E402
+from benchmarks.asgi import request  # noqa: E402
+from src.cards import Card, Deck  # noqa: E402
+from src.hand_value import Hand  # noqa: E402
+from src.pontoon_logic import Pontoon  # noqa: E402
+
+LEVELS = ("micro", "macro", "api")
+REPEATS = 5
+# Slowdown beyond which a benchmark counts as a regression
+THRESHOLD = 0.15
+
+PAIRS = [
+    (rank, suit) for suit in range(1, 5) for rank in range(1, 14)
+]
+HANDS = [
+    Hand([Card(1, 1), Card(13, 2)]),
+    Hand([Card(1, 1), Card(1, 2), Card(9, 3)]),
+    Hand([Card(10, 1), Card(6, 2), Card(5, 3)]),
+    Hand([Card(2, 1), Card(3, 2), Card(4, 3), Card(5, 4)]),
+]
+
+
+def card_create():
+    for rank, suit in PAIRS:
+        Card(rank, suit)
+
+
+def card_equal():
+    cards = [Card(rank, suit) for rank, suit in PAIRS]
+    others = cards[1:] + cards[:1]
+
+    def run():
+        for card, other in zip(cards, others):
+            card == other
+
+    return run
+
+
+def deck_shuffle():
+    deck = Deck()
+    rng = Random(0)
+    return lambda: deck.shuffle(rng)
+
+
+def deck_pop():
+    def run():
+        deck = Deck()
+        for _ in range(52):
+            deck.pop()
+
+    return run
+
+
+def hand_value():
+    game = Pontoon()
+    value = game.get_hand_value
+
+    def run():
+        for hand in HANDS:
+            value(Hand(hand))
+
+    return run
+
+
+def game_state():
+    game = Pontoon()
+    game.start_game(seed=0)
+    return game.get_game_state
+
+
+def play_round(game, rng):
+    game.start_game(seed=rng.random())
+    while not game.game_over and game.player_hand.value < 17:
+        game.player_hit()
+    if not game.game_over:
+        game.player_stick()
+
+
+def rounds():
+    game = Pontoon()
+    rng = Random(0)
+    return lambda: play_round(game, rng)
+
+
+async def api_game(app):
+    """Plays one game through /start, /hit and /stick"""
+    _, body = await request(app, "POST", "/start")
+    ids = {"game_id": orjson.loads(body)["game_id"]}
+    _, body = await request(app, "POST", "/hit", ids)
+    if not orjson.loads(body)["game_state"]["game_over"]:
+        await request(app, "POST", "/stick", ids)
+
+
+def api_games():
+    loop = asyncio.new_event_loop()
+    app = pontoon.app
+    return lambda: loop.run_until_complete(api_game(app))
+
+
+# (level, name, factory returning the function to time, operations
+# per call); plain functions are timed as they are
+BENCHMARKS = (
+    ("micro", "card_create", lambda: card_create, len(PAIRS)),
+    ("micro", "card_equal", card_equal, len(PAIRS)),
+    ("micro", "deck_build", lambda: Deck, 1),
+    ("micro", "deck_shuffle", deck_shuffle, 1),
+    ("micro", "deck_pop", deck_pop, 52),
+    ("micro", "hand_value", hand_value, len(HANDS)),
+    ("micro", "game_state", game_state, 1),
+    ("macro", "round", rounds, 1),
+    ("api", "start_hit_stick", api_games, 1),
+)
+
+
+def run(levels=LEVELS, repeats=REPEATS) -> dict:
+    """Runs the benchmarks of the given levels
+
+    Repeats take turns across benchmarks rather than running back
+    to back, so a burst of load on the machine slows one repeat of
+    each instead of every repeat of one; the best repeat is kept.
+    """
+    timers = []
+    for level, name, factory, ops in BENCHMARKS:
+        if level in levels:
+            timer = timeit.Timer(factory())
+            number, _ = timer.autorange()
+            timers.append((level, name, timer, number, ops))
+    best = {name: float("inf") for _, name, *_ in timers}
+    for _ in range(repeats):
+        for _, name, timer, number, ops in timers:
+            seconds = timer.timeit(number=number) / number / ops
+            best[name] = min(best[name], seconds)
+    results = {}
+    for level, name, *_ in timers:
+        results[name] = {
+            "level": level,
+            "seconds_per_op": best[name],
+            "ops_per_second": 1 / best[name],
+        }
+    return {
+        "created": datetime.datetime.now(
+            datetime.timezone.utc
+        ).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold=THRESHOLD):
+    """Compares results with a baseline
+
+    Returns:
+        list: (name, baseline seconds, current seconds, change,
+            regressed) for each benchmark in both
+    """
+    rows = []
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            continue
+        old = before["seconds_per_op"]
+        new = result["seconds_per_op"]
+        change = new / old - 1
+        rows.append((name, old, new, change, change > threshold))
+    return rows
+
+
+def print_results(results: dict) -> None:
+    print(f"{'benchmark':20}{'level':>8}{'ns/op':>14}{'ops/s':>16}")
+    for name, result in results["results"].items():
+        print(
+            f"{name:20}{result['level']:>8}"
+            f"{result['seconds_per_op'] * 1e9:>14,.0f}"
+            f"{result['ops_per_second']:>16,.0f}"
+        )
+
+
+def print_comparison(rows) -> None:
+    print(
+        f"{'benchmark':20}{'base ns':>12}{'now ns':>12}{'change':>9}"
+    )
+    for name, old, new, change, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(
+            f"{name:20}{old * 1e9:>12,.0f}{new * 1e9:>12,.0f}"
+            f"{change:>+9.1%}{flag}"
+        )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description=__doc__.split("\n")[0]
+    )
+    parser.add_argument(
+        "--level",
+        action="append",
+        choices=LEVELS,
+        help="level to run, repeatable; all levels by default",
+    )
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--output", help="file to save results to")
+    parser.add_argument("--compare", help="baseline results file")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    args = parser.parse_args(argv)
+
+    results = run(args.level or LEVELS, args.repeats)
+    print_results(results)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+    if not args.compare:
+        return 0
+    with open(args.compare) as file:
+        baseline = json.load(file)
+    rows = compare(results, baseline, args.threshold)
+    print()
+    print_comparison(rows)
+    return 1 if any(row[-1] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,291 @@
+"""Admission control for the game API.
+
+Without it every request is accepted and waits its turn on the
+event loop, so in a spike latency rises for everyone and the game
+store grows without limit. The admission middleware caps the
+requests running at once and the live games, and answers what it
+cannot serve in time with an immediate 503 and Retry-After rather
+than a slow success.
+
+Requests over the in-flight cap wait in one of two queues. Actions
+on existing games (/hit, /stick, /state and the rest) are let in
+before new /start and /table/start calls, so players finish the
+games they have before new ones begin. A request is shed on arrival
+when the wait ahead of it, estimated from the queue length and the
+recent service time, is over the latency target, and shed when it
+has waited the target without getting in.
+
+The game handlers rarely wait on anything, so under load requests
+mostly queue on the event loop before reaching the middleware at
+all. A timer measuring how late the loop runs it gives that wait;
+while it is over the target every request is shed on arrival, and
+starts are shed from half the target.
+"""
+
+import asyncio
+import os
+from collections import OrderedDict, deque
+from time import monotonic, perf_counter
+
+import orjson
+
+from src.metrics import Counter
+
+PLAY = 0
+START = 1
+START_PATHS = frozenset(("/start", "/table/start"))
+# Always let in, so an overloaded server can still be watched
+EXEMPT_PATHS = frozenset(("/metrics",))
+# Weight of the latest request in the service time average
+SMOOTHING = 0.05
+# Seconds between event loop lag measurements
+LAG_INTERVAL = 0.005
+
+
+class LiveGames:
+    """Counts the games in play, started and not yet over
+
+    A game never finished stops counting ttl seconds after it
+    started, about when the store lets it go, so abandoned games
+    do not hold the count up for good.
+
+    Args:
+        ttl (float, optional): seconds an unfinished game counts
+            for, None for no limit. Defaults to one hour.
+        clock (callable, optional): time source, for tests.
+    """
+
+    def __init__(self, ttl=3600.0, clock=monotonic) -> None:
+        self.ttl = ttl
+        self.clock = clock
+        self._started = OrderedDict()
+
+    def start(self, game_id: str) -> None:
+        self._started[game_id] = self.clock()
+
+    def finish(self, game_id: str) -> None:
+        self._started.pop(game_id, None)
+
+    def __len__(self) -> int:
+        started = self._started
+        if self.ttl is not None:
+            oldest = self.clock() - self.ttl
+            while started and next(iter(started.values())) <= oldest:
+                started.popitem(last=False)
+        return len(started)
+
+
+class Admission:
+    """Bounded concurrency with priority queues and load shedding
+
+    Args:
+        max_in_flight (int, optional): requests running at once, 0
+            for no cap. Defaults to 0.
+        max_games (int, optional): live games above which /start
+            and /table/start are refused, 0 for no cap. Defaults
+            to 0.
+        live_games (callable, optional): returns the number of live
+            games
+        target (float, optional): longest wait in seconds, for the
+            event loop or a slot, before a request is shed.
+            Defaults to 0.05.
+        retry_after (int, optional): seconds for the Retry-After
+            header. Defaults to 1.
+    """
+
+    def __init__(
+        self,
+        max_in_flight=0,
+        max_games=0,
+        live_games=None,
+        target=0.05,
+        retry_after=1,
+    ) -> None:
+        if max_games and live_games is None:
+            raise ValueError("max_games needs live_games")
+        self.max_in_flight = max_in_flight
+        self.max_games = max_games
+        self.live_games = live_games
+        self.target = target
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.service = 0.0
+        self.lag = 0.0
+        self._loop = None
+        self._waiting = (deque(), deque())
+        self.shed = Counter(
+            "pontoon_shed_requests_total",
+            "Requests refused by admission control",
+            "reason",
+        )
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiting[PLAY]) + len(self._waiting[START])
+
+    def expected_wait(self, priority: int) -> float:
+        """Estimates the wait for a request joining a queue
+
+        A start waits behind every queued request, an action only
+        behind the other queued actions.
+        """
+        ahead = len(self._waiting[PLAY])
+        if priority == START:
+            ahead += len(self._waiting[START])
+        return (ahead + 1) * self.service / self.max_in_flight
+
+    def watch(self) -> None:
+        """Starts measuring the running event loop's lag"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self.lag = 0.0
+            loop.call_later(
+                LAG_INTERVAL, self._tick, loop, loop.time()
+            )
+
+    def _tick(self, loop, start) -> None:
+        now = loop.time()
+        self.lag = max(0.0, now - start - LAG_INTERVAL)
+        if loop is self._loop:
+            loop.call_later(LAG_INTERVAL, self._tick, loop, now)
+
+    def over_game_limit(self) -> bool:
+        return bool(self.max_games) and (
+            self.live_games() >= self.max_games
+        )
+
+    async def acquire(self, priority: int) -> bool:
+        """Waits for a slot
+
+        Returns:
+            bool: True once the request holds a slot, False if it
+                was shed
+        """
+        limit = self.target if priority == PLAY else self.target / 2
+        if self.lag > limit:
+            self.shed.inc("lag")
+            return False
+        if not self.max_in_flight:
+            return True
+        if self.in_flight < self.max_in_flight and not self.waiting:
+            self.in_flight += 1
+            return True
+        if self.expected_wait(priority) > self.target:
+            self.shed.inc("queue")
+            return False
+        queue = self._waiting[priority]
+        future = asyncio.get_running_loop().create_future()
+        queue.append(future)
+        try:
+            await asyncio.wait_for(future, self.target)
+            return True
+        except asyncio.TimeoutError:
+            self._abandon(queue, future)
+            self.shed.inc("timeout")
+            return False
+        except asyncio.CancelledError:
+            self._abandon(queue, future)
+            raise
+
+    def _abandon(self, queue, future) -> None:
+        if future.done() and not future.cancelled():
+            # The slot was handed over as the wait ended
+            self.release()
+        elif future in queue:
+            queue.remove(future)
+
+    def release(self, elapsed=None) -> None:
+        """Frees a slot, handing it to the next waiting request
+
+        Args:
+            elapsed (float, optional): how long the request held
+                its slot, to update the service time
+        """
+        if not self.max_in_flight:
+            return
+        if elapsed is not None:
+            self.service += SMOOTHING * (elapsed - self.service)
+        self.in_flight -= 1
+        for queue in self._waiting:
+            while queue and self.in_flight < self.max_in_flight:
+                future = queue.popleft()
+                if not future.done():
+                    future.set_result(None)
+                    self.in_flight += 1
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying an Admission to HTTP requests"""
+
+    def __init__(self, app, admission: Admission) -> None:
+        self.app = app
+        self.admission = admission
+        self._refusal = orjson.dumps({"detail": "Server busy"})
+        self._headers = [
+            (b"content-type", b"application/json"),
+            (b"retry-after", str(admission.retry_after).encode()),
+        ]
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path")
+        if scope["type"] != "http" or path in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+        admission = self.admission
+        admission.watch()
+        priority = START if path in START_PATHS else PLAY
+        if path in START_PATHS and admission.over_game_limit():
+            admission.shed.inc("games")
+            await self._refuse(send)
+            return
+        if not await admission.acquire(priority):
+            await self._refuse(send)
+            return
+        start = perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admission.release(perf_counter() - start)
+
+    async def _refuse(self, send) -> None:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 503,
+                "headers": self._headers,
+            }
+        )
+        await send(
+            {"type": "http.response.body", "body": self._refusal}
+        )
+
+
+def create_admission(live_games=None, environ=os.environ):
+    """Builds the admission control configured by the environment
+
+    MAX_IN_FLIGHT caps the requests running at once and MAX_GAMES
+    the live games. ADMISSION_TARGET_MS is the longest a request
+    may wait, for the event loop or a slot (default 50), and
+    RETRY_AFTER the seconds sent with a 503 (default 1). Setting
+    any of the first three turns admission control on.
+
+    Args:
+        live_games (callable, optional): returns the number of live
+            games, needed with MAX_GAMES
+
+    Returns:
+        Admission: the admission control, or None when off
+    """
+    max_in_flight = int(environ.get("MAX_IN_FLIGHT", 0))
+    max_games = int(environ.get("MAX_GAMES", 0))
+    target = environ.get("ADMISSION_TARGET_MS")
+    if not max_in_flight and not max_games and target is None:
+        return None
+    return Admission(
+        max_in_flight=max_in_flight,
+        max_games=max_games,
+        live_games=live_games,
+        target=float(target or 50) / 1000,
+        retry_after=int(environ.get("RETRY_AFTER", 1)),
+    )
@@ -0,0 +1,295 @@
+"""Streaming statistics of finished games.
+
+Each finished game's result (Pontoon.check_winner) is put on a
+bounded queue and folded in by a background thread, so the
+request path only pays for an append. A full queue drops the result
+and counts the drop rather than slowing requests.
+
+Everything is kept in fixed memory, each game costing O(1) to add:
+counts of wins, losses and ties, histograms of the player's and the
+dealer's final hand values, and a ring of time buckets giving the
+same counts over a rolling window. Nothing is computed from the game
+store.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+OUTCOMES = ("win", "loss", "tie")
+# Hand values kept apart in the histograms; higher ones share the
+# last bucket. The highest possible is 31, a hit on 21 busted by a
+# court card.
+MAX_VALUE = 31
+
+
+class Outcomes:
+    """Counts, value histograms and rolling windows of game results
+
+    Args:
+        bucket_seconds (float, optional): width of each time
+            bucket. Defaults to 60.
+        buckets (int, optional): buckets in the rolling window.
+            Defaults to 60.
+        clock (callable, optional): time source, for tests.
+    """
+
+    def __init__(
+        self, bucket_seconds=60.0, buckets=60, clock=time.time
+    ) -> None:
+        self.bucket_seconds = bucket_seconds
+        self.clock = clock
+        self.totals = dict.fromkeys(OUTCOMES, 0)
+        self.player_values = [0] * (MAX_VALUE + 1)
+        self.dealer_values = [0] * (MAX_VALUE + 1)
+        # Each bucket is [bucket number, wins, losses, ties]
+        self._ring = [[-1, 0, 0, 0] for _ in range(buckets)]
+        self._lock = threading.Lock()
+
+    def add(self, player_value, dealer_value, status, at) -> None:
+        """Counts one finished game
+
+        Args:
+            player_value (int): the player's final hand value
+            dealer_value (int): the dealer's final hand value
+            status (str): "win", "loss" or "tie"
+            at (float): when the game finished, from the clock
+        """
+        number = int(at // self.bucket_seconds)
+        column = OUTCOMES.index(status) + 1
+        with self._lock:
+            self.totals[status] += 1
+            self.player_values[min(player_value, MAX_VALUE)] += 1
+            self.dealer_values[min(dealer_value, MAX_VALUE)] += 1
+            bucket = self._ring[number % len(self._ring)]
+            if bucket[0] != number:
+                bucket[:] = [number, 0, 0, 0]
+            bucket[column] += 1
+
+    def windows(self) -> list:
+        """Returns the buckets in the rolling window, oldest first"""
+        newest = int(self.clock() // self.bucket_seconds)
+        oldest = newest - len(self._ring) + 1
+        with self._lock:
+            buckets = [
+                list(bucket)
+                for bucket in self._ring
+                if oldest <= bucket[0] <= newest
+            ]
+        buckets.sort()
+        return [
+            _summary(
+                dict(zip(OUTCOMES, counts)),
+                start=number * self.bucket_seconds,
+            )
+            for number, *counts in buckets
+        ]
+
+    def snapshot(self) -> dict:
+        """Returns every statistic, ready to be sent as JSON"""
+        windows = self.windows()
+        recent = dict.fromkeys(OUTCOMES, 0)
+        for window in windows:
+            for status in OUTCOMES:
+                recent[status] += window[status]
+        with self._lock:
+            totals = dict(self.totals)
+            player_values = list(self.player_values)
+            dealer_values = list(self.dealer_values)
+        return {
+            "all_time": _summary(totals),
+            "rolling": _summary(
+                recent,
+                seconds=self.bucket_seconds * len(self._ring),
+            ),
+            "windows": windows,
+            "player_values": player_values,
+            "dealer_values": dealer_values,
+        }
+
+
+def _summary(counts: dict, **extra) -> dict:
+    """Adds the game count and house edge to outcome counts
+
+    The house edge is the dealer's mean winnings per game at even
+    money stakes: (losses - wins) / games.
+    """
+    games = sum(counts.values())
+    edge = (counts["loss"] - counts["win"]) / games if games else 0.0
+    return {**extra, **counts, "games": games, "house_edge": edge}
+
+
+def merge_snapshots(snapshots) -> dict:
+    """Combines the snapshots of several analytics into one
+
+    Counts, histograms and windows starting at the same time are
+    added up and the house edges worked out again, as though every
+    game had been counted in one place. The windows must be the
+    same width in each.
+
+    Args:
+        snapshots (list of dict): as returned by Analytics.snapshot
+    """
+    totals = dict.fromkeys(OUTCOMES, 0)
+    recent = dict.fromkeys(OUTCOMES, 0)
+    windows = {}
+    player_values = [0] * (MAX_VALUE + 1)
+    dealer_values = [0] * (MAX_VALUE + 1)
+    pending = dropped = 0
+    for snapshot in snapshots:
+        for status in OUTCOMES:
+            totals[status] += snapshot["all_time"][status]
+            recent[status] += snapshot["rolling"][status]
+        for window in snapshot["windows"]:
+            counts = windows.setdefault(
+                window["start"], dict.fromkeys(OUTCOMES, 0)
+            )
+            for status in OUTCOMES:
+                counts[status] += window[status]
+        for index, count in enumerate(snapshot["player_values"]):
+            player_values[index] += count
+        for index, count in enumerate(snapshot["dealer_values"]):
+            dealer_values[index] += count
+        pending += snapshot["pending"]
+        dropped += snapshot["dropped"]
+    return {
+        "all_time": _summary(totals),
+        "rolling": _summary(
+            recent, seconds=snapshots[0]["rolling"]["seconds"]
+        ),
+        "windows": [
+            _summary(counts, start=start)
+            for start, counts in sorted(windows.items())
+        ],
+        "player_values": player_values,
+        "dealer_values": dealer_values,
+        "pending": pending,
+        "dropped": dropped,
+    }
+
+
+class Analytics:
+    """Folds game results into Outcomes on a background thread
+
+    Results wait in a deque, which the request path appends to
+    without taking a lock; the thread is only woken when it has
+    run out of work.
+
+    Args:
+        outcomes (Outcomes, optional): where results are counted.
+            Defaults to Outcomes with default windows.
+        max_pending (int, optional): most results queued before
+            new ones are dropped. Defaults to 10000.
+    """
+
+    def __init__(self, outcomes=None, max_pending=10_000) -> None:
+        self.outcomes = Outcomes() if outcomes is None else outcomes
+        self.max_pending = max_pending
+        self.dropped = 0
+        self._pending = deque()
+        self._wake = threading.Event()
+        self._idle = False
+        self._stopped = False
+        self._start_lock = threading.Lock()
+        self._thread = None
+
+    def submit(self, result: dict) -> None:
+        """Queues a finished game's result, never waiting
+
+        Args:
+            result (dict): as returned by Pontoon.check_winner
+        """
+        if self._thread is None:
+            self._start()
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        self._pending.append(
+            (
+                result["player_value"],
+                result["dealer_value"],
+                result["status"],
+                self.outcomes.clock(),
+            )
+        )
+        if self._idle:
+            self._wake.set()
+
+    def _start(self) -> None:
+        with self._start_lock:
+            if self._thread is None:
+                self._stopped = False
+                self._thread = threading.Thread(
+                    target=self._run,
+                    name="analytics",
+                    daemon=True,
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        add = self.outcomes.add
+        pending = self._pending
+        while True:
+            while pending:
+                add(*pending.popleft())
+            if self._stopped:
+                return
+            # Set before looking at the deque again, so a result
+            # appended after the look always wakes the thread
+            self._idle = True
+            if not pending and not self._stopped:
+                self._wake.wait()
+            self._wake.clear()
+            self._idle = False
+
+    def flush(self) -> None:
+        """Waits until every queued result has been counted"""
+        while self._thread is not None and (
+            self._pending or not self._idle
+        ):
+            time.sleep(0.001)
+
+    def snapshot(self) -> dict:
+        stats = self.outcomes.snapshot()
+        stats["pending"] = len(self._pending)
+        stats["dropped"] = self.dropped
+        return stats
+
+    def close(self) -> None:
+        """Counts the queued results and stops the thread"""
+        with self._start_lock:
+            thread, self._thread = self._thread, None
+            if thread is None:
+                return
+            self._stopped = True
+            self._wake.set()
+        thread.join()
+        self._idle = False
+
+
+def create_analytics(environ=os.environ):
+    """Builds the game analytics configured by environment variables
+
+    ANALYTICS=0 turns them off. ANALYTICS_BUCKET_SECONDS and
+    ANALYTICS_BUCKETS set the rolling window (60 buckets of 60
+    seconds by default) and ANALYTICS_MAX_PENDING the most results
+    queued before they are dropped.
+
+    Returns:
+        Analytics: the analytics, or None when turned off
+    """
+    if environ.get("ANALYTICS", "1") == "0":
+        return None
+    outcomes = Outcomes(
+        bucket_seconds=float(
+            environ.get("ANALYTICS_BUCKET_SECONDS", 60)
+        ),
+        buckets=int(environ.get("ANALYTICS_BUCKETS", 60)),
+    )
+    return Analytics(
+        outcomes,
+        max_pending=int(
+            environ.get("ANALYTICS_MAX_PENDING", 10_000)
+        ),
+    )
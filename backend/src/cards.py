@@ -1,8 +1,20 @@
-from collections import deque
+from functools import lru_cache
 from random import shuffle
 
 
 class Card:
+    """A playing card, stored as a small integer code.
+
+    Codes 0 - 51 are the regular cards, ordered by suit then rank
+    ((suit - 1) * 13 + rank - 1). Codes 52 - 55 are jokers, one per
+    suit. Cards are interned: there is exactly one instance per code,
+    so Card(1, 4) always returns the same object, and equal cards are
+    the same object. Cards are immutable and hash by their code, so
+    they can be set members and dict keys.
+    """
+
+    __slots__ = ("rank", "suit", "code")
+
     SUITS = {
         1: "♣",
         2: "♦",
@@ -26,11 +38,32 @@ class Card:
         13: "K",
     }
 
-    def __init__(self, rank: int, suit: int) -> None:
-        if rank not in range(0, 14) or suit not in range(1, 5):
-            raise ValueError("Invalid rank or suit")
-        self.rank = rank
-        self.suit = suit
+    def __new__(cls, rank: int, suit: int) -> "Card":
+        try:
+            return _BY_RANK_SUIT[rank, suit]
+        except (KeyError, TypeError):
+            raise ValueError("Invalid rank or suit") from None
+
+    @classmethod
+    def from_code(cls, code: int) -> "Card":
+        """Returns the interned card for an integer code
+
+        Args:
+            code (int): card code, 0 - 55
+
+        Returns:
+            Card: the card with that code
+        """
+        return _BY_CODE[code]
+
+    def __reduce__(self):
+        return (Card.from_code, (self.code,))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Cards are immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("Cards are immutable")
 
     def __repr__(self) -> str:
         rank_str = self.RANKS.get(self.rank, str(self.rank))
@@ -71,26 +104,194 @@ class Card:
         return rank
 
     def __eq__(self, other):
-        if not isinstance(other, Card):
-            return False
-        return self.suit == other.suit and self.rank == other.rank
+        # Interned, so equal cards are the same object
+        return self is other
+
+    def __hash__(self) -> int:
+        return self.code
+
+
+def encode(rank: int, suit: int) -> int:
+    """Returns the integer code for a rank and suit
 
+    Args:
+        rank (int): rank of card, 0 (joker) - 13
+        suit (int): suit of card, 1 - 4
+
+    Returns:
+        int: card code, 0 - 51, or 52 - 55 for jokers
+    """
+    if rank == 0:
+        return 52 + suit - 1
+    return (suit - 1) * 13 + rank - 1
+
+
+def _intern_cards():
+    by_code = [None] * 56
+    by_rank_suit = {}
+    for suit in Card.SUITS:
+        for rank in Card.RANKS:
+            card = object.__new__(Card)
+            object.__setattr__(card, "rank", rank)
+            object.__setattr__(card, "suit", suit)
+            object.__setattr__(card, "code", encode(rank, suit))
+            by_code[card.code] = card
+            by_rank_suit[rank, suit] = card
+    return tuple(by_code), by_rank_suit
+
+
+_BY_CODE, _BY_RANK_SUIT = _intern_cards()
+
+
+@lru_cache(maxsize=64)
+def _deck_codes(ranks, suits, repeats) -> bytes:
+    return bytes(
+        Card(rank, suit).code
+        for rank in ranks
+        for suit in suits
+        for _ in range(repeats)
+    )
+
+
+class Deck:
+    """An ordered pile of cards, dealt from the right.
+
+    Cards are held as codes in a bytearray, one byte per card, and
+    only turned back into (interned) Card objects when read. The
+    first membership or count query builds a count per code, which
+    the deck then keeps up to date, so later queries are O(1).
+    """
+
+    __slots__ = ("_cards", "_counts")
 
-class Deck(deque):
     def __init__(
         self, ranks=range(1, 14), suits=range(1, 5), repeats=1
     ) -> None:
-        cards = [
-            Card(rank, suit)
-            for rank in ranks
-            for suit in suits
-            for _ in range(repeats)
-        ]
-        deque.__init__(self, cards)
-
-    def shuffle(self) -> None:
-        """Shuffle the Deck in place"""
-        shuffle(self)
+        self._cards = bytearray(
+            _deck_codes(tuple(ranks), tuple(suits), repeats)
+        )
+        self._counts = None
+
+    @classmethod
+    def from_bytes(cls, codes: bytes) -> "Deck":
+        """Creates a deck from a byte string of card codes
+
+        Args:
+            codes (bytes): card codes, bottom of the deck first
+
+        Returns:
+            Deck: a deck holding those cards
+        """
+        deck = cls([])
+        deck._cards[:] = codes
+        return deck
+
+    def _index(self) -> list:
+        """Returns the count of each card code, building it once"""
+        counts = self._counts
+        if counts is None:
+            counts = [0] * len(_BY_CODE)
+            for code in self._cards:
+                counts[code] += 1
+            self._counts = counts
+        return counts
+
+    def to_bytes(self) -> bytes:
+        """Returns the card codes in the deck, bottom first
+
+        Returns:
+            bytes: one byte per card
+        """
+        return bytes(self._cards)
+
+    def __reduce__(self):
+        return (Deck.from_bytes, (bytes(self._cards),))
+
+    def shuffle(self, rng=None) -> None:
+        """Shuffle the Deck in place
+
+        Args:
+            rng (random.Random, optional): source of randomness, for
+                repeatable shuffles. Defaults to the random module.
+        """
+        if rng is None:
+            shuffle(self._cards)
+        else:
+            rng.shuffle(self._cards)
+
+    def pop(self) -> Card:
+        code = self._cards.pop()
+        if self._counts is not None:
+            self._counts[code] -= 1
+        return _BY_CODE[code]
+
+    def popleft(self) -> Card:
+        if not self._cards:
+            raise IndexError("pop from an empty deck")
+        code = self._cards[0]
+        del self._cards[0]
+        if self._counts is not None:
+            self._counts[code] -= 1
+        return _BY_CODE[code]
+
+    def append(self, card: Card) -> None:
+        self._cards.append(card.code)
+        if self._counts is not None:
+            self._counts[card.code] += 1
+
+    def appendleft(self, card: Card) -> None:
+        self._cards.insert(0, card.code)
+        if self._counts is not None:
+            self._counts[card.code] += 1
+
+    def extend(self, cards) -> None:
+        if isinstance(cards, Deck):
+            self._cards += cards._cards
+        else:
+            self._cards += bytes(card.code for card in cards)
+        self._counts = None
+
+    def clear(self) -> None:
+        self._cards.clear()
+        self._counts = None
+
+    def copy(self) -> "Deck":
+        return Deck.from_bytes(self._cards)
+
+    def count(self, card: Card) -> int:
+        if card.__class__ is not Card:
+            return 0
+        return (self._counts or self._index())[card.code]
+
+    def remove(self, card: Card) -> None:
+        if card not in self:
+            raise ValueError(f"{card!r} not in deck")
+        del self._cards[self._cards.index(card.code)]
+        self._counts[card.code] -= 1
+
+    def __len__(self) -> int:
+        return len(self._cards)
+
+    def __iter__(self):
+        return map(_BY_CODE.__getitem__, self._cards)
+
+    def __reversed__(self):
+        return map(_BY_CODE.__getitem__, reversed(self._cards))
+
+    def __getitem__(self, index: int) -> Card:
+        return _BY_CODE[self._cards[index]]
+
+    def __contains__(self, card) -> bool:
+        if card.__class__ is not Card:
+            return False
+        return (self._counts or self._index())[card.code] > 0
+
+    def __eq__(self, other):
+        if not isinstance(other, Deck):
+            return NotImplemented
+        return self._cards == other._cards
+
+    __hash__ = None
 
     def __repr__(self) -> str:
         return f"Deck({len(self)})"
@@ -107,7 +308,10 @@ class Deck(deque):
         Returns:
             Deck: the updated deck
         """
-        self.__add__(other)
+        if not isinstance(other, Deck):
+            raise TypeError("Can only add Deck instances to a Deck")
+        self.extend(other)
+        return self
 
     def __add__(self, other):
         """Add cards from another deck to a new deck
@@ -120,7 +324,4 @@ class Deck(deque):
         """
         if not isinstance(other, Deck):
             raise TypeError("Can only add Deck instances to a Deck")
-        new_deck = Deck([])
-        new_deck.extend(self)
-        new_deck.extend(other)
-        return new_deck
+        return Deck.from_bytes(self._cards + other._cards)
@@ -0,0 +1,172 @@
+"""Server-pushed game updates for WebSocket clients.
+
+Each connection subscribes to a game. When the game changes, every
+subscriber is handed the game's new view and sends its client only
+what differs from the view it last sent. Messages are compact JSON
+objects; cards are integer codes (see cards.Card.from_code):
+
+    {"t": "state", "v": 1, "p": [12, 40], "d": [7], "pv": 12,
+     "dv": null, "go": false, "ps": false, "o": null}
+    {"t": "delta", "v": 2, "p": [3], "pv": 15}
+    {"t": "error", "message": "..."}
+
+"p" and "d" in a delta are cards appended to the player's and the
+dealer's visible hand, "pv"/"dv" hand values, "go" game over, "ps"
+player stuck and "o" the outcome once the game is over.
+
+A subscriber holds only the latest view, not a queue of deltas, so
+a slow client gets one merged delta when it catches up and memory
+per connection stays bounded whatever the update rate.
+"""
+
+import asyncio
+from collections import deque
+
+import orjson
+
+from src.hand_value import hand_value
+
+VIEW_FIELDS = ("pv", "dv", "go", "ps", "o")
+
+
+def view(game) -> dict:
+    """What a client may see of a game, with cards as codes"""
+    over = game.game_over
+    dealer = game.dealer_hand if over else game.dealer_hand[:1]
+    return {
+        "p": bytes(card.code for card in game.player_hand),
+        "d": bytes(card.code for card in dealer),
+        "pv": hand_value(game.player_hand),
+        "dv": hand_value(game.dealer_hand) if over else None,
+        "go": over,
+        "ps": game.player_stuck,
+        "o": game.check_winner()["status"] if over else None,
+    }
+
+
+def snapshot(new: dict) -> dict:
+    return {
+        **new,
+        "t": "state",
+        "p": list(new["p"]),
+        "d": list(new["d"]),
+    }
+
+
+def diff(old: dict, new: dict) -> dict:
+    """Returns the message taking a client from one view to another
+
+    Args:
+        old (dict): the view the client has, or None
+        new (dict): the current view
+
+    Returns:
+        dict: a delta, or a full state message when the hands were
+            replaced rather than added to
+    """
+    if old is None:
+        return snapshot(new)
+    message = {"t": "delta"}
+    for hand in ("p", "d"):
+        if not new[hand].startswith(old[hand]):
+            return snapshot(new)
+        sent = len(old[hand])
+        if len(new[hand]) > sent:
+            message[hand] = list(new[hand][sent:])
+    for field in VIEW_FIELDS:
+        if new[field] != old[field]:
+            message[field] = new[field]
+    return message
+
+
+def dumps(message: dict) -> str:
+    return orjson.dumps(message).decode()
+
+
+class Subscriber:
+    """One connection's place in a game channel
+
+    Args:
+        game: the game at the time of subscribing
+        max_notices (int, optional): most undelivered error
+            notices kept; older ones are dropped. Defaults to 8.
+    """
+
+    def __init__(self, game, max_notices=8) -> None:
+        self.sent = None
+        self.latest = view(game)
+        self.version = 0
+        self.notices = deque(maxlen=max_notices)
+        self.changed = asyncio.Event()
+        self.changed.set()
+
+    def update(self, latest: dict) -> None:
+        self.latest = latest
+        self.changed.set()
+
+    def resync(self) -> None:
+        """Sends the full state with the next message"""
+        self.sent = None
+        self.changed.set()
+
+    def notify(self, message: dict) -> None:
+        self.notices.append(message)
+        self.changed.set()
+
+    def next_messages(self) -> list:
+        """Returns the messages due to the client, in order"""
+        messages = list(self.notices)
+        self.notices.clear()
+        latest = self.latest
+        message = diff(self.sent, latest)
+        if len(message) > 1:
+            self.version += 1
+            message["v"] = self.version
+            messages.append(message)
+        self.sent = latest
+        return messages
+
+    async def send_to(self, send_text) -> None:
+        """Sends updates until cancelled
+
+        Args:
+            send_text (coroutine function): sends one text frame;
+                it is awaited, so a slow client holds back this
+                loop rather than building up a queue
+        """
+        while True:
+            await self.changed.wait()
+            self.changed.clear()
+            for message in self.next_messages():
+                await send_text(dumps(message))
+
+
+class GameChannels:
+    """Registry of subscribers per game"""
+
+    def __init__(self) -> None:
+        self._subscribers = {}
+
+    def subscribe(self, game_id: str, game) -> Subscriber:
+        subscriber = Subscriber(game)
+        self._subscribers.setdefault(game_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, game_id: str, subscriber) -> None:
+        subscribers = self._subscribers.get(game_id)
+        if subscribers is None:
+            return
+        subscribers.discard(subscriber)
+        if not subscribers:
+            del self._subscribers[game_id]
+
+    def publish(self, game_id: str, game) -> None:
+        """Hands a game's new state to everyone watching it"""
+        subscribers = self._subscribers.get(game_id)
+        if subscribers:
+            latest = view(game)
+            for subscriber in subscribers:
+                subscriber.update(latest)
+
+    def __len__(self) -> int:
+        return sum(map(len, self._subscribers.values()))
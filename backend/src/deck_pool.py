@@ -0,0 +1,135 @@
+import os
+import random
+import threading
+import time
+from collections import deque
+
+from src.cards import Deck
+
+
+class DeckPool:
+    """A bounded pool of shuffled decks, refilled in the background
+
+    Building and shuffling a deck is taken off the request path: get
+    hands out a ready deck, and a daemon thread tops the pool back up
+    to its depth. If a burst drains the pool, get falls back to
+    shuffling a deck itself rather than waiting.
+
+    Args:
+        depth (int, optional): most decks held. Defaults to 256.
+        refill_rate (float, optional): most decks shuffled per
+            second by the refill thread, None for no limit.
+            Defaults to None.
+        secure (bool, optional): shuffle with random.SystemRandom
+            (os.urandom) instead of the Mersenne Twister, for
+            audited tables. Defaults to False.
+        deck_factory (callable, optional): builds an unshuffled
+            deck. Defaults to Deck.
+    """
+
+    def __init__(
+        self,
+        depth=256,
+        refill_rate=None,
+        secure=False,
+        deck_factory=Deck,
+    ) -> None:
+        self.depth = depth
+        self.refill_rate = refill_rate
+        self.secure = secure
+        self.deck_factory = deck_factory
+        self.rng = (
+            random.SystemRandom() if secure else random.Random()
+        )
+        self.hits = 0
+        self.misses = 0
+        self._decks = deque()
+        self._wanted = threading.Condition()
+        self._stopped = False
+        self._thread = None
+
+    def make_deck(self) -> Deck:
+        deck = self.deck_factory()
+        deck.shuffle(self.rng)
+        return deck
+
+    def get(self) -> Deck:
+        """Returns a shuffled deck, from the pool when one is ready
+
+        Returns:
+            Deck: a freshly shuffled deck
+        """
+        self._ensure_started()
+        try:
+            deck = self._decks.popleft()
+        except IndexError:
+            self.misses += 1
+            deck = self.make_deck()
+        else:
+            self.hits += 1
+        with self._wanted:
+            self._wanted.notify()
+        return deck
+
+    def fill(self) -> None:
+        """Tops the pool up to its depth on the calling thread"""
+        while len(self._decks) < self.depth:
+            self._decks.append(self.make_deck())
+
+    def __len__(self) -> int:
+        return len(self._decks)
+
+    def _ensure_started(self) -> None:
+        if self._thread is None and self.depth:
+            with self._wanted:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run,
+                        name="deck-pool",
+                        daemon=True,
+                    )
+                    self._thread.start()
+
+    def _run(self) -> None:
+        interval = 1 / self.refill_rate if self.refill_rate else 0
+        while True:
+            with self._wanted:
+                while not self._stopped and len(self) >= self.depth:
+                    self._wanted.wait()
+                if self._stopped:
+                    return
+            self._decks.append(self.make_deck())
+            if interval:
+                time.sleep(interval)
+
+    def close(self) -> None:
+        """Stops the refill thread"""
+        with self._wanted:
+            self._stopped = True
+            self._wanted.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+
+
+def create_deck_pool(environ=os.environ):
+    """Builds the deck pool configured by environment variables
+
+    DECK_POOL_DEPTH sets the pool depth, 0 turns the pool off.
+    DECK_POOL_REFILL_RATE caps decks shuffled per second and
+    DECK_POOL_SECURE=1 shuffles from os.urandom. With both a depth
+    of 0 and DECK_POOL_SECURE=1, a pool holding no decks is still
+    returned, so each deck is shuffled on request from os.urandom.
+
+    Returns:
+        DeckPool: the pool, or None when turned off
+    """
+    depth = int(environ.get("DECK_POOL_DEPTH", 256))
+    secure = environ.get("DECK_POOL_SECURE", "0") == "1"
+    if not depth and not secure:
+        return None
+    rate = environ.get("DECK_POOL_REFILL_RATE")
+    return DeckPool(
+        depth=depth,
+        refill_rate=float(rate) if rate else None,
+        secure=secure,
+    )
@@ -0,0 +1,366 @@
+"""Routes API requests to the shard worker owning each game.
+
+The dispatcher is an ASGI app holding no games itself. It reads the
+game_id (or table_id) from a request's query string or JSON body
+and forwards the request to that id's shard (see src.sharding).
+Starting a game or table goes to the shards in turn. A /batch
+spanning several shards is split, sent to each shard at once and
+its results merged back in order. /stats and /metrics, which are
+about the whole service rather than a game, are sent to every shard
+and their numbers added up.
+
+/export carries no id either, but is not merged: it goes to shard 0
+and covers only that shard's games (see src.export).
+
+WebSockets are not forwarded, as the workers only speak the framed
+request protocol; /ws is refused while sharded.
+
+Start the workers and the dispatcher with
+
+    PYTHONPATH=. python -m src.dispatcher --workers 4 --port 8000
+
+The dispatcher holds no state, so it may itself run as several
+uvicorn workers. Start only the shard workers with --workers-only
+and point uvicorn at their sockets:
+
+    PYTHONPATH=. python -m src.dispatcher --workers 4 \\
+        --workers-only --socket-dir /run/pontoon &
+    DISPATCHER_SOCKETS=/run/pontoon/shard-0.sock,... \\
+        uvicorn src.dispatcher:app --workers 2 --port 8000
+"""
+
+import argparse
+import asyncio
+import itertools
+import multiprocessing
+import os
+import tempfile
+from urllib.parse import parse_qsl
+
+import orjson
+
+from src.analytics import merge_snapshots
+from src.metrics import merge_text
+from src.sharding import (
+    JSON_HEADERS,
+    ShardClient,
+    serve_worker,
+    shard_of,
+)
+
+ID_FIELDS = ("game_id", "table_id")
+START_PATHS = frozenset(("/start", "/table/start"))
+
+
+def _merge_stats(contents) -> bytes:
+    return orjson.dumps(
+        merge_snapshots(list(map(orjson.loads, contents)))
+    )
+
+
+def _merge_metrics(contents) -> bytes:
+    return merge_text(
+        [content.decode() for content in contents]
+    ).encode()
+
+
+# Paths answered by every shard, with how to merge their answers
+FAN_OUT_PATHS = {"/stats": _merge_stats, "/metrics": _merge_metrics}
+
+
+def request_id(query: bytes, body: bytes):
+    """Finds the game or table id a request is about
+
+    Returns:
+        str: the id from the query string, else from the JSON body,
+            or None
+    """
+    if query:
+        for name, value in parse_qsl(query.decode()):
+            if name in ID_FIELDS:
+                return value
+    if body:
+        try:
+            data = orjson.loads(body)
+        except orjson.JSONDecodeError:
+            return None
+        if isinstance(data, dict):
+            for name in ID_FIELDS:
+                if isinstance(data.get(name), str):
+                    return data[name]
+    return None
+
+
+async def read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+class Dispatcher:
+    """ASGI app forwarding each request to its game's shard
+
+    Args:
+        paths (list of str): the shard workers' sockets, by shard
+    """
+
+    def __init__(self, paths) -> None:
+        self.paths = list(paths)
+        self.clients = []
+        self._turns = itertools.cycle(range(len(self.paths)))
+
+    async def connect(self) -> None:
+        clients = [ShardClient(path) for path in self.paths]
+        await asyncio.gather(
+            *(client.connect() for client in clients)
+        )
+        self.clients = clients
+
+    async def close(self) -> None:
+        for client in self.clients:
+            await client.close()
+        self.clients = []
+
+    def shard(self, path: str, query: bytes, body: bytes) -> int:
+        """Returns the shard a request goes to"""
+        if path in START_PATHS:
+            return next(self._turns)
+        shard = shard_of(request_id(query, body))
+        # Ids without a valid shard go to shard 0, which answers
+        # them as it would any unknown id
+        if shard is None or shard >= len(self.clients):
+            return 0
+        return shard
+
+    async def forward(
+        self, shard, method, target, body, headers=JSON_HEADERS
+    ) -> tuple:
+        return await self.clients[shard].request(
+            method, target, body, headers
+        )
+
+    async def batch(
+        self, target: str, body: bytes, headers=JSON_HEADERS
+    ) -> tuple:
+        """Splits a /batch by shard and merges the results"""
+        try:
+            actions = orjson.loads(body)["actions"]
+            shards = [
+                shard_of(action.get("game_id")) for action in actions
+            ]
+        except (
+            orjson.JSONDecodeError,
+            AttributeError,
+            KeyError,
+            TypeError,
+        ):
+            # Shard 0 answers with the validation error
+            return await self.forward(
+                0, "POST", target, body, headers
+            )
+        by_shard = {}
+        for index, shard in enumerate(shards):
+            if shard is None or shard >= len(self.clients):
+                shard = 0
+            by_shard.setdefault(shard, []).append(index)
+        if len(by_shard) <= 1:
+            return await self.forward(
+                next(iter(by_shard), 0),
+                "POST",
+                target,
+                body,
+                headers,
+            )
+        order = list(by_shard.items())
+        responses = await asyncio.gather(
+            *(
+                self.forward(
+                    shard,
+                    "POST",
+                    target,
+                    orjson.dumps(
+                        {"actions": [actions[i] for i in indices]}
+                    ),
+                    headers,
+                )
+                for shard, indices in order
+            )
+        )
+        results = [None] * len(actions)
+        for (_, indices), (status, headers, content) in zip(
+            order, responses
+        ):
+            if status != 200:
+                return status, headers, content
+            parts = orjson.loads(content)["results"]
+            for index, result in zip(indices, parts):
+                results[index] = result
+        return (
+            200,
+            [(b"content-type", b"application/json")],
+            orjson.dumps({"results": results}),
+        )
+
+    async def fan_out(self, path, target, headers) -> tuple:
+        """Sends a GET to every shard and merges the answers"""
+        responses = await asyncio.gather(
+            *(
+                self.forward(shard, "GET", target, b"", headers)
+                for shard in range(len(self.clients))
+            )
+        )
+        for response in responses:
+            if response[0] != 200:
+                return response
+        content_type = dict(responses[0][1]).get(
+            b"content-type", b"application/json"
+        )
+        return (
+            200,
+            [(b"content-type", content_type)],
+            FAN_OUT_PATHS[path](
+                [content for _, _, content in responses]
+            ),
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            await send({"type": "websocket.close", "code": 1008})
+            return
+        body = await read_body(receive)
+        path = scope["path"]
+        query = scope["query_string"]
+        target = f"{path}?{query.decode()}" if query else path
+        method = scope["method"]
+        headers = scope["headers"]
+        try:
+            if path == "/batch" and method == "POST":
+                response = await self.batch(target, body, headers)
+            elif path in FAN_OUT_PATHS and method == "GET":
+                response = await self.fan_out(path, target, headers)
+            else:
+                shard = self.shard(path, query, body)
+                response = await self.forward(
+                    shard, method, target, body, headers
+                )
+        except ConnectionError:
+            response = (
+                503,
+                [(b"content-type", b"text/plain")],
+                b"Shard unavailable",
+            )
+        status, headers, content = response
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": headers,
+            }
+        )
+        await send({"type": "http.response.body", "body": content})
+
+    async def _lifespan(self, receive, send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await self.connect()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.close()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+def start_workers(count: int, directory: str) -> tuple:
+    """Starts one worker process per shard
+
+    Returns:
+        tuple: the processes and their sockets
+    """
+    context = multiprocessing.get_context("spawn")
+    paths = [
+        os.path.join(directory, f"shard-{index}.sock")
+        for index in range(count)
+    ]
+    workers = [
+        context.Process(
+            target=serve_worker,
+            args=(index, count, path),
+            name=f"pontoon-shard-{index}",
+            daemon=True,
+        )
+        for index, path in enumerate(paths)
+    ]
+    for worker in workers:
+        worker.start()
+    return workers, paths
+
+
+def create_dispatcher(environ=os.environ):
+    """Builds a dispatcher for the sockets in DISPATCHER_SOCKETS
+
+    DISPATCHER_SOCKETS lists the shard workers' sockets in shard
+    order, separated by commas.
+
+    Returns:
+        Dispatcher: the dispatcher, or None when not configured
+    """
+    sockets = environ.get("DISPATCHER_SOCKETS")
+    if not sockets:
+        return None
+    return Dispatcher(sockets.split(","))
+
+
+app = create_dispatcher()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Serve the API from one worker per shard"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 1
+    )
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--socket-dir", help="where to put the workers' sockets"
+    )
+    parser.add_argument(
+        "--workers-only",
+        action="store_true",
+        help="start the shard workers without a dispatcher",
+    )
+    args = parser.parse_args(argv)
+    directory = args.socket_dir or tempfile.mkdtemp(
+        prefix="pontoon-"
+    )
+    os.makedirs(directory, exist_ok=True)
+    workers, paths = start_workers(args.workers, directory)
+    try:
+        if args.workers_only:
+            print(
+                "DISPATCHER_SOCKETS=" + ",".join(paths), flush=True
+            )
+            for worker in workers:
+                worker.join()
+        else:
+            import uvicorn
+
+            uvicorn.run(
+                Dispatcher(paths), host=args.host, port=args.port
+            )
+    finally:
+        for worker in workers:
+            worker.terminate()
+            worker.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,488 @@
+"""Append-only event log of Pontoon games, for recovery and audit.
+
+Every game is recorded as a START event carrying the game as dealt
+(serialization.dumps, so the seed or the deck order and both hands),
+then one HIT or STICK event per action. Replaying the events in
+order rebuilds every game exactly.
+
+Records are a fixed header followed by a payload:
+
+    game id (16 byte UUID) | kind | payload length (2) | payload
+
+A record cut short by a crash is ignored when the log is read.
+
+A snapshot is a file of START records, one per game, holding each
+game's state as of an offset into the log; recovery loads the
+latest snapshot and replays only the log after that offset.
+
+The log is rotated at startup and then every snapshot_interval
+seconds or snapshot_bytes of events, whichever comes first: the
+unfinished games are snapshotted as of the end of the log, which is
+archived and replaced by an empty one. Finished games, and games
+the server no longer holds, are left out, so the snapshot and the
+replay at startup stay the size of the games in play.
+
+Archived logs are never overwritten: the first is the log path +
+"-000001", the next "-000002" and so on, so together with the log
+they hold every event ever logged, oldest first (archived_logs).
+"""
+
+import logging
+import os
+import re
+import struct
+import threading
+import time
+import uuid
+
+from src import serialization
+
+START = 1
+HIT = 2
+STICK = 3
+
+RECORD = struct.Struct("<16sBH")
+SNAPSHOT_HEADER = struct.Struct("<4sHQ")
+SNAPSHOT_MAGIC = b"PNTL"
+SNAPSHOT_VERSION = 1
+
+logger = logging.getLogger(__name__)
+
+
+def encode_event(game_id: str, kind: int, payload=b"") -> bytes:
+    return (
+        RECORD.pack(uuid.UUID(game_id).bytes, kind, len(payload))
+        + payload
+    )
+
+
+def read_events(data, offset=0):
+    """Yields (raw game id, kind, payload) for each whole record
+
+    Args:
+        data (bytes): log contents
+        offset (int, optional): where to start reading. Defaults
+            to 0.
+    """
+    end = len(data) - RECORD.size
+    view = memoryview(data)
+    while offset <= end:
+        raw_id, kind, length = RECORD.unpack_from(data, offset)
+        start = offset + RECORD.size
+        offset = start + length
+        if offset > len(data):
+            return
+        yield raw_id, kind, view[start:offset]
+
+
+def iter_events(path: str, offset=0):
+    """Yields the whole records of a log file, as read_events does
+
+    Reads the file a record at a time, so memory does not grow
+    with its size. A missing file has no records.
+    """
+    try:
+        file = open(path, "rb")
+    except FileNotFoundError:
+        return
+    with file:
+        file.seek(offset)
+        while len(header := file.read(RECORD.size)) == RECORD.size:
+            raw_id, kind, length = RECORD.unpack(header)
+            payload = file.read(length)
+            if len(payload) < length:
+                return
+            yield raw_id, kind, payload
+
+
+def apply_event(games: dict, raw_id: bytes, kind: int, payload):
+    """Applies one event to a dict of games keyed by raw UUID bytes
+
+    Returns:
+        Pontoon: the game the event was about, or None if unknown
+    """
+    if kind == START:
+        game = games[raw_id] = serialization.loads(bytes(payload))
+        return game
+    game = games.get(raw_id)
+    if game is None:
+        return None
+    if kind == HIT:
+        game.player_hit()
+    elif kind == STICK and not game.game_over:
+        game.player_stick()
+    return game
+
+
+def apply_events(games: dict, events) -> None:
+    """Applies events to a dict of games keyed by raw UUID bytes"""
+    for event in events:
+        apply_event(games, *event)
+
+
+def _read(path: str, offset=0) -> bytes:
+    try:
+        with open(path, "rb") as file:
+            file.seek(offset)
+            return file.read()
+    except FileNotFoundError:
+        return b""
+
+
+def read_snapshot(path: str) -> tuple:
+    """Loads a snapshot
+
+    Returns:
+        tuple: the games keyed by raw UUID bytes, and the log offset
+            the snapshot was taken at; ({}, 0) if there is none
+    """
+    data = _read(path)
+    if not data:
+        return {}, 0
+    magic, version, offset = SNAPSHOT_HEADER.unpack_from(data)
+    if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+        raise ValueError(f"{path} is not a game log snapshot")
+    games = {}
+    apply_events(games, read_events(data, SNAPSHOT_HEADER.size))
+    return games, offset
+
+
+def write_snapshot(path: str, games: dict, offset: int) -> None:
+    """Writes a snapshot atomically, replacing any previous one
+
+    Args:
+        path (str): snapshot file
+        games (dict): games keyed by raw UUID bytes
+        offset (int): log offset the games are up to date with
+    """
+    temporary = f"{path}.tmp"
+    _write_snapshot_file(temporary, games, offset)
+    os.replace(temporary, path)
+
+
+def _write_snapshot_file(
+    path: str, games: dict, offset: int
+) -> None:
+    dumps = serialization.dumps
+    pack = RECORD.pack
+    parts = [
+        SNAPSHOT_HEADER.pack(
+            SNAPSHOT_MAGIC, SNAPSHOT_VERSION, offset
+        )
+    ]
+    for raw_id, game in games.items():
+        state = dumps(game)
+        parts.append(pack(raw_id, START, len(state)))
+        parts.append(state)
+    with open(path, "wb") as file:
+        file.write(b"".join(parts))
+        file.flush()
+        os.fsync(file.fileno())
+
+
+def rotate(log_path: str, snapshot_path: str, games: dict) -> None:
+    """Snapshots games as of the end of the log and empties the log
+
+    The new snapshot is written beside the old one, the log
+    archived (or removed, if empty), then the snapshot moved into
+    place. A crash between the two leaves the new snapshot with no
+    log, which current_snapshot picks up.
+
+    Args:
+        games (dict): games keyed by raw UUID bytes, up to date with
+            the whole log
+    """
+    temporary = f"{snapshot_path}.tmp"
+    _write_snapshot_file(temporary, games, 0)
+    if os.path.exists(log_path):
+        if os.path.getsize(log_path):
+            numbers = _archive_numbers(log_path)
+            number = numbers[-1] + 1 if numbers else 1
+            os.rename(log_path, archive_path(log_path, number))
+        else:
+            os.remove(log_path)
+    os.replace(temporary, snapshot_path)
+
+
+def archive_path(log_path: str, number: int) -> str:
+    return f"{log_path}-{number:06d}"
+
+
+def _archive_numbers(log_path: str) -> list:
+    directory, name = os.path.split(os.fspath(log_path))
+    pattern = re.compile(re.escape(name) + r"-(\d+)")
+    return sorted(
+        int(match[1])
+        for entry in os.listdir(directory or ".")
+        if (match := pattern.fullmatch(entry))
+    )
+
+
+def archived_logs(log_path: str) -> list:
+    """Returns the log's archived segments, oldest first"""
+    return [
+        archive_path(log_path, number)
+        for number in _archive_numbers(log_path)
+    ]
+
+
+def current_snapshot(log_path: str, snapshot_path: str) -> str:
+    """Returns the snapshot the log follows on from
+
+    That is the snapshot itself, unless a rotation was cut short
+    after renaming the log (see rotate).
+    """
+    temporary = f"{snapshot_path}.tmp"
+    if not os.path.exists(log_path) and os.path.exists(temporary):
+        return temporary
+    return snapshot_path
+
+
+def in_play(games: dict, keep=None) -> dict:
+    """Returns the games that are not over, and kept if keep is given
+
+    Args:
+        games (dict): games keyed by raw UUID bytes
+        keep (callable, optional): called with a game id, returning
+            whether to keep the game
+    """
+    return {
+        raw_id: game
+        for raw_id, game in games.items()
+        if not game.game_over
+        and (keep is None or keep(game_id(raw_id)))
+    }
+
+
+def replay(log_path: str, snapshot_path=None) -> tuple:
+    """Rebuilds every game from a snapshot and the log after it
+
+    Args:
+        log_path (str): the event log
+        snapshot_path (str, optional): a snapshot to start from
+
+    Returns:
+        tuple: the games keyed by raw UUID bytes, and the log offset
+            they are up to date with
+    """
+    games, offset = {}, 0
+    if snapshot_path is not None:
+        games, offset = read_snapshot(snapshot_path)
+    data = _read(log_path, offset)
+    apply_events(games, read_events(data))
+    return games, offset + _complete_length(data)
+
+
+def _complete_length(data: bytes) -> int:
+    """Returns the length of the whole records at the start"""
+    offset = 0
+    end = len(data) - RECORD.size
+    while offset <= end:
+        length = RECORD.unpack_from(data, offset)[2]
+        if offset + RECORD.size + length > len(data):
+            break
+        offset += RECORD.size + length
+    return offset
+
+
+def recover(log_path: str, snapshot_path: str) -> dict:
+    """Restores games at startup
+
+    Replays the log from the latest snapshot, cuts off any record
+    left half written by a crash, so the rotated log holds whole
+    ones, and rotates the log so the next recovery starts here.
+
+    Returns:
+        dict: the games keyed by game id, finished ones included
+    """
+    games, offset = replay(
+        log_path, current_snapshot(log_path, snapshot_path)
+    )
+    if (
+        os.path.exists(log_path)
+        and os.path.getsize(log_path) > offset
+    ):
+        os.truncate(log_path, offset)
+    rotate(log_path, snapshot_path, in_play(games))
+    return {game_id(raw_id): game for raw_id, game in games.items()}
+
+
+def game_id(raw_id: bytes) -> str:
+    return str(uuid.UUID(bytes=raw_id))
+
+
+class EventLog:
+    """Appends events to a log file, syncing them in groups
+
+    append only buffers the record; a background thread writes the
+    buffer and fsyncs it every flush_interval, so a burst of actions
+    costs one write and one fsync, and at most flush_interval of
+    events can be lost in a crash. The same thread rotates the log
+    (see snapshot); events appended meanwhile wait in the buffer.
+
+    Args:
+        path (str): the log file, created if missing
+        flush_interval (float, optional): seconds between group
+            writes. Defaults to 0.005.
+        fsync (bool, optional): fsync after each write. Defaults
+            to True.
+        snapshot_path (str, optional): where the snapshot is kept.
+            Defaults to the log path + ".snapshot".
+        snapshot_interval (float, optional): most seconds between
+            snapshots while events are logged. Defaults to 300.
+        snapshot_bytes (int, optional): bytes of events after which
+            a snapshot is taken. Defaults to 64 MiB.
+        keep (callable, optional): called with a game id,
+            returning whether the server still holds the game;
+            games it does not are left out of snapshots.
+    """
+
+    def __init__(
+        self,
+        path,
+        flush_interval=0.005,
+        fsync=True,
+        snapshot_path=None,
+        snapshot_interval=300.0,
+        snapshot_bytes=64 * 2**20,
+        keep=None,
+    ) -> None:
+        self.path = path
+        self.snapshot_path = snapshot_path or f"{path}.snapshot"
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.snapshot_interval = snapshot_interval
+        self.snapshot_bytes = snapshot_bytes
+        self.keep = keep
+        self.syncs = 0
+        self.snapshots = 0
+        self._file = open(path, "ab")
+        self._logged = self._file.tell()
+        self._snapshot_at = time.monotonic()
+        self._buffer = bytearray()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="event-log-writer", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.flush_interval):
+            try:
+                self.flush()
+                if self._snapshot_due():
+                    self.snapshot()
+            except Exception:
+                # A failed snapshot is tried again next interval
+                logger.exception("Writing the event log failed")
+
+    def _snapshot_due(self) -> bool:
+        if not self._logged:
+            return False
+        return (
+            self._logged >= self.snapshot_bytes
+            or time.monotonic() - self._snapshot_at
+            >= self.snapshot_interval
+        )
+
+    def append(self, game_id: str, kind: int, payload=b"") -> None:
+        record = encode_event(game_id, kind, payload)
+        with self._lock:
+            self._buffer += record
+
+    def recover(self) -> dict:
+        """Restores the logged games; call before appending"""
+        with self._flush_lock:
+            self._file.close()
+            try:
+                return recover(self.path, self.snapshot_path)
+            finally:
+                self._reopen()
+
+    def snapshot(self) -> None:
+        """Snapshots the games in play and rotates the log
+
+        Replays the log from the last snapshot, so it costs time in
+        proportion to the events logged since.
+        """
+        with self._flush_lock:
+            self._flush()
+            games, _ = replay(self.path, self.snapshot_path)
+            self._file.close()
+            try:
+                rotate(
+                    self.path,
+                    self.snapshot_path,
+                    in_play(games, self.keep),
+                )
+            finally:
+                self._reopen()
+            self.snapshots += 1
+
+    def _reopen(self) -> None:
+        self._file = open(self.path, "ab")
+        self._logged = self._file.tell()
+        self._snapshot_at = time.monotonic()
+
+    def start(self, game_id: str, game) -> None:
+        """Records a game as dealt"""
+        self.append(game_id, START, serialization.dumps(game))
+
+    def flush(self) -> None:
+        """Writes and syncs every buffered event"""
+        with self._flush_lock:
+            self._flush()
+
+    def _flush(self) -> None:
+        with self._lock:
+            data = bytes(self._buffer)
+            self._buffer.clear()
+        if not data:
+            return
+        self._file.write(data)
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self._logged += len(data)
+        self.syncs += 1
+
+    def close(self) -> None:
+        self._stopped.set()
+        self._thread.join()
+        self.flush()
+        self._file.close()
+
+
+def create_event_log(environ=os.environ, keep=None):
+    """Opens the event log configured by environment variables
+
+    EVENT_LOG is the log file; without it nothing is logged.
+    EVENT_LOG_FLUSH_INTERVAL sets the seconds between group writes
+    and EVENT_LOG_FSYNC=0 skips fsync. EVENT_LOG_SNAPSHOT_INTERVAL
+    and EVENT_LOG_SNAPSHOT_BYTES set how often the log is rotated.
+
+    Args:
+        keep (callable, optional): see EventLog
+
+    Returns:
+        EventLog: the log, or None when turned off
+    """
+    path = environ.get("EVENT_LOG")
+    if not path:
+        return None
+    return EventLog(
+        path,
+        flush_interval=float(
+            environ.get("EVENT_LOG_FLUSH_INTERVAL", 0.005)
+        ),
+        fsync=environ.get("EVENT_LOG_FSYNC", "1") != "0",
+        snapshot_interval=float(
+            environ.get("EVENT_LOG_SNAPSHOT_INTERVAL", 300)
+        ),
+        snapshot_bytes=int(
+            environ.get("EVENT_LOG_SNAPSHOT_BYTES", 64 * 2**20)
+        ),
+        keep=keep,
+    )
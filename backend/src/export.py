@@ -0,0 +1,369 @@
+"""Streaming bulk export of finished games.
+
+Finished games are walked from the game store through generators and
+grouped into batches of BATCH_ROWS games, each held as columns:
+
+    game_ids      16 byte UUIDs
+    started_at    float64 seconds since the epoch, NaN if unknown
+    finished_at   float64, likewise
+    player_value  uint8 final hand value
+    dealer_value  uint8
+    result        uint8 index into OUTCOMES ("win", "loss", "tie")
+    player_count  uint8 cards in the player's hand
+    dealer_count  uint8
+    player_cards  uint8 card codes of every player hand, in order
+    dealer_cards  uint8 card codes of every dealer hand
+
+A card code is (suit - 1) * 13 + rank - 1, as in cards.Card. Each
+batch is written out and dropped before the next is built, so an
+export's memory does not grow with the number of games.
+
+The binary format is MAGIC, then per batch a BATCH header (rows,
+player cards, dealer cards) and the columns above in that order,
+little endian. NDJSON writes one object per game instead.
+
+Export the configured store (GAME_STORE, DATABASE_URL) to a file
+from the backend directory with
+
+    PYTHONPATH=. python -m src.export games.bin [--format ndjson]
+
+With EVENT_LOG set, the games are replayed from the event log and
+its archives instead (logged_games), which are only read, so every
+game the log has recorded finishing is exported, however long ago.
+
+GET /export streams the event log in the same way when there is
+one, else the server's store, which holds only recent games. Behind
+the dispatcher (src.dispatcher) it is not streamed: the shard's whole
+response is buffered by call_app before it is forwarded, and it
+holds only shard 0's games, as /export carries no game id.
+"""
+
+import argparse
+import math
+import os
+import struct
+import uuid
+from dataclasses import dataclass
+from collections import OrderedDict
+from itertools import chain, islice
+
+import numpy as np
+import orjson
+
+from src import events
+from src.analytics import OUTCOMES
+
+MAGIC = b"PNTX\x01"
+BATCH = struct.Struct("<III")
+BATCH_ROWS = 1024
+COLUMNS = (
+    ("game_ids", np.dtype("V16")),
+    ("started_at", np.dtype("<f8")),
+    ("finished_at", np.dtype("<f8")),
+    ("player_value", np.dtype("u1")),
+    ("dealer_value", np.dtype("u1")),
+    ("result", np.dtype("u1")),
+    ("player_count", np.dtype("u1")),
+    ("dealer_count", np.dtype("u1")),
+)
+# Seconds after its start that a game left unfinished in the event
+# log is taken to be abandoned
+MAX_GAME_AGE = 86400.0
+CONTENT_TYPES = {
+    "binary": "application/octet-stream",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def finished_games(store, batch=1000):
+    """Yields (game_id, game) for every finished game in a store"""
+    for game_id, game in store.items(batch):
+        if game.game_over:
+            yield game_id, game
+
+
+def logged_games(log_path: str, max_age=MAX_GAME_AGE):
+    """Yields (game_id, game) for every finished game in an event log
+
+    The archived logs and then the log are replayed from the start,
+    a record at a time, each game yielded and dropped as it
+    finishes. Only unfinished games are held, and those started
+    max_age seconds before the latest game are dropped as
+    abandoned. No file is changed.
+
+    Args:
+        log_path (str): the event log
+        max_age (float, optional): seconds after which an
+            unfinished game is given up on, None for never.
+            Defaults to MAX_GAME_AGE.
+    """
+    games = OrderedDict()
+    for raw_id, kind, payload in chain.from_iterable(
+        map(events.iter_events, _log_segments(log_path))
+    ):
+        game = events.apply_event(games, raw_id, kind, payload)
+        if game is None:
+            continue
+        if game.game_over:
+            del games[raw_id]
+            yield events.game_id(raw_id), game
+        elif kind == events.START and max_age is not None:
+            _drop_abandoned(games, game.started_at, max_age)
+
+
+def _log_segments(log_path: str):
+    """Yields the archived logs, oldest first, then the log
+
+    The archives are listed again before moving on to the log, so
+    ones rotated out while the others were read are not missed.
+    """
+    read = set()
+    while archives := [
+        path
+        for path in events.archived_logs(log_path)
+        if path not in read
+    ]:
+        for path in archives:
+            read.add(path)
+            yield path
+    yield log_path
+
+
+def _drop_abandoned(games, started_at, max_age) -> None:
+    if started_at is None:
+        return
+    oldest = started_at - max_age
+    while games:
+        first = next(iter(games.values())).started_at
+        if first is None or first >= oldest:
+            return
+        games.popitem(last=False)
+
+
+def _time(value) -> float:
+    return math.nan if value is None else value
+
+
+def _or_none(value: float):
+    return None if math.isnan(value) else value
+
+
+@dataclass(frozen=True)
+class GameBatch:
+    """A batch of finished games as columns (see the module doc)"""
+
+    game_ids: np.ndarray
+    started_at: np.ndarray
+    finished_at: np.ndarray
+    player_value: np.ndarray
+    dealer_value: np.ndarray
+    result: np.ndarray
+    player_count: np.ndarray
+    dealer_count: np.ndarray
+    player_cards: np.ndarray
+    dealer_cards: np.ndarray
+
+    @classmethod
+    def from_games(cls, items) -> "GameBatch":
+        """Builds a batch from (game_id, game) pairs"""
+        items = list(items)
+        results = [game.check_winner() for _, game in items]
+        games = [game for _, game in items]
+        return cls(
+            game_ids=np.frombuffer(
+                b"".join(
+                    uuid.UUID(game_id).bytes for game_id, _ in items
+                ),
+                "V16",
+            ),
+            started_at=np.array(
+                [_time(game.started_at) for game in games], "<f8"
+            ),
+            finished_at=np.array(
+                [_time(game.finished_at) for game in games], "<f8"
+            ),
+            player_value=np.array(
+                [result["player_value"] for result in results], "u1"
+            ),
+            dealer_value=np.array(
+                [result["dealer_value"] for result in results], "u1"
+            ),
+            result=np.array(
+                [
+                    OUTCOMES.index(result["status"])
+                    for result in results
+                ],
+                "u1",
+            ),
+            player_count=np.array(
+                [len(game.player_hand) for game in games], "u1"
+            ),
+            dealer_count=np.array(
+                [len(game.dealer_hand) for game in games], "u1"
+            ),
+            player_cards=np.frombuffer(
+                bytes(
+                    card.code
+                    for game in games
+                    for card in game.player_hand
+                ),
+                "u1",
+            ),
+            dealer_cards=np.frombuffer(
+                bytes(
+                    card.code
+                    for game in games
+                    for card in game.dealer_hand
+                ),
+                "u1",
+            ),
+        )
+
+    def __len__(self) -> int:
+        return len(self.game_ids)
+
+    def to_bytes(self) -> bytes:
+        """Encodes the batch: its header, then each column"""
+        header = BATCH.pack(
+            len(self), len(self.player_cards), len(self.dealer_cards)
+        )
+        columns = [getattr(self, name) for name, _ in COLUMNS]
+        columns += [self.player_cards, self.dealer_cards]
+        return b"".join(
+            [header] + [column.tobytes() for column in columns]
+        )
+
+    @classmethod
+    def from_bytes(cls, data, offset=0) -> tuple:
+        """Decodes a batch without copying its columns
+
+        Returns:
+            tuple: the batch and the offset just past it
+        """
+        rows, n_player, n_dealer = BATCH.unpack_from(data, offset)
+        offset += BATCH.size
+        columns = {}
+        for name, dtype in COLUMNS:
+            columns[name] = np.frombuffer(
+                data, dtype, count=rows, offset=offset
+            )
+            offset += rows * dtype.itemsize
+        for name, count in (
+            ("player_cards", n_player),
+            ("dealer_cards", n_dealer),
+        ):
+            columns[name] = np.frombuffer(
+                data, "u1", count=count, offset=offset
+            )
+            offset += count
+        return cls(**columns), offset
+
+    def records(self):
+        """Yields each game as a dict, with hands as card codes"""
+        player_ends = np.cumsum(self.player_count).tolist()
+        dealer_ends = np.cumsum(self.dealer_count).tolist()
+        player_cards = self.player_cards.tolist()
+        dealer_cards = self.dealer_cards.tolist()
+        started_at = self.started_at.tolist()
+        finished_at = self.finished_at.tolist()
+        player_values = self.player_value.tolist()
+        dealer_values = self.dealer_value.tolist()
+        results = self.result.tolist()
+        player_start = dealer_start = 0
+        for row, game_id in enumerate(self.game_ids.tolist()):
+            player_end = player_ends[row]
+            dealer_end = dealer_ends[row]
+            yield {
+                "game_id": str(uuid.UUID(bytes=game_id)),
+                "player_hand": player_cards[player_start:player_end],
+                "dealer_hand": dealer_cards[dealer_start:dealer_end],
+                "player_value": player_values[row],
+                "dealer_value": dealer_values[row],
+                "result": OUTCOMES[results[row]],
+                "started_at": _or_none(started_at[row]),
+                "finished_at": _or_none(finished_at[row]),
+            }
+            player_start = player_end
+            dealer_start = dealer_end
+
+
+def batches(items, rows=BATCH_ROWS):
+    """Groups (game_id, game) pairs into GameBatches of up to rows"""
+    items = iter(items)
+    while chunk := list(islice(items, rows)):
+        yield GameBatch.from_games(chunk)
+
+
+def binary_chunks(items, rows=BATCH_ROWS):
+    """Yields the binary export of games, a batch per chunk"""
+    yield MAGIC
+    for batch in batches(items, rows):
+        yield batch.to_bytes()
+
+
+def ndjson_chunks(items, rows=BATCH_ROWS):
+    """Yields the NDJSON export of games, a batch per chunk"""
+    for batch in batches(items, rows):
+        yield b"".join(
+            orjson.dumps(record, option=orjson.OPT_APPEND_NEWLINE)
+            for record in batch.records()
+        )
+
+
+CHUNKS = {"binary": binary_chunks, "ndjson": ndjson_chunks}
+
+
+def read_batches(data):
+    """Yields the GameBatches of a binary export
+
+    Args:
+        data (bytes): the whole export, or a memory map of it
+    """
+    if bytes(data[: len(MAGIC)]) != MAGIC:
+        raise ValueError("Not a game export")
+    offset = len(MAGIC)
+    while offset < len(data):
+        batch, offset = GameBatch.from_bytes(data, offset)
+        yield batch
+
+
+def write(file, items, format="binary") -> int:
+    """Writes an export of games to a binary file object
+
+    Returns:
+        int: bytes written
+    """
+    written = 0
+    for chunk in CHUNKS[format](items):
+        written += file.write(chunk)
+    return written
+
+
+def main(argv=None, environ=os.environ) -> None:
+    from src.store import create_store
+
+    parser = argparse.ArgumentParser(
+        description="Export the finished games of the game store"
+    )
+    parser.add_argument("path")
+    parser.add_argument(
+        "--format", choices=sorted(CHUNKS), default="binary"
+    )
+    args = parser.parse_args(argv)
+    log_path = environ.get("EVENT_LOG")
+    store = None if log_path else create_store(environ)
+    if store is None:
+        games = logged_games(log_path)
+    else:
+        games = finished_games(store)
+    try:
+        with open(args.path, "wb") as file:
+            written = write(file, games, args.format)
+    finally:
+        if store is not None:
+            store.close()
+    print(f"{written:,} bytes written to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+import numpy as np
+
+# Points per rank with aces counted low; index 0 is the joker
+RANK_POINTS = (0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 10, 10, 10)
+RANK_POINTS_ARRAY = np.array(RANK_POINTS, dtype=np.int16)
+
+
+def score(hard: int, aces: int) -> int:
+    """Returns the best total for a hand
+
+    Args:
+        hard (int): total of the hand with every ace counted as 1
+        aces (int): number of aces in the hand
+
+    Returns:
+        int: hand total, with one ace counted as 11 where that
+            does not bust the hand
+    """
+    if aces and hard <= 11:
+        return hard + 10
+    return hard
+
+
+def hand_value(hand) -> int:
+    """Returns the total of a hand of cards
+
+    Args:
+        hand (list[Card]): the cards to score, a Hand is scored
+            from its running totals without a rescan
+
+    Returns:
+        int: hand total
+    """
+    if isinstance(hand, Hand):
+        return hand.value
+    hard = 0
+    aces = 0
+    for card in hand:
+        rank = card.rank
+        hard += RANK_POINTS[rank]
+        aces += rank == 1
+    return score(hard, aces)
+
+
+class Hand(list):
+    """A list of cards that keeps its hard total and ace count
+    up to date as cards are added, so scoring never rescans it.
+    """
+
+    __slots__ = ("hard", "aces")
+
+    def __init__(self, cards=()) -> None:
+        list.__init__(self, cards)
+        self._rescore()
+
+    def _rescore(self) -> None:
+        self.hard = 0
+        self.aces = 0
+        for card in self:
+            self._add(card)
+
+    def _add(self, card) -> None:
+        rank = card.rank
+        self.hard += RANK_POINTS[rank]
+        self.aces += rank == 1
+
+    @property
+    def value(self) -> int:
+        return score(self.hard, self.aces)
+
+    @property
+    def soft(self) -> bool:
+        """True if an ace is being counted as 11"""
+        return bool(self.aces) and self.hard <= 11
+
+    def append(self, card) -> None:
+        list.append(self, card)
+        self._add(card)
+
+    def extend(self, cards) -> None:
+        for card in cards:
+            self.append(card)
+
+    def __iadd__(self, cards):
+        self.extend(cards)
+        return self
+
+    def insert(self, index, card) -> None:
+        list.insert(self, index, card)
+        self._add(card)
+
+    def pop(self, index=-1):
+        card = list.pop(self, index)
+        self.hard -= RANK_POINTS[card.rank]
+        self.aces -= card.rank == 1
+        return card
+
+    def remove(self, card) -> None:
+        list.remove(self, card)
+        self.hard -= RANK_POINTS[card.rank]
+        self.aces -= card.rank == 1
+
+    def clear(self) -> None:
+        list.clear(self)
+        self.hard = 0
+        self.aces = 0
+
+    def __setitem__(self, index, value) -> None:
+        list.__setitem__(self, index, value)
+        self._rescore()
+
+    def __delitem__(self, index) -> None:
+        list.__delitem__(self, index)
+        self._rescore()
+
+    def __imul__(self, times):
+        list.__imul__(self, times)
+        self._rescore()
+        return self
+
+    def __reduce__(self):
+        return (Hand, (list(self),))
+
+
+def ranks_array(hands, max_cards: int = None) -> np.ndarray:
+    """Packs hands of cards into a rank array for batch_hand_values
+
+    Args:
+        hands (list[list[Card]]): the hands to pack
+        max_cards (int, optional): width of the array. Defaults to
+            the size of the largest hand.
+
+    Returns:
+        np.ndarray: (n_hands, max_cards) array of ranks, padded
+            with 0
+    """
+    if max_cards is None:
+        max_cards = max((len(hand) for hand in hands), default=0)
+    ranks = np.zeros((len(hands), max_cards), dtype=np.int8)
+    for row, hand in enumerate(hands):
+        ranks[row, : len(hand)] = [card.rank for card in hand]
+    return ranks
+
+
+def batch_hand_values(ranks, return_soft: bool = False):
+    """Scores many hands at once
+
+    Args:
+        ranks (np.ndarray): (n_hands, max_cards) array of card
+            ranks, 1 - 13. Empty slots (and jokers) are 0.
+        return_soft (bool, optional): also return whether each
+            total counts an ace as 11. Defaults to False.
+
+    Returns:
+        np.ndarray: hand totals, one per row; with return_soft,
+            a (totals, soft) tuple
+    """
+    ranks = np.asarray(ranks)
+    hard = RANK_POINTS_ARRAY[ranks].sum(axis=-1)
+    soft = (ranks == 1).any(axis=-1) & (hard <= 11)
+    values = np.where(soft, hard + 10, hard)
+    if return_soft:
+        return values, soft
+    return values
@@ -0,0 +1,31 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+
+class GameLocks:
+    """Per-game asyncio locks
+
+    Actions on one game run one at a time while other games carry
+    on. A game's lock only exists while someone holds or waits on
+    it, so idle games cost nothing.
+    """
+
+    def __init__(self) -> None:
+        self._locks = {}
+
+    @asynccontextmanager
+    async def __call__(self, game_id: str):
+        entry = self._locks.get(game_id)
+        if entry is None:
+            entry = self._locks[game_id] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._locks[game_id]
+
+    def __len__(self) -> int:
+        return len(self._locks)
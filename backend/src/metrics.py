@@ -0,0 +1,434 @@
+"""Service metrics in the Prometheus text exposition format.
+
+Turned on with METRICS=1. Then:
+
+- MetricsMiddleware records a latency histogram per endpoint,
+- instrument() wraps the Pontoon, Deck and serialization hot paths
+  in timers feeding one histogram labelled by path,
+- gauges are read from running counts when /metrics is scraped,
+
+and /metrics serves everything registered in REGISTRY. With metrics
+off nothing is wrapped and no middleware is added, so the request
+path is exactly as it would be without this module.
+"""
+
+import bisect
+import os
+import sys
+import threading
+from functools import wraps
+from time import perf_counter
+
+from src import serialization
+from src.cards import Deck
+from src.pontoon_logic import Pontoon
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds, from 5 µs hot-path calls up to slow requests
+BUCKETS = (
+    0.000005,
+    0.00001,
+    0.000025,
+    0.00005,
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+)
+# Observations a histogram holds before counting them into buckets
+FOLD_AT = 4096
+
+
+def enabled(environ=os.environ) -> bool:
+    return environ.get("METRICS", "0") == "1"
+
+
+def _format(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return (
+        repr(float(value))
+        if isinstance(value, float)
+        else str(value)
+    )
+
+
+def _escape(value) -> str:
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace('"', '\\"')
+        .replace("\n", "\\n")
+    )
+
+
+def _labels(pairs) -> str:
+    inner = ",".join(
+        f'{name}="{_escape(value)}"' for name, value in pairs if name
+    )
+    return "{" + inner + "}" if inner else ""
+
+
+class Histogram:
+    """Counts observations into cumulative buckets, per label value
+
+    Observing only appends to a list per label, which the GIL makes
+    safe without a lock; the lists are counted into buckets when the
+    histogram is read, or once one holds FOLD_AT values.
+
+    Args:
+        name (str): metric name
+        help (str): description for the HELP line
+        label (str, optional): name of the one label distinguishing
+            series, None for a single series
+        buckets (tuple, optional): upper bounds, ascending
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self, name, help, label=None, buckets=BUCKETS
+    ) -> None:
+        self.name = name
+        self.help = help
+        self.label = label
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def pending(self, label_value="") -> list:
+        """Returns the list a label's observations are appended to"""
+        values = self._pending.get(label_value)
+        if values is None:
+            with self._lock:
+                values = self._pending.setdefault(label_value, [])
+        return values
+
+    def observe(self, value: float, label_value="") -> None:
+        values = self.pending(label_value)
+        values.append(value)
+        if len(values) >= FOLD_AT:
+            self.fold()
+
+    def fold(self) -> None:
+        """Counts the pending observations into buckets"""
+        buckets = self.buckets
+        with self._lock:
+            for label_value, values in list(self._pending.items()):
+                taken = len(values)
+                if not taken:
+                    continue
+                observed = values[:taken]
+                # Values appended meanwhile stay for the next fold
+                del values[:taken]
+                series = self._series.get(label_value)
+                if series is None:
+                    series = [[0] * (len(buckets) + 1), 0.0]
+                    self._series[label_value] = series
+                counts = series[0]
+                for value in observed:
+                    counts[bisect.bisect_left(buckets, value)] += 1
+                series[1] += sum(observed)
+
+    def count(self, label_value="") -> int:
+        self.fold()
+        series = self._series.get(label_value)
+        return sum(series[0]) if series else 0
+
+    def samples(self):
+        self.fold()
+        with self._lock:
+            series = {
+                key: (counts[:], total)
+                for key, (counts, total) in self._series.items()
+            }
+        for label_value, (counts, total) in sorted(series.items()):
+            label = (self.label, label_value)
+            cumulative = 0
+            bounds = self.buckets + (float("inf"),)
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                yield (
+                    f"{self.name}_bucket",
+                    (label, ("le", _format(bound))),
+                    cumulative,
+                )
+            yield f"{self.name}_sum", (label,), total
+            yield f"{self.name}_count", (label,), cumulative
+
+
+class Counter:
+    """A count that only goes up, per label value"""
+
+    kind = "counter"
+
+    def __init__(self, name, help, label=None) -> None:
+        self.name = name
+        self.help = help
+        self.label = label
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_value="", amount=1) -> None:
+        with self._lock:
+            self._values[label_value] = (
+                self._values.get(label_value, 0) + amount
+            )
+
+    def value(self, label_value="") -> int:
+        return self._values.get(label_value, 0)
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for label_value, value in values:
+            yield self.name, ((self.label, label_value),), value
+
+
+class Gauge:
+    """A value read from a callback when metrics are scraped
+
+    Args:
+        name (str): metric name
+        help (str): description for the HELP line
+        read (callable): returns the value, or a dict of values by
+            label value
+        label (str, optional): label name when read returns a dict
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name, help, read, label=None) -> None:
+        self.name = name
+        self.help = help
+        self.read = read
+        self.label = label
+
+    def samples(self):
+        value = self.read()
+        if not isinstance(value, dict):
+            value = {"": value}
+        for label_value, item in sorted(value.items()):
+            yield self.name, ((self.label, label_value),), item
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics = {}
+
+    def register(self, metric):
+        """Adds a metric, or returns the one already of that name"""
+        return self._metrics.setdefault(metric.name, metric)
+
+    def get(self, name: str):
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Returns every metric in the text exposition format"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(
+                    f"{name}{_labels(labels)} {_format(value)}"
+                )
+        return "\n".join(lines) + "\n"
+
+
+def _number(value: str):
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+
+def merge_text(texts) -> str:
+    """Adds up the metrics of several processes in the text format
+
+    Samples with the same name and labels are summed, which is right
+    for counters and histograms and, for the gauges here, counts of
+    what each process holds. Each metric keeps its HELP and TYPE
+    lines and its samples stay together, in the order first seen.
+
+    Args:
+        texts (list of str): as returned by Registry.render
+    """
+    families = {}
+    for text in texts:
+        family = None
+        for line in text.splitlines():
+            if line.startswith("# "):
+                name = line.split(" ", 3)[2]
+                family = families.setdefault(name, ({}, {}))
+                family[0].setdefault(line, None)
+            elif line and family is not None:
+                sample, _, value = line.rpartition(" ")
+                samples = family[1]
+                samples[sample] = samples.get(sample, 0) + _number(
+                    value
+                )
+    lines = []
+    for comments, samples in families.values():
+        lines.extend(comments)
+        lines.extend(
+            f"{sample} {_format(value)}"
+            for sample, value in samples.items()
+        )
+    return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUEST_SECONDS = REGISTRY.register(
+    Histogram(
+        "pontoon_request_seconds",
+        "HTTP request latency by endpoint",
+        label="endpoint",
+    )
+)
+HOT_PATH_SECONDS = REGISTRY.register(
+    Histogram(
+        "pontoon_hot_path_seconds",
+        "Time spent in game and deck hot paths",
+        label="path",
+    )
+)
+
+HOT_PATHS = (
+    (Pontoon, "start_game"),
+    (Pontoon, "player_hit"),
+    (Pontoon, "player_stick"),
+    (Deck, "__init__"),
+    (Deck, "shuffle"),
+    (serialization, "dumps"),
+    (serialization, "loads"),
+)
+
+
+def _game_bytes(game) -> int:
+    # Objects a stored game holds; cards are shared singletons
+    return (
+        sys.getsizeof(game)
+        + sys.getsizeof(vars(game))
+        + sys.getsizeof(game.player_hand)
+        + sys.getsizeof(game.dealer_hand)
+        + sys.getsizeof(game.deck)
+        + sys.getsizeof(bytearray(len(game.deck)))
+    )
+
+
+def register_store_gauges(store, live_games, registry=None):
+    """Adds gauges for the games held in a memory store
+
+    Every value comes from counts kept as games are played, so a
+    scrape costs the same however many games are held. Memory is
+    estimated from the size of a newly dealt game.
+
+    Args:
+        store (MemoryGameStore): the store, or the cache in front
+            of a persistent one
+        live_games (LiveGames): the games in play
+        registry (Registry, optional): Defaults to REGISTRY.
+    """
+    registry = REGISTRY if registry is None else registry
+    dealt = Pontoon()
+    dealt.start_game(seed=0)
+    per_game = _game_bytes(dealt)
+
+    def games():
+        held = len(store)
+        live = min(len(live_games), held)
+        return {"live": live, "finished": held - live}
+
+    registry.register(
+        Gauge(
+            "pontoon_games",
+            "Games held in memory by state",
+            games,
+            label="state",
+        )
+    )
+    registry.register(
+        Gauge(
+            "pontoon_store_bytes",
+            "Approximate memory held by stored games",
+            lambda: per_game * len(store),
+        )
+    )
+
+
+def timed(func, histogram, label):
+    """Wraps a function to record its run time"""
+    clock = perf_counter
+    values = histogram.pending(label)
+    append = values.append
+
+    @wraps(func)
+    def timer(*args, **kwargs):
+        start = clock()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            append(clock() - start)
+            if len(values) >= FOLD_AT:
+                histogram.fold()
+
+    return timer
+
+
+def instrument(paths=HOT_PATHS, histogram=HOT_PATH_SECONDS) -> None:
+    """Wraps the hot paths in timers; repeat calls do nothing"""
+    for owner, attribute in paths:
+        func = getattr(owner, attribute)
+        if hasattr(func, "__wrapped__"):
+            continue
+        name = owner.__name__.rpartition(".")[2]
+        label = f"{name}.{attribute}"
+        setattr(owner, attribute, timed(func, histogram, label))
+
+
+def uninstrument(paths=HOT_PATHS) -> None:
+    """Removes the timers added by instrument"""
+    for owner, attribute in paths:
+        func = getattr(owner, attribute)
+        if hasattr(func, "__wrapped__"):
+            setattr(owner, attribute, func.__wrapped__)
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing each HTTP request by route
+
+    Requests are labelled with the route's path template, such as
+    "/hit", so path parameters do not create new series.
+    """
+
+    def __init__(self, app, histogram=REQUEST_SECONDS) -> None:
+        self.app = app
+        self.histogram = histogram
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            elapsed = perf_counter() - start
+            route = scope.get("route")
+            self.histogram.observe(
+                elapsed,
+                route.path if route is not None else "unmatched",
+            )
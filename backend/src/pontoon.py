@@ -1,12 +1,68 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from fastapi import FastAPI, Header, HTTPException, Response
+from fastapi import WebSocket
+from fastapi import WebSocketDisconnect
+from pydantic import BaseModel, Field
+from src.admission import AdmissionMiddleware, LiveGames
+from src.admission import create_admission
+from src.analytics import create_analytics
+from src.channels import GameChannels
+from src.deck_pool import create_deck_pool
+from src.events import HIT, STICK, create_event_log
+from src.export import CHUNKS, CONTENT_TYPES, finished_games
+from src.export import logged_games
+from src import metrics
+from src.locks import GameLocks
 from src.pontoon_logic import Pontoon
-import uuid
+from src.responses import GameJSONResponse, etag_matches
+from src.responses import state_bytes, state_etag, state_fragment
+from src.sharding import create_shard, new_id
+from src.store import MemoryGameStore, create_store
+from src.strategy import load_tables
+from src.table import MAX_SEATS, Table
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Literal
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 
+games = create_store()
+tables = MemoryGameStore()
+game_locks = GameLocks()
+channels = GameChannels()
+deck_pool = create_deck_pool()
+event_log = create_event_log(keep=games.__contains__)
+shard = create_shard()
+analytics = create_analytics()
+live_games = LiveGames(getattr(games, "cache", games).ttl)
 
-app = FastAPI()
-games = {}
+# Most actions accepted in one /batch request
+MAX_BATCH = 1000
+
+
+@asynccontextmanager
+async def lifespan(app):
+    if deck_pool is not None:
+        deck_pool.fill()
+    if event_log is not None:
+        recovered = event_log.recover()
+        games.put_many(recovered.items())
+        for game_id, game in recovered.items():
+            if not game.game_over:
+                live_games.start(game_id)
+    yield
+    if event_log is not None:
+        event_log.close()
+    games.close()
+    if deck_pool is not None:
+        deck_pool.close()
+    if analytics is not None:
+        analytics.close()
+
+
+app = FastAPI(
+    lifespan=lifespan, default_response_class=GameJSONResponse
+)
+strategy_tables = load_tables()
 
 # Allow CORS for all origins (restrict this in a production environment)
 app.add_middleware(
@@ -17,48 +73,387 @@ app.add_middleware(
     allow_headers=["*"],  # List of allowed headers, "*" means all
 )
 
+if metrics.enabled():
+    metrics.instrument()
+    metrics.register_store_gauges(
+        getattr(games, "cache", games), live_games
+    )
+    app.add_middleware(metrics.MetricsMiddleware)
+
+    @app.get("/metrics")
+    async def metrics_endpoint():
+        return Response(
+            metrics.REGISTRY.render(),
+            media_type=metrics.CONTENT_TYPE,
+        )
+
+
+# Added last so it runs first, refusing requests before any work
+admission = create_admission(lambda: len(live_games) + len(tables))
+if admission is not None:
+    app.add_middleware(AdmissionMiddleware, admission=admission)
+    if metrics.enabled():
+        metrics.REGISTRY.register(admission.shed)
+
+
 class GameID(BaseModel):
     game_id: str
 
 
-@app.post("/start")
-def start_game():
-    game_id = str(uuid.uuid4())
-    game = Pontoon()
-    game.start_game()
-    games[game_id] = game
-    return {"game_id": game_id, "game_state": game.get_game_state()}
+def log_event(game_id: str, kind: int) -> None:
+    if event_log is not None:
+        event_log.append(game_id, kind)
 
 
-@app.post("/hit")
-def hit(game_id: GameID):
-    game = games.get(game_id.game_id)
+def finished_game(result: dict) -> bool:
+    """Whether an action's result is the one that ended its game
+
+    A bust or a stick ends a game; a refused action on a game that
+    is already over does not.
+    """
+    return result["status"] == "busted" or "player_value" in result
+
+
+def record_outcome(game_id: str, game, result: dict) -> None:
+    """Takes a game out of play and sends its result to the
+    analytics, if the action just ended it
+    """
+    if not finished_game(result):
+        return
+    live_games.finish(game_id)
+    if analytics is None:
+        return
+    if "player_value" not in result:
+        result = game.check_winner()
+    analytics.submit(result)
+
+
+OTHER_SHARD = "game_id is on another shard"
+
+
+def on_other_shard(game_id: str) -> bool:
+    return shard is not None and not shard.owns(game_id)
+
+
+def check_shard(game_id: str) -> None:
+    if on_other_shard(game_id):
+        raise HTTPException(status_code=421, detail=OTHER_SHARD)
+
+
+async def load_game(game_id: str):
+    check_shard(game_id)
+    game = await games.aget(game_id)
     if not game:
         raise HTTPException(
             status_code=404, detail="Invalid game_id"
         )
+    return game
 
-    result = game.player_hit()
-    return {"result": result, "game_state": game.get_game_state()}
+
+@app.post("/start")
+async def start_game():
+    game_id = new_id(shard)
+    game = Pontoon(deck_provider=deck_pool)
+    game.start_game()
+    await games.aput(game_id, game)
+    live_games.start(game_id)
+    if event_log is not None:
+        event_log.start(game_id, game)
+    return GameJSONResponse(
+        {"game_id": game_id, "game_state": state_fragment(game)}
+    )
+
+
+@app.post("/hit")
+async def hit(game_id: GameID):
+    async with game_locks(game_id.game_id):
+        game = await load_game(game_id.game_id)
+        result = game.player_hit()
+        await games.aput(game_id.game_id, game)
+        if result["status"] != "error":
+            log_event(game_id.game_id, HIT)
+        record_outcome(game_id.game_id, game, result)
+        channels.publish(game_id.game_id, game)
+        return GameJSONResponse(
+            {"result": result, "game_state": state_fragment(game)}
+        )
 
 
 @app.post("/stick")
-def stick(game_id: GameID):
-    game = games.get(game_id.game_id)
-    if not game:
-        raise HTTPException(
-            status_code=404, detail="Invalid game_id"
+async def stick(game_id: GameID):
+    async with game_locks(game_id.game_id):
+        game = await load_game(game_id.game_id)
+        result = game.player_stick()
+        await games.aput(game_id.game_id, game)
+        log_event(game_id.game_id, STICK)
+        record_outcome(game_id.game_id, game, result)
+        channels.publish(game_id.game_id, game)
+        return GameJSONResponse(
+            {"result": result, "game_state": state_fragment(game)}
         )
-    result = game.player_stick()
-    return {"result": result, "game_state": game.get_game_state()}
 
 
 @app.get("/state")
-def state(game_id: str):
-    game = games.get(game_id)
-    if not game:
+async def state(game_id: str, if_none_match: str = Header(None)):
+    """Returns the game state, or 304 if the client has it already
+
+    The ETag changes whenever the state does, so a client polling
+    with If-None-Match gets an empty 304 until then.
+    """
+    async with game_locks(game_id):
+        game = await load_game(game_id)
+        etag = state_etag(game)
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        return GameJSONResponse(
+            state_bytes(game), headers={"ETag": etag}
+        )
+
+
+@app.get("/hint")
+async def hint(game_id: str):
+    async with game_locks(game_id):
+        game = await load_game(game_id)
+        return GameJSONResponse(game.get_hint(strategy_tables))
+
+
+if analytics is not None:
+
+    @app.get("/stats")
+    async def stats():
+        """Returns win, loss and tie rates, the house edge and hand
+        value histograms, all time and over a rolling window
+        """
+        return GameJSONResponse(analytics.snapshot())
+
+
+@app.get("/export")
+async def export(format: Literal["binary", "ndjson"] = "ndjson"):
+    """Streams every finished game, a batch of games per chunk
+
+    The games are replayed from the event log if there is one, so
+    none are missing, else read from the store, as the response is
+    sent; the export is never held in memory whole (see
+    src.export). Behind the dispatcher it is buffered whole and
+    covers only shard 0.
+    """
+    if event_log is not None:
+        finished = logged_games(event_log.path)
+    else:
+        finished = finished_games(games)
+    return StreamingResponse(
+        CHUNKS[format](finished), media_type=CONTENT_TYPES[format]
+    )
+
+
+class NewTable(BaseModel):
+    seats: int = Field(1, ge=1, le=MAX_SEATS)
+
+
+class TableID(BaseModel):
+    table_id: str
+
+
+class SeatAction(TableID):
+    seat: int
+
+
+def load_table(table_id: str):
+    check_shard(table_id)
+    table = tables.get(table_id)
+    if not table:
         raise HTTPException(
-            status_code=404, detail="Invalid game_id"
+            status_code=404, detail="Invalid table_id"
         )
+    return table
+
+
+def table_response(result, table):
+    return GameJSONResponse(
+        {"result": result, "table_state": table.get_table_state()}
+    )
+
+
+@app.post("/table/start")
+async def start_table(new_table: NewTable):
+    table_id = new_id(shard)
+    table = Table(seats=new_table.seats)
+    table.start_round()
+    tables.put(table_id, table)
+    return GameJSONResponse(
+        {
+            "table_id": table_id,
+            "table_state": table.get_table_state(),
+        }
+    )
+
+
+@app.post("/table/deal")
+async def deal_table(table_id: TableID):
+    async with game_locks(table_id.table_id):
+        table = load_table(table_id.table_id)
+        if table.game_over:
+            table.start_round()
+            result = {"status": "success"}
+        else:
+            result = {
+                "status": "error",
+                "message": "The round is not over.",
+            }
+        return table_response(result, table)
+
+
+@app.post("/table/hit")
+async def table_hit(action: SeatAction):
+    async with game_locks(action.table_id):
+        table = load_table(action.table_id)
+        result = table.player_hit(action.seat)
+        return table_response(result, table)
+
+
+@app.post("/table/stick")
+async def table_stick(action: SeatAction):
+    async with game_locks(action.table_id):
+        table = load_table(action.table_id)
+        result = table.player_stick(action.seat)
+        return table_response(result, table)
+
 
-    return game.get_game_state()
+@app.get("/table/state")
+async def table_state(table_id: str):
+    return GameJSONResponse(load_table(table_id).get_table_state())
+
+
+def perform(game_id: str, game, action: str):
+    """Applies a hit or stick to a loaded game
+
+    Returns:
+        tuple: the action's result, or None and an error message
+    """
+    if action == "hit":
+        result = game.player_hit()
+        if result["status"] != "error":
+            log_event(game_id, HIT)
+    elif action == "stick" and not game.game_over:
+        result = game.player_stick()
+        log_event(game_id, STICK)
+    elif action == "stick":
+        return None, "The game is over"
+    else:
+        return None, f"Unknown action {action!r}"
+    record_outcome(game_id, game, result)
+    return result, None
+
+
+async def apply_action(game_id: str, action: str):
+    """Applies a WebSocket action, returning an error or None"""
+    if on_other_shard(game_id):
+        return OTHER_SHARD
+    async with game_locks(game_id):
+        game = await games.aget(game_id)
+        if not game:
+            return "Invalid game_id"
+        result, error = perform(game_id, game, action)
+        if error:
+            return error
+        await games.aput(game_id, game)
+        channels.publish(game_id, game)
+    if result["status"] == "error":
+        return result["message"]
+    return None
+
+
+class BatchItem(BaseModel):
+    game_id: str
+    action: str
+
+
+class Batch(BaseModel):
+    actions: list[BatchItem] = Field(max_length=MAX_BATCH)
+
+
+async def run_game_actions(game_id: str, items, results) -> None:
+    """Applies one game's share of a batch, in order, under its lock
+
+    The game is loaded and saved once however many actions it has.
+    """
+    if on_other_shard(game_id):
+        for index, _ in items:
+            results[index] = {"error": OTHER_SHARD}
+        return
+    async with game_locks(game_id):
+        game = await games.aget(game_id)
+        if not game:
+            for index, _ in items:
+                results[index] = {"error": "Invalid game_id"}
+            return
+        changed = False
+        for index, action in items:
+            if action == "state":
+                results[index] = {"game_state": state_fragment(game)}
+                continue
+            result, error = perform(game_id, game, action)
+            if error:
+                results[index] = {"error": error}
+                continue
+            changed = True
+            results[index] = {
+                "result": result,
+                "game_state": state_fragment(game),
+            }
+        if changed:
+            await games.aput(game_id, game)
+            channels.publish(game_id, game)
+
+
+@app.post("/batch")
+async def batch(batch: Batch):
+    """Applies many actions ("hit", "stick" or "state") at once
+
+    Actions on the same game run in the order given; each item gets
+    its own result or error, in the order of the request.
+    """
+    by_game = {}
+    for index, item in enumerate(batch.actions):
+        by_game.setdefault(item.game_id, []).append(
+            (index, item.action)
+        )
+    results = [None] * len(batch.actions)
+    await asyncio.gather(
+        *(
+            run_game_actions(game_id, items, results)
+            for game_id, items in by_game.items()
+        )
+    )
+    return GameJSONResponse({"results": results})
+
+
+@app.websocket("/ws/{game_id}")
+async def game_socket(websocket: WebSocket, game_id: str):
+    if on_other_shard(game_id):
+        await websocket.close(code=4421, reason=OTHER_SHARD)
+        return
+    game = await games.aget(game_id)
+    if not game:
+        await websocket.close(code=4404, reason="Invalid game_id")
+        return
+    await websocket.accept()
+    subscriber = channels.subscribe(game_id, game)
+    sender = asyncio.create_task(
+        subscriber.send_to(websocket.send_text)
+    )
+    try:
+        while True:
+            message = await websocket.receive_json()
+            action = message.get("action")
+            if action == "state":
+                subscriber.resync()
+                continue
+            error = await apply_action(game_id, action)
+            if error:
+                subscriber.notify({"t": "error", "message": error})
+    except (WebSocketDisconnect, ValueError, AttributeError):
+        pass
+    finally:
+        sender.cancel()
+        channels.unsubscribe(game_id, subscriber)
@@ -1,43 +1,116 @@
+import time
+from operator import attrgetter
+from random import Random
+
 from src.cards import Deck
+from src.hand_value import Hand, hand_value
 
 
 class GameOverException(Exception):
     pass
 
 
+def outcome(player_value, dealer_value):
+    """Settles a player's hand against the dealer's
+
+    Args:
+        player_value (int): value of the player's hand
+        dealer_value (int): value of the dealer's hand
+
+    Returns:
+        dict: status ("win", "loss" or "tie") and message
+    """
+    if player_value > 21:
+        return {"status": "loss", "message": "Dealer wins!"}
+    if dealer_value > 21 or player_value > dealer_value:
+        return {"status": "win", "message": "Player wins!"}
+    if player_value < dealer_value:
+        return {"status": "loss", "message": "Dealer wins!"}
+    return {"status": "tie", "message": "It's a tie!"}
+
+
+def _versioned(name):
+    """A game attribute whose assignment changes the state version"""
+    attribute = f"_{name}"
+
+    def set(self, value):
+        setattr(self, attribute, value)
+        self.version += 1
+
+    return property(attrgetter(attribute), set)
+
+
 class Pontoon:
-    def __init__(self):
-        self.deck = Deck()
-        self.player_hand = []
-        self.dealer_hand = []
+    # Bumped whenever the game's state changes, so views rendered
+    # from it can be cached until then (see cached_view)
+    version = 0
+    _views = None
+    # Seconds since the epoch the game was dealt and was settled
+    started_at = None
+    finished_at = None
+
+    player_hand = _versioned("player_hand")
+    dealer_hand = _versioned("dealer_hand")
+    game_over = _versioned("game_over")
+    player_stuck = _versioned("player_stuck")
+
+    def __init__(self, deck_provider=None):
+        self.deck_provider = deck_provider
+        self.deck = Deck([])
+        self.player_hand = Hand()
+        self.dealer_hand = Hand()
         self.game_over = False
         self.player_stuck = False
+        self.seed = None
 
-    def start_game(self):
-        self.deck = Deck()  # Fresh deck
-        self.deck.shuffle()
-        self.player_hand = [self.deck.pop(), self.deck.pop()]
-        self.dealer_hand = [self.deck.pop(), self.deck.pop()]
+    def start_game(self, seed=None):
+        if seed is None and self.deck_provider is not None:
+            self.deck = self.deck_provider.get()
+        else:
+            self.deck = Deck()  # Fresh deck
+            self.deck.shuffle(None if seed is None else Random(seed))
+        self.seed = seed
+        self.player_hand = Hand([self.deck.pop(), self.deck.pop()])
+        self.dealer_hand = Hand([self.deck.pop(), self.deck.pop()])
         self.game_over = False
         self.player_stuck = False
+        self.started_at = time.time()
+        self.finished_at = None
 
-    def get_hand_value(self, hand):
-        value = 0
-        aces = 0
-        for card in hand:
-            rank = card.get_rank()
-            if rank == 1:  # Ace
-                aces += 1
-                value += 11
-            elif rank > 10:  # Face cards
-                value += 10
-            else:
-                value += rank
-        while value > 21 and aces:
-            value -= 10
-            aces -= 1
+    def __getstate__(self):
+        # Deck providers hold threads and are not saved with a game
+        return {
+            **self.__dict__,
+            "deck_provider": None,
+            "_views": None,
+        }
+
+    def cached_view(self, name: str, render):
+        """Returns render(self), rendering once per state of the game
+
+        Views are kept against the state version, and the hand sizes
+        too, so cards appended to a hand directly are also noticed.
+
+        Args:
+            name (str): the view's name
+            render (callable): renders the view from the game
+        """
+        key = (
+            self.version,
+            len(self._player_hand),
+            len(self._dealer_hand),
+        )
+        views = self._views
+        if views is None or views[0] != key:
+            views = self._views = (key, {})
+        value = views[1].get(name)
+        if value is None:
+            value = views[1][name] = render(self)
         return value
 
+    def get_hand_value(self, hand):
+        return hand_value(hand)
+
     def hit(self, hand):
         hand.append(self.deck.pop())
         return hand
@@ -53,8 +126,10 @@ class Pontoon:
             }
 
         self.hit(self.player_hand)
+        self.version += 1
         if self.is_busted(self.player_hand):
             self.game_over = True
+            self.finished_at = time.time()
             return {
                 "status": "busted",
                 "message": "Player busted!",
@@ -68,6 +143,8 @@ class Pontoon:
         self.player_stuck = True
         self.dealer_turn()
         self.game_over = True
+        self.finished_at = time.time()
+        self.version += 1
         return self.check_winner()
 
     def dealer_turn(self):
@@ -87,26 +164,27 @@ class Pontoon:
             "dealer_value": dealer_value,
         }
 
-        if player_value > 21:
-            result.update(
-                {"status": "loss", "message": "Dealer wins!"}
-            )
-        elif dealer_value > 21 or player_value > dealer_value:
-            result.update(
-                {"status": "win", "message": "Player wins!"}
-            )
-        elif player_value < dealer_value:
-            result.update(
-                {"status": "loss", "message": "Dealer wins!"}
-            )
-        else:
-            result.update(
-                {"status": "tie", "message": "It's a tie!"}
-            )
+        result.update(outcome(player_value, dealer_value))
 
         return result
 
+    def get_hint(self, tables):
+        if self.player_stuck or self.game_over:
+            return {
+                "status": "error",
+                "message": "Game over or player has already stood.",
+            }
+        hand = self.player_hand
+        if not isinstance(hand, Hand):
+            hand = Hand(hand)
+        upcard = self.dealer_hand[0].rank
+        hint = tables.hint(hand.value, hand.soft, upcard)
+        return {"status": "success", **hint}
+
     def get_game_state(self):
+        return dict(self.cached_view("state", Pontoon._game_state))
+
+    def _game_state(self):
         return {
             "player_hand": self.player_hand,
             "dealer_hand": (
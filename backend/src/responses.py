@@ -0,0 +1,129 @@
+"""JSON responses for the game API.
+
+Every card's JSON is rendered once, at import, and spliced into
+responses as a pre-encoded fragment. Game states are built straight
+into bytes by state_bytes, so the generic jsonable_encoder pass is
+skipped entirely, and kept with the game until its state changes
+(see Pontoon.cached_view), as do their ETags.
+"""
+
+from hashlib import blake2b
+
+import orjson
+from fastapi.responses import Response
+
+from src.cards import Card
+from src.hand_value import hand_value
+
+
+def _card_json(card: Card) -> bytes:
+    return orjson.dumps(
+        {
+            "rank": card.rank,
+            "suit": card.suit,
+            "rank_char": card.get_rank_char(),
+            "suit_char": card.get_suit_char(),
+        }
+    )
+
+
+CARD_JSON = tuple(
+    _card_json(Card.from_code(code)) for code in range(56)
+)
+CARD_FRAGMENTS = tuple(orjson.Fragment(data) for data in CARD_JSON)
+
+_BOOLS = (b"false", b"true")
+_HIDDEN = b'"Hidden"'
+_STATE = (
+    b'{"player_hand":%s,"dealer_hand":%s,"player_value":%d,'
+    b'"dealer_value":%s,"game_over":%s,"player_stuck":%s}'
+)
+
+
+def cards_json(cards) -> bytes:
+    """Returns a JSON array of cards"""
+    return b"[%s]" % b",".join([CARD_JSON[c.code] for c in cards])
+
+
+def state_bytes(game) -> bytes:
+    """Returns Pontoon.get_game_state() rendered as JSON
+
+    Args:
+        game (Pontoon): the game to render
+
+    Returns:
+        bytes: the game state document
+    """
+    return game.cached_view("json", _render_state)
+
+
+def _render_state(game) -> bytes:
+    if game.game_over:
+        dealer_hand = cards_json(game.dealer_hand)
+        dealer_value = b"%d" % hand_value(game.dealer_hand)
+    else:
+        dealer_hand = b"[%s,%s]" % (
+            CARD_JSON[game.dealer_hand[0].code],
+            _HIDDEN,
+        )
+        dealer_value = _HIDDEN
+    return _STATE % (
+        cards_json(game.player_hand),
+        dealer_hand,
+        hand_value(game.player_hand),
+        dealer_value,
+        _BOOLS[bool(game.game_over)],
+        _BOOLS[bool(game.player_stuck)],
+    )
+
+
+def state_fragment(game) -> orjson.Fragment:
+    """Returns the game state for nesting in a larger response"""
+    return orjson.Fragment(state_bytes(game))
+
+
+def _render_etag(game) -> str:
+    digest = blake2b(state_bytes(game), digest_size=8).hexdigest()
+    return f'"{digest}"'
+
+
+def state_etag(game) -> str:
+    """Returns an ETag for the game state document"""
+    return game.cached_view("etag", _render_etag)
+
+
+def etag_matches(if_none_match, etag: str) -> bool:
+    """Tells if an If-None-Match header matches an ETag
+
+    Args:
+        if_none_match (str): the header, or None
+        etag (str): the current ETag, quoted
+    """
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def default(obj):
+    if isinstance(obj, Card):
+        return CARD_FRAGMENTS[obj.code]
+    raise TypeError(f"Cannot serialise {type(obj).__name__}")
+
+
+class GameJSONResponse(Response):
+    """JSON response rendered by orjson, with cards from CARD_JSON
+
+    Content already rendered to bytes (see state_bytes) is sent
+    as is.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return orjson.dumps(content, default=default)
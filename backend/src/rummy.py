@@ -0,0 +1,304 @@
+"""Rummy hands and game.
+
+A hand is a 52-bit mask with one bit per card. A card's bit is its
+code (see cards.Card), so each suit is a block of 13 bits, ace low:
+
+    bit = (suit - 1) * 13 + rank - 1
+
+Runs are then consecutive bits within a block and sets are the bits
+13 apart, and both are found with shifts and ands rather than by
+sorting cards. Melds are sets of 3 - 4 cards of a rank and runs of 3
+or more cards of a suit; deadwood is counted with aces as 1 and
+court cards as 10.
+"""
+
+from functools import lru_cache
+from itertools import combinations
+from random import Random
+
+from src.cards import Card, Deck
+from src.hand_value import RANK_POINTS
+
+POINTS = tuple(RANK_POINTS[code % 13 + 1] for code in range(52))
+# Bits at which a run of three can start without leaving its suit
+RUN_STARTS = sum(
+    1 << (suit * 13 + rank)
+    for suit in range(4)
+    for rank in range(11)
+)
+RANK_MASKS = tuple(
+    sum(1 << (suit * 13 + rank) for suit in range(4))
+    for rank in range(13)
+)
+
+
+class InvalidMoveException(Exception):
+    pass
+
+
+def card_bit(card: Card) -> int:
+    if card.rank == 0:
+        raise ValueError("Jokers are not played in rummy")
+    return 1 << card.code
+
+
+def codes(mask: int):
+    """Yields the card codes in a mask, lowest first"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def cards_of(mask: int) -> list:
+    return [Card.from_code(code) for code in codes(mask)]
+
+
+def points(mask: int) -> int:
+    """Returns the deadwood count of the cards in a mask"""
+    return sum(POINTS[code] for code in codes(mask))
+
+
+def meldable(mask: int) -> int:
+    """Returns the cards in a mask that belong to at least one meld
+
+    Args:
+        mask (int): a hand
+
+    Returns:
+        int: mask of the cards in some run or set of the hand
+    """
+    runs = mask & (mask >> 1) & (mask >> 2) & RUN_STARTS
+    found = runs | runs << 1 | runs << 2
+    for rank_mask in RANK_MASKS:
+        same = mask & rank_mask
+        if same.bit_count() >= 3:
+            found |= same
+    return found
+
+
+def _melds_with_lowest(mask: int, low: int):
+    """Yields the melds in a mask containing its lowest card"""
+    # The lowest card can only start a run, never extend one
+    code = low.bit_length() - 1
+    run = bit = low
+    length = 1
+    while code % 13 + length < 13 and mask & (bit << 1):
+        bit <<= 1
+        run |= bit
+        length += 1
+        if length >= 3:
+            yield run
+    others = list(codes(mask & RANK_MASKS[code % 13] & ~low))
+    for size in range(len(others), 1, -1):
+        for chosen in combinations(others, size):
+            yield low | sum(1 << other for other in chosen)
+
+
+@lru_cache(maxsize=1 << 16)
+def _arrange(mask: int) -> tuple:
+    if not mask:
+        return 0, ()
+    low = mask & -mask
+    deadwood, melds = _arrange(mask ^ low)
+    best = deadwood + POINTS[low.bit_length() - 1], melds
+    for meld in _melds_with_lowest(mask, low):
+        deadwood, melds = _arrange(mask ^ meld)
+        if deadwood < best[0]:
+            best = deadwood, (meld,) + melds
+            if not deadwood:
+                break
+    return best
+
+
+def arrange(mask: int) -> tuple:
+    """Finds the arrangement of a hand with the least deadwood
+
+    Cards that cannot be in any meld are set aside as deadwood
+    first. The rest are searched by taking the lowest card and
+    trying it as deadwood and in every meld it can join; results
+    are memoized by mask, so positions reached by different orders
+    of melds, and hands seen on earlier calls, are solved once.
+
+    Args:
+        mask (int): a hand
+
+    Returns:
+        tuple: the deadwood count and a tuple of meld masks
+    """
+    melding = meldable(mask)
+    deadwood, melds = _arrange(melding)
+    return deadwood + points(mask & ~melding), melds
+
+
+class RummyHand:
+    """A rummy hand kept arranged as cards are drawn and discarded
+
+    Drawing a card that cannot join any meld, or discarding a card
+    that was deadwood, updates the deadwood count in O(1); only
+    changes that touch the melds search again.
+
+    Args:
+        cards (iterable of Card, optional): the starting hand
+    """
+
+    def __init__(self, cards=()) -> None:
+        self.mask = 0
+        for card in cards:
+            self._add_bit(card_bit(card))
+        self.deadwood, self._melds = arrange(self.mask)
+
+    def _add_bit(self, bit: int) -> None:
+        if self.mask & bit:
+            raise ValueError("Card already in hand")
+        self.mask |= bit
+
+    def add(self, card: Card) -> None:
+        """Adds a drawn card"""
+        bit = card_bit(card)
+        self._add_bit(bit)
+        if meldable(self.mask) & bit:
+            self.deadwood, self._melds = arrange(self.mask)
+        else:
+            self.deadwood += POINTS[card.code]
+
+    def remove(self, card: Card) -> None:
+        """Removes a discarded card"""
+        bit = card_bit(card)
+        if not self.mask & bit:
+            raise ValueError(f"{card!r} not in hand")
+        self.mask ^= bit
+        if any(meld & bit for meld in self._melds):
+            self.deadwood, self._melds = arrange(self.mask)
+        else:
+            self.deadwood -= POINTS[card.code]
+
+    @property
+    def melds(self) -> list:
+        """The melds of the best arrangement, as lists of cards"""
+        return [cards_of(meld) for meld in self._melds]
+
+    @property
+    def deadwood_cards(self) -> list:
+        melded = 0
+        for meld in self._melds:
+            melded |= meld
+        return cards_of(self.mask & ~melded)
+
+    def best_discard(self) -> tuple:
+        """Returns the discard leaving the least deadwood
+
+        Ties go to the card worth most points.
+
+        Returns:
+            tuple: the card and the deadwood count after discarding
+        """
+        mask = self.mask
+
+        def after(code):
+            return arrange(mask ^ 1 << code)[0], -POINTS[code]
+
+        code = min(codes(mask), key=after)
+        return Card.from_code(code), after(code)[0]
+
+    def __contains__(self, card) -> bool:
+        return (
+            isinstance(card, Card)
+            and card.rank != 0
+            and bool(self.mask & 1 << card.code)
+        )
+
+    def __iter__(self):
+        return iter(cards_of(self.mask))
+
+    def __len__(self) -> int:
+        return self.mask.bit_count()
+
+    def __repr__(self) -> str:
+        return f"RummyHand({cards_of(self.mask)})"
+
+
+class Rummy:
+    """A game of rummy
+
+    Each turn the player draws from the stock or the discard pile,
+    then discards. A player goes out when they discard leaving no
+    deadwood.
+
+    Args:
+        players (int, optional): 2 - 4. Two players are dealt 10
+            cards each, more players 7. Defaults to 2.
+        seed (int, optional): seed for a repeatable shuffle
+    """
+
+    def __init__(self, players=2, seed=None) -> None:
+        if not 2 <= players <= 4:
+            raise ValueError("Rummy is played by 2 - 4 players")
+        self.rng = Random(seed)
+        self.stock = Deck()
+        self.stock.shuffle(self.rng)
+        hand_size = 10 if players == 2 else 7
+        self.hands = [
+            RummyHand(self.stock.pop() for _ in range(hand_size))
+            for _ in range(players)
+        ]
+        self.discard_pile = [self.stock.pop()]
+        self.turn = 0
+        self.drawn = False
+        self.winner = None
+
+    def _check_turn(self, player: int, drawn: bool) -> None:
+        if self.winner is not None:
+            raise InvalidMoveException("The game is over")
+        if player != self.turn:
+            raise InvalidMoveException("Not your turn")
+        if self.drawn != drawn:
+            raise InvalidMoveException(
+                "Discard next" if self.drawn else "Draw first"
+            )
+
+    def draw(self, player: int, from_discard=False) -> Card:
+        """Draws a card into a player's hand
+
+        When the stock runs out, the discard pile under its top card
+        is shuffled to form a new stock.
+
+        Args:
+            player (int): the player drawing
+            from_discard (bool, optional): take the top discard
+                instead of the top of the stock. Defaults to False.
+
+        Returns:
+            Card: the card drawn
+        """
+        self._check_turn(player, drawn=False)
+        if from_discard:
+            if not self.discard_pile:
+                raise InvalidMoveException(
+                    "The discard pile is empty"
+                )
+            card = self.discard_pile.pop()
+        else:
+            if not self.stock:
+                top = self.discard_pile.pop()
+                self.stock.extend(self.discard_pile)
+                self.stock.shuffle(self.rng)
+                self.discard_pile = [top]
+            card = self.stock.pop()
+        self.hands[player].add(card)
+        self.drawn = True
+        return card
+
+    def discard(self, player: int, card: Card) -> None:
+        """Discards a card from a player's hand, ending their turn"""
+        self._check_turn(player, drawn=True)
+        hand = self.hands[player]
+        if card not in hand:
+            raise InvalidMoveException(f"{card!r} not in hand")
+        hand.remove(card)
+        self.discard_pile.append(card)
+        self.drawn = False
+        if not hand.deadwood:
+            self.winner = player
+        else:
+            self.turn = (self.turn + 1) % len(self.hands)
@@ -0,0 +1,118 @@
+"""Compact binary encoding of Pontoon games.
+
+Version 2 layout, all single bytes unless noted:
+
+    version | flags | player cards n | dealer cards n
+    started at (8 byte float, NaN if not dealt)
+    milliseconds played (4, all ones until the game is over)
+    player card codes | dealer card codes | deck
+
+Version 1 games, without the two times, are still read.
+
+Flags are a bitfield of game_over, player_stuck and SEEDED. A seeded
+game stores its deck as the seed (8 bytes) and the number of cards
+dealt from it, so the deck is rebuilt by repeating the shuffle;
+otherwise the remaining deck follows as one byte per card.
+"""
+
+import math
+import struct
+from random import Random
+
+from src.cards import Card, Deck
+from src.hand_value import Hand
+from src.pontoon_logic import Pontoon
+
+VERSION = 2
+HEADER = struct.Struct("<BBBB")
+TIMES = struct.Struct("<dI")
+SEED = struct.Struct("<QB")
+UNFINISHED = 0xFFFFFFFF
+
+GAME_OVER = 1
+PLAYER_STUCK = 2
+SEEDED = 4
+
+FULL_DECK_SIZE = len(Deck())
+_from_code = Card.from_code
+
+
+def dumps(game: Pontoon) -> bytes:
+    """Encodes a game
+
+    Args:
+        game (Pontoon): the game to encode
+
+    Returns:
+        bytes: the encoded game
+    """
+    player = bytes(card.code for card in game.player_hand)
+    dealer = bytes(card.code for card in game.dealer_hand)
+    flags = (
+        game.game_over * GAME_OVER | game.player_stuck * PLAYER_STUCK
+    )
+    seed = game.seed
+    if seed is not None and 0 <= seed < 2**64:
+        flags |= SEEDED
+        deck = SEED.pack(seed, FULL_DECK_SIZE - len(game.deck))
+    else:
+        deck = game.deck.to_bytes()
+    header = HEADER.pack(VERSION, flags, len(player), len(dealer))
+    started = game.started_at
+    played = UNFINISHED
+    if started is None:
+        started = math.nan
+    elif game.finished_at is not None:
+        played = min(
+            round((game.finished_at - started) * 1000),
+            UNFINISHED - 1,
+        )
+    times = TIMES.pack(started, played)
+    return b"".join((header, times, player, dealer, deck))
+
+
+def loads(data: bytes) -> Pontoon:
+    """Decodes a game encoded by dumps
+
+    Args:
+        data (bytes): the encoded game
+
+    Returns:
+        Pontoon: the decoded game
+    """
+    version, flags, n_player, n_dealer = HEADER.unpack_from(data)
+    started = finished = None
+    if version == VERSION:
+        started, played = TIMES.unpack_from(data, HEADER.size)
+        if math.isnan(started):
+            started = None
+        elif played != UNFINISHED:
+            finished = started + played / 1000
+        start = HEADER.size + TIMES.size
+    elif version == 1:
+        start = HEADER.size
+    else:
+        raise ValueError(f"Unsupported game encoding {version}")
+    middle = start + n_player
+    end = middle + n_dealer
+
+    # Every field is set below, so skip building empty hands and deck
+    game = Pontoon.__new__(Pontoon)
+    game.deck_provider = None
+    game.seed = None
+    game.player_hand = Hand(map(_from_code, data[start:middle]))
+    game.dealer_hand = Hand(map(_from_code, data[middle:end]))
+    game.game_over = bool(flags & GAME_OVER)
+    game.player_stuck = bool(flags & PLAYER_STUCK)
+    game.started_at = started
+    game.finished_at = finished
+    if flags & SEEDED:
+        seed, dealt = SEED.unpack_from(data, end)
+        game.seed = seed
+        deck = Deck()
+        deck.shuffle(Random(seed))
+        remaining = FULL_DECK_SIZE - dealt
+        game.deck = Deck.from_bytes(deck.to_bytes()[:remaining])
+    else:
+        game.deck = Deck.from_bytes(data[end:])
+    return game
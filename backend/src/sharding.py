@@ -0,0 +1,390 @@
+"""Game id sharding across worker processes.
+
+Games live in the memory of the process that started them, so with
+several processes every request about a game must reach the one
+that owns it. A sharded game id carries its owner: it is a UUID
+whose first two hex digits are the shard number,
+
+    03c1a7d2-5b1e-4f0a-9d6e-2a8f1c7b9e40  -> shard 3
+
+so a router finds the shard without any shared state.
+
+Each shard is a worker process serving the app over a Unix socket
+with a small framed protocol (see serve_worker). The dispatcher
+(src.dispatcher) accepts HTTP and forwards each request to its
+game's shard; requests starting a game go to the shards in turn.
+"""
+
+import asyncio
+import itertools
+import os
+import struct
+import uuid
+
+MAX_SHARDS = 256
+
+# Request frame: id, method, target length, headers length, body
+# length; then the target (path and query string), the headers as
+# "name: value" lines and the body
+REQUEST = struct.Struct("<IBHHI")
+# Response frame: id, status, headers length, body length; then
+# the headers as "name: value" lines and the body
+RESPONSE = struct.Struct("<IHHI")
+METHODS = (
+    "GET",
+    "POST",
+    "PUT",
+    "PATCH",
+    "DELETE",
+    "HEAD",
+    "OPTIONS",
+)
+METHOD_CODES = {method: code for code, method in enumerate(METHODS)}
+
+
+def shard_of(game_id) -> int:
+    """Returns the shard encoded in a game id, or None if it has none
+
+    Args:
+        game_id (str): a sharded game id
+    """
+    try:
+        uuid.UUID(game_id)
+        return int(game_id[:2], 16)
+    except (TypeError, ValueError):
+        return None
+
+
+class Shard:
+    """This process's place among the shards
+
+    Args:
+        index (int): this shard, 0 - count - 1
+        count (int): number of shards
+    """
+
+    def __init__(self, index: int, count: int) -> None:
+        if not 1 <= count <= MAX_SHARDS:
+            raise ValueError(f"Shards must be 1 - {MAX_SHARDS}")
+        if not 0 <= index < count:
+            raise ValueError(f"Shard {index} is not below {count}")
+        self.index = index
+        self.count = count
+        self._prefix = f"{index:02x}"
+
+    def new_id(self) -> str:
+        """Returns a new game id owned by this shard"""
+        return self._prefix + str(uuid.uuid4())[2:]
+
+    def owns(self, game_id: str) -> bool:
+        return shard_of(game_id) == self.index
+
+
+def new_id(shard=None) -> str:
+    """Returns a new game id, owned by shard if one is given"""
+    return str(uuid.uuid4()) if shard is None else shard.new_id()
+
+
+def create_shard(environ=os.environ):
+    """Reads this process's shard from environment variables
+
+    SHARDS is the number of shards and SHARD this process's index.
+
+    Returns:
+        Shard: the shard, or None when not sharded
+    """
+    count = int(environ.get("SHARDS", 0))
+    if not count:
+        return None
+    return Shard(int(environ.get("SHARD", 0)), count)
+
+
+def encode_headers(headers) -> bytes:
+    return b"\r\n".join(
+        name + b": " + value for name, value in headers
+    )
+
+
+def encode_request(
+    request_id, method, target, headers, body
+) -> bytes:
+    target = target.encode()
+    headers = encode_headers(headers)
+    return (
+        REQUEST.pack(
+            request_id,
+            METHOD_CODES[method],
+            len(target),
+            len(headers),
+            len(body),
+        )
+        + target
+        + headers
+        + body
+    )
+
+
+def encode_response(request_id, status, headers, body) -> bytes:
+    headers = encode_headers(headers)
+    return (
+        RESPONSE.pack(request_id, status, len(headers), len(body))
+        + headers
+        + body
+    )
+
+
+def decode_headers(data: bytes) -> list:
+    return (
+        [tuple(line.split(b": ", 1)) for line in data.split(b"\r\n")]
+        if data
+        else []
+    )
+
+
+# Headers describing how the body was sent, which no longer hold
+# once it has been read whole
+FRAMING_HEADERS = frozenset(
+    (b"content-length", b"transfer-encoding")
+)
+JSON_HEADERS = ((b"content-type", b"application/json"),)
+
+
+async def call_app(
+    app, method, target, body, headers=JSON_HEADERS
+) -> tuple:
+    """Runs one HTTP request through an ASGI app
+
+    Args:
+        headers (list of tuple): the request's (name, value) pairs,
+            names in lower case as in an ASGI scope. The body's
+            content-length is set here.
+
+    Returns:
+        tuple: status, headers and body of the response
+    """
+    path, _, query = target.partition("?")
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": query.encode(),
+        "headers": [
+            (name, value)
+            for name, value in headers
+            if name not in FRAMING_HEADERS
+        ]
+        + [(b"content-length", str(len(body)).encode())],
+        "client": None,
+        "server": None,
+    }
+    response = {"status": 500, "headers": []}
+    chunks = []
+
+    async def receive():
+        return {"type": "http.request", "body": body}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = message.get("headers", [])
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    try:
+        await app(scope, receive, send)
+    except Exception:
+        # The app has already sent its 500 response, if it could
+        if not chunks:
+            return 500, [], b"Internal Server Error"
+    return response["status"], response["headers"], b"".join(chunks)
+
+
+async def _serve_connection(app, reader, writer) -> None:
+    tasks = set()
+
+    async def answer(request_id, method, target, headers, body):
+        status, headers, content = await call_app(
+            app, method, target, body, headers
+        )
+        writer.write(
+            encode_response(request_id, status, headers, content)
+        )
+        await writer.drain()
+
+    try:
+        while True:
+            header = await reader.readexactly(REQUEST.size)
+            (
+                request_id,
+                method,
+                target_length,
+                headers_length,
+                body_length,
+            ) = REQUEST.unpack(header)
+            target = (
+                await reader.readexactly(target_length)
+            ).decode()
+            headers = await reader.readexactly(headers_length)
+            body = await reader.readexactly(body_length)
+            task = asyncio.create_task(
+                answer(
+                    request_id,
+                    METHODS[method],
+                    target,
+                    decode_headers(headers),
+                    body,
+                )
+            )
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve_app(app, path: str, started=None) -> None:
+    """Serves an ASGI app on a Unix socket until cancelled
+
+    Runs the app's lifespan around serving.
+
+    Args:
+        app: the ASGI app
+        path (str): the socket to listen on
+        started (asyncio.Event, optional): set once listening
+    """
+    if os.path.exists(path):
+        os.unlink(path)
+    writers = set()
+
+    async def connected(reader, writer):
+        writers.add(writer)
+        try:
+            await _serve_connection(app, reader, writer)
+        finally:
+            writers.discard(writer)
+
+    async with app.router.lifespan_context(app):
+        server = await asyncio.start_unix_server(connected, path)
+        try:
+            async with server:
+                if started is not None:
+                    started.set()
+                await server.serve_forever()
+        finally:
+            # Closing the server leaves its connections open
+            for writer in writers:
+                writer.close()
+
+
+def serve_worker(index: int, count: int, path: str) -> None:
+    """Runs one shard's worker process
+
+    Sets SHARD and SHARDS before the app is imported, so it mints
+    ids for this shard, and gives each shard its own event log.
+    """
+    os.environ["SHARD"] = str(index)
+    os.environ["SHARDS"] = str(count)
+    if os.environ.get("EVENT_LOG"):
+        os.environ["EVENT_LOG"] += f".{index}"
+    from src.pontoon import app
+
+    try:
+        asyncio.run(serve_app(app, path))
+    except KeyboardInterrupt:
+        pass
+
+
+class ShardClient:
+    """Sends requests to a shard worker over its Unix socket
+
+    Requests are multiplexed on one connection; each carries an id
+    its response is matched by.
+
+    Args:
+        path (str): the worker's socket
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._ids = itertools.count()
+        self._waiting = {}
+        self._writer = None
+        self._reader_task = None
+        self._lost = None
+
+    async def connect(self, timeout=30.0) -> None:
+        """Connects, waiting up to timeout for the worker to start"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            try:
+                reader, self._writer = (
+                    await asyncio.open_unix_connection(self.path)
+                )
+                break
+            except (FileNotFoundError, ConnectionRefusedError):
+                if loop.time() > deadline:
+                    raise
+                await asyncio.sleep(0.05)
+        self._reader_task = asyncio.create_task(self._read(reader))
+
+    async def _read(self, reader) -> None:
+        try:
+            while True:
+                header = await reader.readexactly(RESPONSE.size)
+                request_id, status, headers_length, body_length = (
+                    RESPONSE.unpack(header)
+                )
+                headers = await reader.readexactly(headers_length)
+                body = await reader.readexactly(body_length)
+                future = self._waiting.pop(request_id, None)
+                if future is not None and not future.done():
+                    future.set_result(
+                        (status, decode_headers(headers), body)
+                    )
+        except (
+            asyncio.IncompleteReadError,
+            ConnectionError,
+        ) as error:
+            self._lost = ConnectionError(
+                f"Shard worker closed: {error}"
+            )
+            for future in self._waiting.values():
+                if not future.done():
+                    future.set_exception(self._lost)
+            self._waiting.clear()
+
+    async def request(
+        self, method, target, body=b"", headers=JSON_HEADERS
+    ) -> tuple:
+        """Sends a request and waits for its response
+
+        Args:
+            headers (list of tuple): (name, value) pairs of bytes,
+                passed on to the app
+
+        Returns:
+            tuple: status, headers and body of the response
+        """
+        if self._lost is not None:
+            raise self._lost
+        request_id = next(self._ids) & 0xFFFFFFFF
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[request_id] = future
+        self._writer.write(
+            encode_request(request_id, method, target, headers, body)
+        )
+        await self._writer.drain()
+        return await future
+
+    async def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        if self._reader_task is not None:
+            self._reader_task.cancel()
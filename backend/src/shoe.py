@@ -0,0 +1,111 @@
+import random
+
+from src.cards import Card, Deck
+
+
+class Shoe:
+    """A multi-deck shoe dealt across many rounds
+
+    The shoe is built once from Deck(repeats=decks) and reused: a
+    round starts with get, which reshuffles only once the cut card
+    has been reached. A running count of each rank left in the shoe
+    is kept up to date on every pop, so composition queries never
+    rescan the cards.
+
+    Any number of tables may deal from one shoe by passing it to
+    Pontoon as the deck provider. A reshuffle gathers every card back
+    into the shoe, so cards still on other tables' felt are counted
+    as remaining; as in a casino, shuffle between rounds.
+
+    Args:
+        decks (int, optional): decks in the shoe. Defaults to 6.
+        penetration (float, optional): fraction of the shoe dealt
+            before the cut card comes out. Defaults to 0.75.
+        rng (random.Random, optional): source of randomness.
+            Defaults to a new random.Random.
+        ranks, suits: as for Deck.
+    """
+
+    def __init__(
+        self,
+        decks=6,
+        penetration=0.75,
+        rng=None,
+        ranks=range(1, 14),
+        suits=range(1, 5),
+    ) -> None:
+        if not 0 < penetration <= 1:
+            raise ValueError("penetration must be in (0, 1]")
+        self.decks = decks
+        self.penetration = penetration
+        self.rng = random.Random() if rng is None else rng
+        self._template = Deck(ranks, suits, repeats=decks)
+        self._full_counts = [0] * len(Card.RANKS)
+        for card in self._template:
+            self._full_counts[card.rank] += 1
+        self.size = len(self._template)
+        self.cut = round(self.size * (1 - penetration))
+        self.shuffles = 0
+        self.shuffle()
+
+    def shuffle(self) -> None:
+        """Gathers every card back into the shoe and shuffles it"""
+        self._deck = self._template.copy()
+        self._deck.shuffle(self.rng)
+        self._counts = self._full_counts.copy()
+        self.shuffles += 1
+
+    @property
+    def needs_shuffle(self) -> bool:
+        """True once the cut card has been dealt"""
+        return len(self._deck) <= self.cut
+
+    def get(self) -> "Shoe":
+        """Starts a round, reshuffling if the cut card is out
+
+        Lets a shoe stand in for a DeckPool as a Pontoon deck
+        provider: the game deals from the shoe itself.
+
+        Returns:
+            Shoe: this shoe
+        """
+        if self.needs_shuffle:
+            self.shuffle()
+        return self
+
+    def pop(self) -> Card:
+        """Deals the next card
+
+        An exhausted shoe is reshuffled rather than raising, so a
+        long round never runs out of cards.
+        """
+        if not self._deck:
+            self.shuffle()
+        card = self._deck.pop()
+        self._counts[card.rank] -= 1
+        return card
+
+    def remaining(self, rank: int) -> int:
+        """Returns how many cards of a rank are left in the shoe"""
+        return self._counts[rank]
+
+    def counts(self) -> tuple:
+        """Returns the cards left of each rank, indexed by rank"""
+        return tuple(self._counts)
+
+    def probability(self, rank: int) -> float:
+        """Returns the chance the next card is of a rank"""
+        left = len(self._deck)
+        return self._counts[rank] / left if left else 0.0
+
+    def to_bytes(self) -> bytes:
+        return self._deck.to_bytes()
+
+    def __len__(self) -> int:
+        return len(self._deck)
+
+    def __iter__(self):
+        return iter(self._deck)
+
+    def __repr__(self) -> str:
+        return f"Shoe({self.decks} decks, {len(self)} left)"
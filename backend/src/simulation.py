@@ -0,0 +1,260 @@
+"""Monte Carlo simulation of Pontoon rounds.
+
+Rounds are played in NumPy batches under the same rules as
+pontoon_logic.Pontoon: a fresh shuffled 52 card deck per round,
+two cards each, the player hits until their strategy says stick or
+they bust, then the dealer hits until 17 or more. Work is split into
+fixed-size chunks, each with its own child seed, so results depend
+only on the seed and not on how many worker processes ran them.
+
+Run from the backend directory:
+
+    PYTHONPATH=. python -m src.simulation --rounds 1000000
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.hand_value import RANK_POINTS_ARRAY
+
+CHUNK_SIZE = 100_000
+DEALER_STANDS_ON = 17
+
+RANK_OF_CODE = np.arange(52, dtype=np.int8) % 13 + 1
+POINTS_OF_CODE = RANK_POINTS_ARRAY[RANK_OF_CODE].astype(np.int8)
+
+
+class StandOn:
+    """Player strategy: hit until the hand reaches a total
+
+    Strategies are called with arrays of the player's totals, soft
+    flags and the dealer's face up rank, and return a boolean array
+    that is True where the player hits. They must be picklable to
+    run on a process pool.
+    """
+
+    def __init__(self, total: int = 17) -> None:
+        self.total = total
+
+    def __call__(self, values, soft, upcard):
+        return values < self.total
+
+    def __repr__(self) -> str:
+        return f"StandOn({self.total})"
+
+
+@dataclass(frozen=True)
+class SimulationResult:
+    rounds: int
+    wins: int
+    losses: int
+    ties: int
+    seconds: float = 0.0
+
+    def __add__(self, other):
+        return SimulationResult(
+            self.rounds + other.rounds,
+            self.wins + other.wins,
+            self.losses + other.losses,
+            self.ties + other.ties,
+            max(self.seconds, other.seconds),
+        )
+
+    @property
+    def win_rate(self) -> float:
+        return self.wins / self.rounds if self.rounds else 0.0
+
+    @property
+    def loss_rate(self) -> float:
+        return self.losses / self.rounds if self.rounds else 0.0
+
+    @property
+    def tie_rate(self) -> float:
+        return self.ties / self.rounds if self.rounds else 0.0
+
+    @property
+    def rounds_per_second(self) -> float:
+        return self.rounds / self.seconds if self.seconds else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "rounds": self.rounds,
+            "wins": self.wins,
+            "losses": self.losses,
+            "ties": self.ties,
+            "win_rate": self.win_rate,
+            "loss_rate": self.loss_rate,
+            "tie_rate": self.tie_rate,
+            "seconds": self.seconds,
+            "rounds_per_second": self.rounds_per_second,
+        }
+
+
+def _totals(hard, aces):
+    soft = (aces > 0) & (hard <= 11)
+    return np.where(soft, hard + 10, hard), soft
+
+
+def play_rounds(n_rounds: int, strategy, rng) -> np.ndarray:
+    """Plays a batch of rounds
+
+    Args:
+        n_rounds (int): number of rounds to play
+        strategy (callable): player strategy, see StandOn
+        rng (np.random.Generator): source of the shuffles
+
+    Returns:
+        np.ndarray: (n_rounds, 2) array of final player and dealer
+            totals. The dealer does not draw once the player busts.
+    """
+    decks = rng.permuted(
+        np.tile(np.arange(52, dtype=np.int8), (n_rounds, 1)), axis=1
+    )
+    points = POINTS_OF_CODE[decks]
+    rows = np.arange(n_rounds)
+    next_card = np.full(n_rounds, 4)
+
+    aces = (points == 1).astype(np.int8)
+    player_hard = points[:, 0] + points[:, 1]
+    player_aces = aces[:, 0] + aces[:, 1]
+    dealer_hard = points[:, 2] + points[:, 3]
+    dealer_aces = aces[:, 2] + aces[:, 3]
+    upcard = RANK_OF_CODE[decks[:, 2]]
+
+    def draw(drawing, hard, aces):
+        index = rows[drawing]
+        card = points[index, next_card[index]]
+        hard[index] += card
+        aces[index] += card == 1
+        next_card[index] += 1
+
+    playing = np.ones(n_rounds, dtype=bool)
+    while True:
+        values, soft = _totals(player_hard, player_aces)
+        playing &= values <= 21
+        playing &= strategy(values, soft, upcard)
+        if not playing.any():
+            break
+        draw(playing, player_hard, player_aces)
+    player_values, _ = _totals(player_hard, player_aces)
+
+    dealing = player_values <= 21
+    while True:
+        values, _ = _totals(dealer_hard, dealer_aces)
+        dealing &= values < DEALER_STANDS_ON
+        if not dealing.any():
+            break
+        draw(dealing, dealer_hard, dealer_aces)
+    dealer_values, _ = _totals(dealer_hard, dealer_aces)
+
+    return np.stack([player_values, dealer_values], axis=1)
+
+
+def settle(totals) -> SimulationResult:
+    """Applies Pontoon.check_winner to an array of final totals
+
+    Args:
+        totals (np.ndarray): (n_rounds, 2) player and dealer totals
+
+    Returns:
+        SimulationResult: win, loss and tie counts
+    """
+    player, dealer = totals[:, 0], totals[:, 1]
+    busted = player > 21
+    wins = ~busted & ((dealer > 21) | (player > dealer))
+    ties = ~busted & (dealer <= 21) & (player == dealer)
+    n_wins = int(wins.sum())
+    n_ties = int(ties.sum())
+    return SimulationResult(
+        len(totals), n_wins, len(totals) - n_wins - n_ties, n_ties
+    )
+
+
+def _run_chunk(args) -> SimulationResult:
+    n_rounds, strategy, seed = args
+    rng = np.random.default_rng(seed)
+    return settle(play_rounds(n_rounds, strategy, rng))
+
+
+def _chunks(n_rounds, strategy, seed, chunk_size):
+    sizes = [chunk_size] * (n_rounds // chunk_size)
+    if n_rounds % chunk_size:
+        sizes.append(n_rounds % chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    return [
+        (size, strategy, child) for size, child in zip(sizes, seeds)
+    ]
+
+
+def simulate(
+    n_rounds: int,
+    strategy=None,
+    workers: int = None,
+    seed: int = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> SimulationResult:
+    """Simulates Pontoon rounds across a process pool
+
+    Args:
+        n_rounds (int): number of rounds to play
+        strategy (callable, optional): player strategy. Defaults to
+            StandOn(17), mirroring the dealer.
+        workers (int, optional): worker processes, 1 runs in this
+            process. Defaults to the number of CPUs.
+        seed (int, optional): root seed. Results are the same for
+            a given seed whatever the number of workers.
+        chunk_size (int, optional): rounds per batch.
+
+    Returns:
+        SimulationResult: outcome counts, rates and rounds/sec
+    """
+    if strategy is None:
+        strategy = StandOn()
+    if workers is None:
+        workers = os.cpu_count() or 1
+    chunks = _chunks(n_rounds, strategy, seed, chunk_size)
+    workers = max(1, min(workers, len(chunks)))
+
+    start = time.perf_counter()
+    if workers == 1:
+        results = list(map(_run_chunk, chunks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_run_chunk, chunks))
+    seconds = time.perf_counter() - start
+
+    total = SimulationResult(0, 0, 0, 0)
+    for result in results:
+        total += result
+    return SimulationResult(
+        total.rounds, total.wins, total.losses, total.ties, seconds
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__.split("\n")[0]
+    )
+    parser.add_argument("--rounds", type=int, default=1_000_000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--stand-on", type=int, default=17)
+    args = parser.parse_args(argv)
+
+    result = simulate(
+        args.rounds, StandOn(args.stand_on), args.workers, args.seed
+    )
+    for key, value in result.as_dict().items():
+        if isinstance(value, int):
+            print(f"{key:18}{value:>16,}")
+        else:
+            print(f"{key:18}{value:>16,.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,429 @@
+"""Storage for live games.
+
+Handlers load a game with get, act on it and save it back with put,
+so the same code runs against any backend:
+
+- MemoryGameStore keeps games in process, evicting the least
+  recently used game past a size cap and games idle past a TTL.
+- SQLGameStore keeps games in a database through a pooled
+  SQLAlchemy engine (Postgres via psycopg in production).
+- WriteBehindStore fronts a persistent store with a memory store and
+  writes changed games back in batches from a background thread.
+
+create_store picks one from the environment.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from itertools import islice
+
+from sqlalchemy import (
+    Column,
+    Float,
+    LargeBinary,
+    MetaData,
+    String,
+    Table,
+    create_engine,
+    func,
+    select,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+
+from src import serialization
+
+logger = logging.getLogger(__name__)
+
+
+class GameStore(ABC):
+    @abstractmethod
+    def get(self, game_id: str):
+        """Returns the game for an id, or None if there is none"""
+
+    @abstractmethod
+    def put(self, game_id: str, game) -> None:
+        """Saves a game under an id, replacing any previous state"""
+
+    @abstractmethod
+    def delete(self, game_id: str) -> None:
+        """Removes a game, if it exists"""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+    @abstractmethod
+    def items(self, batch=1000):
+        """Yields every (game_id, game), reading batch at a time"""
+
+    def put_many(self, items) -> None:
+        """Saves several (game_id, game) pairs"""
+        for game_id, game in items:
+            self.put(game_id, game)
+
+    async def aget(self, game_id: str):
+        """Async get, run on a worker thread so a slow backend
+        does not block the event loop"""
+        return await asyncio.to_thread(self.get, game_id)
+
+    async def aput(self, game_id: str, game) -> None:
+        """Async put, run on a worker thread"""
+        await asyncio.to_thread(self.put, game_id, game)
+
+    def __contains__(self, game_id: str) -> bool:
+        return self.get(game_id) is not None
+
+    def close(self) -> None:
+        """Releases any resources held by the store"""
+
+
+class MemoryGameStore(GameStore):
+    """In-process store with LRU and idle-TTL eviction
+
+    Args:
+        max_games (int, optional): most games kept; the least
+            recently used is evicted past this. Defaults to 100000.
+        ttl (float, optional): seconds a game may sit untouched
+            before it is evicted, None to keep games forever.
+            Defaults to one hour.
+        clock (callable, optional): time source, for tests.
+    """
+
+    def __init__(
+        self, max_games=100_000, ttl=3600.0, clock=time.monotonic
+    ) -> None:
+        self.max_games = max_games
+        self.ttl = ttl
+        self.clock = clock
+        self._games = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expire(self, now) -> None:
+        if self.ttl is None:
+            return
+        games = self._games
+        while games:
+            game_id, (_, touched) = next(iter(games.items()))
+            if now - touched < self.ttl:
+                break
+            del games[game_id]
+
+    def get(self, game_id: str):
+        now = self.clock()
+        with self._lock:
+            entry = self._games.get(game_id)
+            if entry is None:
+                return None
+            game, touched = entry
+            if self.ttl is not None and now - touched >= self.ttl:
+                del self._games[game_id]
+                return None
+            self._games[game_id] = (game, now)
+            self._games.move_to_end(game_id)
+            return game
+
+    def put(self, game_id: str, game) -> None:
+        now = self.clock()
+        with self._lock:
+            self._games[game_id] = (game, now)
+            self._games.move_to_end(game_id)
+            self._expire(now)
+            while len(self._games) > self.max_games:
+                self._games.popitem(last=False)
+
+    def delete(self, game_id: str) -> None:
+        with self._lock:
+            self._games.pop(game_id, None)
+
+    def items(self, batch=1000):
+        """Yields every (game_id, game), least recently used first
+
+        Only the ids are copied up front. The games are looked up a
+        batch at a time as the walk reaches them, without counting
+        as a use, and games removed by then are skipped.
+        """
+        with self._lock:
+            game_ids = list(self._games)
+        remaining = iter(game_ids)
+        while chunk := list(islice(remaining, batch)):
+            with self._lock:
+                found = [
+                    (game_id, self._games.get(game_id))
+                    for game_id in chunk
+                ]
+            for game_id, entry in found:
+                if entry is not None:
+                    yield game_id, entry[0]
+
+    def __contains__(self, game_id: str) -> bool:
+        """Whether a game is held, without counting as a use"""
+        with self._lock:
+            entry = self._games.get(game_id)
+        return entry is not None and (
+            self.ttl is None or self.clock() - entry[1] < self.ttl
+        )
+
+    async def aget(self, game_id: str):
+        return self.get(game_id)
+
+    async def aput(self, game_id: str, game) -> None:
+        self.put(game_id, game)
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._expire(self.clock())
+            return len(self._games)
+
+
+def _database_url(url: str) -> str:
+    # psycopg 3 is the installed driver, SQLAlchemy defaults to 2
+    return url.replace("postgresql://", "postgresql+psycopg://", 1)
+
+
+class SQLGameStore(GameStore):
+    """Persistent store in a SQL database
+
+    Args:
+        url (str): SQLAlchemy database URL
+        table_name (str, optional): table holding the games.
+            Defaults to "games".
+        **engine_options: passed to create_engine. Postgres engines
+            default to a pool of 10 with 20 overflow connections.
+    """
+
+    def __init__(
+        self, url: str, table_name="games", **engine_options
+    ):
+        url = _database_url(url)
+        if not url.startswith("sqlite"):
+            engine_options.setdefault("pool_size", 10)
+            engine_options.setdefault("max_overflow", 20)
+            engine_options.setdefault("pool_pre_ping", True)
+        self.engine = create_engine(url, **engine_options)
+        self.table = Table(
+            table_name,
+            MetaData(),
+            Column("game_id", String(64), primary_key=True),
+            Column("state", LargeBinary, nullable=False),
+            Column("updated_at", Float, nullable=False),
+        )
+        self.table.metadata.create_all(self.engine)
+
+    def get(self, game_id: str):
+        query = select(self.table.c.state).where(
+            self.table.c.game_id == game_id
+        )
+        with self.engine.connect() as connection:
+            state = connection.execute(query).scalar()
+        return None if state is None else serialization.loads(state)
+
+    def put(self, game_id: str, game) -> None:
+        self.put_many([(game_id, game)])
+
+    def put_many(self, items) -> None:
+        now = time.time()
+        rows = [
+            {
+                "game_id": game_id,
+                "state": serialization.dumps(game),
+                "updated_at": now,
+            }
+            for game_id, game in items
+        ]
+        if not rows:
+            return
+        with self.engine.begin() as connection:
+            connection.execute(self._upsert(), rows)
+
+    def _upsert(self):
+        dialect = self.engine.dialect.name
+        if dialect == "postgresql":
+            statement = postgresql.insert(self.table)
+        elif dialect == "sqlite":
+            statement = sqlite.insert(self.table)
+        else:
+            raise NotImplementedError(f"No upsert for {dialect}")
+        return statement.on_conflict_do_update(
+            index_elements=[self.table.c.game_id],
+            set_={
+                "state": statement.excluded.state,
+                "updated_at": statement.excluded.updated_at,
+            },
+        )
+
+    def items(self, batch=1000):
+        """Yields every (game_id, game), streaming rows from the
+        database batch at a time"""
+        query = select(self.table.c.game_id, self.table.c.state)
+        with self.engine.connect() as connection:
+            rows = connection.execution_options(
+                yield_per=batch
+            ).execute(query)
+            for game_id, state in rows:
+                yield game_id, serialization.loads(state)
+
+    def delete(self, game_id: str) -> None:
+        with self.engine.begin() as connection:
+            connection.execute(
+                self.table.delete().where(
+                    self.table.c.game_id == game_id
+                )
+            )
+
+    def __len__(self) -> int:
+        with self.engine.connect() as connection:
+            return connection.execute(
+                select(func.count()).select_from(self.table)
+            ).scalar()
+
+    def close(self) -> None:
+        self.engine.dispose()
+
+
+class WriteBehindStore(GameStore):
+    """Memory cache in front of a persistent store
+
+    Reads are served from the cache when possible. Writes go to the
+    cache at once and are written to the backend in batches by a
+    background thread, so a burst of actions on a hot game costs one
+    database write.
+
+    Args:
+        backend (GameStore): the persistent store
+        cache (MemoryGameStore, optional): the cache. Defaults to a
+            MemoryGameStore with default limits.
+        flush_interval (float, optional): seconds between batch
+            writes. Defaults to 0.5.
+        max_batch (int, optional): most games per write. Defaults
+            to 500.
+    """
+
+    def __init__(
+        self, backend, cache=None, flush_interval=0.5, max_batch=500
+    ) -> None:
+        self.backend = backend
+        self.cache = MemoryGameStore() if cache is None else cache
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._dirty = {}
+        self._writing = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="game-store-writer", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                # The games stay dirty and are retried next time
+                logger.exception("Writing games to the store failed")
+
+    def _take_batch(self) -> bool:
+        with self._lock:
+            pending = list(islice(self._dirty, self.max_batch))
+            for game_id in pending:
+                self._writing[game_id] = self._dirty.pop(game_id)
+        return bool(pending)
+
+    def flush(self) -> None:
+        """Writes every pending game to the backend"""
+        with self._flush_lock:
+            while self._take_batch():
+                try:
+                    self.backend.put_many(self._writing.items())
+                except Exception:
+                    with self._lock:
+                        for game_id, game in self._writing.items():
+                            self._dirty.setdefault(game_id, game)
+                    raise
+                finally:
+                    with self._lock:
+                        self._writing.clear()
+
+    def get(self, game_id: str):
+        game = self.cache.get(game_id)
+        if game is not None:
+            return game
+        with self._lock:
+            game = self._dirty.get(game_id)
+            if game is None:
+                game = self._writing.get(game_id)
+        if game is None:
+            game = self.backend.get(game_id)
+        if game is not None:
+            self.cache.put(game_id, game)
+        return game
+
+    def put(self, game_id: str, game) -> None:
+        self.cache.put(game_id, game)
+        with self._lock:
+            self._dirty[game_id] = game
+
+    async def aget(self, game_id: str):
+        game = self.cache.get(game_id)
+        if game is None:
+            game = await asyncio.to_thread(self.get, game_id)
+        return game
+
+    async def aput(self, game_id: str, game) -> None:
+        self.put(game_id, game)
+
+    def delete(self, game_id: str) -> None:
+        self.cache.delete(game_id)
+        with self._lock:
+            self._dirty.pop(game_id, None)
+        self.backend.delete(game_id)
+
+    def __contains__(self, game_id: str) -> bool:
+        if game_id in self.cache:
+            return True
+        with self._lock:
+            if game_id in self._dirty or game_id in self._writing:
+                return True
+        return game_id in self.backend
+
+    def __len__(self) -> int:
+        self.flush()
+        return len(self.backend)
+
+    def items(self, batch=1000):
+        self.flush()
+        return self.backend.items(batch)
+
+    def close(self) -> None:
+        self._stopped.set()
+        self._thread.join()
+        self.flush()
+        self.backend.close()
+
+
+def create_store(environ=os.environ) -> GameStore:
+    """Builds the game store configured by environment variables
+
+    GAME_STORE is "memory" (the default) or "sql". The memory store,
+    and the cache in front of the SQL store, are sized by
+    GAME_STORE_MAX_GAMES and GAME_STORE_TTL (seconds). The SQL store
+    connects to DATABASE_URL.
+    """
+    cache = MemoryGameStore(
+        max_games=int(environ.get("GAME_STORE_MAX_GAMES", 100_000)),
+        ttl=float(environ.get("GAME_STORE_TTL", 3600)),
+    )
+    kind = environ.get("GAME_STORE", "memory")
+    if kind == "memory":
+        return cache
+    if kind == "sql":
+        return WriteBehindStore(
+            SQLGameStore(environ["DATABASE_URL"]), cache=cache
+        )
+    raise ValueError(f"Unknown GAME_STORE {kind!r}")
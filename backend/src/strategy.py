@@ -0,0 +1,279 @@
+"""Exact hit/stick strategy tables for Pontoon.
+
+Expected values come from a memoised recursion over the composition
+of the unseen cards, counted per rank class (A, 2 - 9, ten-valued),
+under the rules of Pontoon.dealer_turn and check_winner: the dealer
+draws to 17, a bust player always loses, equal totals tie. Each
+(player total, soft flag, dealer upcard) entry is computed against a
+full deck less the dealer's upcard.
+
+Tables are built offline and saved as a small binary file that is
+loaded with np.frombuffer:
+
+    PYTHONPATH=. python -m src.strategy
+"""
+
+import struct
+import sys
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+TABLES_PATH = Path(__file__).parent / "data" / "pontoon_strategy.bin"
+
+MAGIC = b"PNTS"
+VERSION = 1
+HEADER = struct.Struct("<4sHH")
+
+FULL_DECK = (4, 4, 4, 4, 4, 4, 4, 4, 4, 16)
+UPCARDS = 10
+MAX_TOTAL = 21
+DEALER_STANDS_ON = 17
+# Dealer finishes on 17 - 21 or busts
+OUTCOMES = MAX_TOTAL - DEALER_STANDS_ON + 2
+BUST = OUTCOMES - 1
+
+
+def rank_class(rank: int) -> int:
+    """Returns the table index for a card rank: A is 0, tens are 9"""
+    return min(rank, 10) - 1
+
+
+def _total(hard, ace):
+    return hard + 10 if ace and hard <= 11 else hard
+
+
+def _without(composition, index):
+    remaining = list(composition)
+    remaining[index] -= 1
+    return tuple(remaining)
+
+
+@lru_cache(maxsize=None)
+def dealer_outcomes(hard, ace, composition):
+    """Distribution of the dealer's final total
+
+    Args:
+        hard (int): dealer total counting aces as 1
+        ace (bool): whether the dealer holds an ace
+        composition (tuple[int]): unseen cards per rank class
+
+    Returns:
+        tuple[float]: probabilities of finishing on 17, 18, 19,
+            20, 21 and of busting
+    """
+    total = _total(hard, ace)
+    outcomes = [0.0] * OUTCOMES
+    if total > MAX_TOTAL:
+        outcomes[BUST] = 1.0
+        return tuple(outcomes)
+    remaining = sum(composition)
+    if total >= DEALER_STANDS_ON or not remaining:
+        outcomes[max(total - DEALER_STANDS_ON, 0)] = 1.0
+        return tuple(outcomes)
+    for index, count in enumerate(composition):
+        if not count:
+            continue
+        drawn = dealer_outcomes(
+            hard + index + 1,
+            ace or index == 0,
+            _without(composition, index),
+        )
+        weight = count / remaining
+        for outcome, probability in enumerate(drawn):
+            outcomes[outcome] += weight * probability
+    return tuple(outcomes)
+
+
+@lru_cache(maxsize=None)
+def stick_ev(total, composition, upcard):
+    """Expected value of sticking on a total, win +1 / loss -1"""
+    outcomes = dealer_outcomes(upcard + 1, upcard == 0, composition)
+    ev = outcomes[BUST]
+    for outcome, probability in enumerate(outcomes[:BUST]):
+        dealer_total = DEALER_STANDS_ON + outcome
+        if total > dealer_total:
+            ev += probability
+        elif total < dealer_total:
+            ev -= probability
+    return ev
+
+
+def hit_ev(hard, ace, composition, upcard):
+    """Expected value of taking one card, then playing on best"""
+    remaining = sum(composition)
+    ev = 0.0
+    for index, count in enumerate(composition):
+        if not count:
+            continue
+        weight = count / remaining
+        ev += weight * best_ev(
+            hard + index + 1,
+            ace or index == 0,
+            _without(composition, index),
+            upcard,
+        )
+    return ev
+
+
+@lru_cache(maxsize=None)
+def best_ev(hard, ace, composition, upcard):
+    """Expected value of the better of hitting and sticking"""
+    total = _total(hard, ace)
+    if total > MAX_TOTAL:
+        return -1.0
+    ev = stick_ev(total, composition, upcard)
+    if total < MAX_TOTAL and sum(composition):
+        ev = max(ev, hit_ev(hard, ace, composition, upcard))
+    return ev
+
+
+def _clear_caches():
+    for func in (dealer_outcomes, stick_ev, best_ev):
+        func.cache_clear()
+
+
+class StrategyTables:
+    """Dealer outcome and player EV tables, indexed by upcard class,
+    soft flag and player total.
+
+    Instances can also be passed to simulation.simulate as a player
+    strategy.
+    """
+
+    def __init__(self, dealer, stick, hit) -> None:
+        self.dealer = dealer
+        self.stick = stick
+        self.hit = hit
+        self.should_hit = hit > stick
+
+    @classmethod
+    def build(cls, deck=FULL_DECK, upcards=range(UPCARDS)):
+        """Computes the tables
+
+        Args:
+            deck (tuple[int], optional): cards per rank class.
+                Defaults to one 52 card deck.
+            upcards (iterable[int], optional): upcard classes to
+                fill in. Defaults to all of them.
+
+        Returns:
+            StrategyTables: the computed tables
+        """
+        shape = (UPCARDS, 2, MAX_TOTAL + 1)
+        dealer = np.zeros((UPCARDS, OUTCOMES), dtype=np.float32)
+        stick = np.full(shape, -1.0, dtype=np.float32)
+        hit = np.full(shape, -1.0, dtype=np.float32)
+        try:
+            for upcard in upcards:
+                composition = _without(deck, upcard)
+                dealer[upcard] = dealer_outcomes(
+                    upcard + 1, upcard == 0, composition
+                )
+                for total in range(2, MAX_TOTAL + 1):
+                    stick[upcard, :, total] = stick_ev(
+                        total, composition, upcard
+                    )
+                    hit[upcard, 0, total] = hit_ev(
+                        total, False, composition, upcard
+                    )
+                    if total >= 12:
+                        hit[upcard, 1, total] = hit_ev(
+                            total - 10, True, composition, upcard
+                        )
+        finally:
+            _clear_caches()
+        return cls(dealer, stick, hit)
+
+    def to_bytes(self) -> bytes:
+        return b"".join(
+            [
+                HEADER.pack(MAGIC, VERSION, 0),
+                self.dealer.astype("<f4").tobytes(),
+                self.stick.astype("<f4").tobytes(),
+                self.hit.astype("<f4").tobytes(),
+            ]
+        )
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "StrategyTables":
+        magic, version, _ = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a version 1 Pontoon strategy file")
+        shape = (UPCARDS, 2, MAX_TOTAL + 1)
+        offset = HEADER.size
+        arrays = []
+        for array_shape in ((UPCARDS, OUTCOMES), shape, shape):
+            count = int(np.prod(array_shape))
+            arrays.append(
+                np.frombuffer(data, "<f4", count, offset).reshape(
+                    array_shape
+                )
+            )
+            offset += count * 4
+        return cls(*arrays)
+
+    def save(self, path=TABLES_PATH) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        Path(path).write_bytes(self.to_bytes())
+
+    @classmethod
+    def load(cls, path=TABLES_PATH) -> "StrategyTables":
+        return cls.from_bytes(Path(path).read_bytes())
+
+    def recommend(self, total: int, soft: bool, upcard: int) -> str:
+        """Returns the better action for a player
+
+        Args:
+            total (int): player's hand total
+            soft (bool): whether an ace is counted as 11
+            upcard (int): rank of the dealer's face up card
+
+        Returns:
+            str: "hit" or "stick"
+        """
+        if total > MAX_TOTAL:
+            return "stick"
+        index = rank_class(upcard), int(soft), total
+        return "hit" if self.should_hit[index] else "stick"
+
+    def hint(self, total: int, soft: bool, upcard: int) -> dict:
+        """Returns the recommended action with the EV of each
+
+        Args:
+            total (int): player's hand total
+            soft (bool): whether an ace is counted as 11
+            upcard (int): rank of the dealer's face up card
+
+        Returns:
+            dict: action, hit_ev and stick_ev
+        """
+        index = rank_class(upcard), int(soft), min(total, MAX_TOTAL)
+        return {
+            "action": self.recommend(total, soft, upcard),
+            "hit_ev": float(self.hit[index]),
+            "stick_ev": float(self.stick[index]),
+        }
+
+    def __call__(self, values, soft, upcard):
+        upcard = np.minimum(upcard, 10) - 1
+        totals = np.minimum(values, MAX_TOTAL)
+        return self.should_hit[upcard, soft.astype(np.intp), totals]
+
+
+@lru_cache(maxsize=1)
+def load_tables(path=TABLES_PATH) -> StrategyTables:
+    """Returns the saved strategy tables, loaded once per process"""
+    return StrategyTables.load(path)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    path = Path(argv[0]) if argv else TABLES_PATH
+    StrategyTables.build().save(path)
+    print(f"Saved strategy tables to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+from src.hand_value import Hand
+from src.pontoon_logic import outcome
+from src.shoe import Shoe
+
+MAX_SEATS = 7
+
+
+class Table:
+    """A Pontoon table: several seats against one dealer and shoe
+
+    Seats act in turn, from seat 0. Once the last seat has stuck or
+    busted, the dealer plays out their hand once and every seat is
+    settled against it in a single pass, rather than each player
+    having a dealer of their own.
+
+    Args:
+        seats (int, optional): players at the table, 1 - 7.
+            Defaults to 1.
+        shoe (Shoe, optional): the shoe to deal from. Defaults to a
+            new six deck shoe.
+    """
+
+    def __init__(self, seats=1, shoe=None) -> None:
+        if not 1 <= seats <= MAX_SEATS:
+            raise ValueError(
+                f"A table seats 1 - {MAX_SEATS} players"
+            )
+        self.seats = seats
+        self.shoe = Shoe() if shoe is None else shoe
+        self.hands = [Hand() for _ in range(seats)]
+        self.stuck = [False] * seats
+        self.dealer_hand = Hand()
+        self.turn = None
+        self.game_over = False
+        self.results = None
+
+    def start_round(self) -> None:
+        """Deals two cards to each seat, then to the dealer"""
+        shoe = self.shoe.get()
+        hands = [Hand() for _ in range(self.seats)]
+        dealer_hand = Hand()
+        for _ in range(2):
+            for hand in hands:
+                hand.append(shoe.pop())
+            dealer_hand.append(shoe.pop())
+        self.hands = hands
+        self.dealer_hand = dealer_hand
+        self.stuck = [False] * self.seats
+        self.turn = 0
+        self.game_over = False
+        self.results = None
+
+    def _check_turn(self, seat):
+        if self.game_over:
+            return {
+                "status": "error",
+                "message": "The round is over.",
+            }
+        if seat != self.turn:
+            return {"status": "error", "message": "Not your turn."}
+        return None
+
+    def player_hit(self, seat: int) -> dict:
+        """Deals a card to the seat whose turn it is
+
+        Args:
+            seat (int): the seat acting
+
+        Returns:
+            dict: status "success", "busted" or "error", and the hand
+        """
+        error = self._check_turn(seat)
+        if error:
+            return error
+        hand = self.hands[seat]
+        hand.append(self.shoe.pop())
+        if hand.value > 21:
+            self._next_turn()
+            return {
+                "status": "busted",
+                "message": "Player busted!",
+                "hand": hand,
+            }
+        return {"status": "success", "hand": hand}
+
+    def player_stick(self, seat: int) -> dict:
+        """Ends the turn of the seat whose turn it is
+
+        Args:
+            seat (int): the seat acting
+
+        Returns:
+            dict: status "success" or "error"; after the last seat
+                sticks, the round's results
+        """
+        error = self._check_turn(seat)
+        if error:
+            return error
+        self.stuck[seat] = True
+        self._next_turn()
+        if self.game_over:
+            return {"status": "success", "results": self.results}
+        return {"status": "success"}
+
+    def _next_turn(self) -> None:
+        self.turn += 1
+        if self.turn == self.seats:
+            self.turn = None
+            self.dealer_turn()
+            self.results = self.check_winners()
+            self.game_over = True
+
+    def dealer_turn(self) -> None:
+        """Plays the dealer's hand, unless every seat has busted"""
+        if all(hand.value > 21 for hand in self.hands):
+            return
+        dealer_hand = self.dealer_hand
+        while dealer_hand.value < 17:
+            dealer_hand.append(self.shoe.pop())
+
+    def check_winners(self) -> list:
+        """Settles every seat against the dealer's hand
+
+        Returns:
+            list: one dict per seat, with the hand value, status and
+                message
+        """
+        dealer_value = self.dealer_hand.value
+        return [
+            {
+                "player_value": hand.value,
+                **outcome(hand.value, dealer_value),
+            }
+            for hand in self.hands
+        ]
+
+    def get_table_state(self) -> dict:
+        over = self.game_over
+        return {
+            "seats": [
+                {
+                    "hand": hand,
+                    "value": hand.value,
+                    "stuck": stuck,
+                }
+                for hand, stuck in zip(self.hands, self.stuck)
+            ],
+            "dealer_hand": (
+                self.dealer_hand
+                if over
+                else [self.dealer_hand[0], "Hidden"]
+            ),
+            "dealer_value": (
+                self.dealer_hand.value if over else "Hidden"
+            ),
+            "turn": self.turn,
+            "game_over": over,
+            "results": self.results,
+        }
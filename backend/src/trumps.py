@@ -0,0 +1,549 @@
+"""Whist: four players in two partnerships, with a trump suit.
+
+Hands are held as four 13-bit masks, one per suit, with bit 0 the
+two and bit 12 the ace (Card.get_rank(aces_high=True) - 2). Bits
+compare as card strength, so the legal moves when following suit
+are just the hand's mask for the led suit, and a trick's winner is
+tracked card by card as it is played instead of sorting the trick.
+
+The AI (choose_move) plays by determinized Monte Carlo: it deals
+the cards it cannot see at random, consistent with what it knows,
+solves each deal double dummy with alpha-beta search a few tricks
+deep, and plays the card that did best across the deals it had time
+for.
+"""
+
+import os
+import time
+from dataclasses import dataclass
+from random import Random
+
+from src.cards import Card, Deck
+
+PLAYERS = 4
+TRICKS = 13
+FULL_SUIT = (1 << 13) - 1
+
+
+class InvalidMoveException(Exception):
+    pass
+
+
+def card_bit(card: Card) -> tuple:
+    """Returns a card's suit (0 - 3) and its bit in the suit mask"""
+    if card.rank == 0:
+        raise ValueError("Jokers are not played in whist")
+    return card.suit - 1, 1 << (card.get_rank(aces_high=True) - 2)
+
+
+def bit_card(suit: int, bit: int) -> Card:
+    rank = bit.bit_length() + 1
+    return Card(1 if rank == 14 else rank, suit + 1)
+
+
+def beats(suit, bit, win_suit, win_bit, trump) -> bool:
+    """True if a card beats the card winning the trick so far"""
+    if suit == win_suit:
+        return bit > win_bit
+    return suit == trump
+
+
+class Trumps:
+    """A hand of whist: 13 tricks, partners sit opposite
+
+    Players 0 and 2 play against 1 and 3. The dealer is player 3,
+    the trump suit is the suit of the last card dealt and player 0
+    leads the first trick.
+
+    Args:
+        seed (int, optional): seed for a repeatable deal
+    """
+
+    def __init__(self, seed=None) -> None:
+        self.rng = Random(seed)
+        deck = Deck()
+        deck.shuffle(self.rng)
+        self.hands = [[0] * 4 for _ in range(PLAYERS)]
+        for index, card in enumerate(deck):
+            suit, bit = card_bit(card)
+            self.hands[index % PLAYERS][suit] |= bit
+        self.trump = suit
+        self.leader = 0
+        self.trick = []
+        self.tricks = [0, 0]
+        self.voids = [0] * PLAYERS
+        self.played = [0] * 4
+
+    @property
+    def turn(self) -> int:
+        return (self.leader + len(self.trick)) % PLAYERS
+
+    @property
+    def game_over(self) -> bool:
+        return sum(self.tricks) == TRICKS
+
+    def legal_mask(self, player: int) -> tuple:
+        """Returns the playable cards as four suit masks
+
+        Args:
+            player (int): the player to move
+
+        Returns:
+            tuple: one mask per suit
+        """
+        hand = self.hands[player]
+        if self.trick:
+            led = self.trick[0][1]
+            if hand[led]:
+                return tuple(
+                    hand[led] if s == led else 0 for s in range(4)
+                )
+        return tuple(hand)
+
+    def legal_moves(self, player: int) -> list:
+        return [
+            bit_card(suit, bit)
+            for suit, mask in enumerate(self.legal_mask(player))
+            for bit in _bits(mask)
+        ]
+
+    def hand(self, player: int) -> list:
+        return [
+            bit_card(suit, bit)
+            for suit, mask in enumerate(self.hands[player])
+            for bit in _bits(mask)
+        ]
+
+    def play(self, player: int, card: Card):
+        """Plays a card to the trick
+
+        Args:
+            player (int): the player whose turn it is
+            card (Card): a legal card from their hand
+
+        Returns:
+            int: the winner of the trick if the card completed it,
+                otherwise None
+        """
+        if self.game_over:
+            raise InvalidMoveException("The game is over")
+        if player != self.turn:
+            raise InvalidMoveException("Not your turn")
+        suit, bit = card_bit(card)
+        if not self.legal_mask(player)[suit] & bit:
+            raise InvalidMoveException(f"{card!r} cannot be played")
+        if self.trick and suit != self.trick[0][1]:
+            self.voids[player] |= 1 << self.trick[0][1]
+        self.hands[player][suit] ^= bit
+        self.played[suit] |= bit
+        self.trick.append((player, suit, bit))
+        if len(self.trick) < PLAYERS:
+            return None
+        winner, win_suit, win_bit = self.trick[0]
+        for player, suit, bit in self.trick[1:]:
+            if beats(suit, bit, win_suit, win_bit, self.trump):
+                winner, win_suit, win_bit = player, suit, bit
+        self.tricks[winner % 2] += 1
+        self.leader = winner
+        self.trick = []
+        return winner
+
+
+def _bits(mask: int):
+    while mask:
+        low = mask & -mask
+        yield low
+        mask ^= low
+
+
+class OutOfTime(Exception):
+    pass
+
+
+class Solver:
+    """Double dummy alpha-beta search over a fully known deal
+
+    Values are tricks won by one partnership over the next depth
+    tricks. Cards in sequence in one hand, with every card between
+    them already played, are interchangeable, so only the lowest of
+    each run is searched. Positions at the start of a trick are kept
+    in a transposition table as bounds on their value.
+
+    Args:
+        hands (list): four lists of four suit masks, changed during
+            the search and restored after
+        trump (int): trump suit index
+        team (int): the partnership maximizing, 0 or 1
+        deadline (float, optional): time.perf_counter() after which
+            the search raises OutOfTime
+    """
+
+    CHECK_EVERY = 1024
+
+    def __init__(self, hands, trump, team, deadline=None) -> None:
+        self.hands = hands
+        self.trump = trump
+        self.team = team
+        self.deadline = deadline
+        self.table = {}
+        self.in_trick = [0] * 4
+        self.nodes = 0
+
+    def moves(self, player, led):
+        """Yields (suit, bit) for each distinct card playable"""
+        hand = self.hands[player]
+        suits = (led,) if led is not None and hand[led] else range(4)
+        hands = self.hands
+        for suit in suits:
+            mask = hand[suit]
+            live = (
+                hands[0][suit]
+                | hands[1][suit]
+                | hands[2][suit]
+                | hands[3][suit]
+                | self.in_trick[suit]
+            )
+            while mask:
+                bit = mask & -mask
+                mask ^= bit
+                yield suit, bit
+                # Skip the cards in sequence above it
+                while True:
+                    above = live & ~((bit << 1) - 1)
+                    bit = above & -above
+                    if not mask & bit:
+                        break
+                    mask ^= bit
+
+    def ordered_moves(self, player, played, led, winner, card):
+        """Returns (suit, bit, wins) for a player's distinct moves,
+        in the order most likely to cut the search short
+
+        A leader tries high cards first. Otherwise, with a partner
+        winning the trick the player tries low cards first, and with
+        an opponent winning, the cheapest cards that win first.
+        """
+        moves = self.moves(player, led)
+        if not played:
+            return [(suit, bit, True) for suit, bit in moves][::-1]
+        win_suit, win_bit = card
+        winning, losing = [], []
+        for suit, bit in moves:
+            if beats(suit, bit, win_suit, win_bit, self.trump):
+                winning.append((suit, bit, True))
+            else:
+                losing.append((suit, bit, False))
+        if winner % 2 == player % 2:
+            return losing + winning
+        return winning + losing
+
+    def trick_value(self, leader, depth, alpha, beta) -> int:
+        """Value of the position at the start of a trick"""
+        if not depth or not any(self.hands[leader]):
+            return 0
+        key = (tuple(map(tuple, self.hands)), leader, depth)
+        low, high = self.table.get(key, (0, depth))
+        if low >= beta:
+            return low
+        if high <= alpha:
+            return high
+        alpha = max(alpha, low)
+        beta = min(beta, high)
+        value = self.search(
+            leader, 0, None, 0, 0, 0, depth, alpha, beta
+        )
+        if value <= alpha:
+            high = value
+        elif value >= beta:
+            low = value
+        else:
+            low = high = value
+        self.table[key] = low, high
+        return value
+
+    def search(
+        self,
+        leader,
+        played,
+        led,
+        winner,
+        win_suit,
+        win_bit,
+        depth,
+        alpha,
+        beta,
+    ) -> int:
+        """Value of a position part way through a trick
+
+        Args:
+            leader (int): who led the trick
+            played (int): cards played to the trick so far
+            led (int): suit led, None before the lead
+            winner, win_suit, win_bit: the card winning so far
+            depth (int): tricks left to search, this one included
+            alpha, beta (int): the search window
+
+        Returns:
+            int: tricks won by the maximizing team
+        """
+        if played == PLAYERS:
+            gain = winner % 2 == self.team
+            return gain + self.trick_value(
+                winner, depth - 1, alpha - gain, beta - gain
+            )
+        self.nodes += 1
+        if self.nodes % self.CHECK_EVERY == 0 and self.deadline:
+            if time.perf_counter() > self.deadline:
+                raise OutOfTime
+        player = (leader + played) % PLAYERS
+        maximizing = player % 2 == self.team
+        hand = self.hands[player]
+        best = -1 if maximizing else depth + 1
+        moves = self.ordered_moves(
+            player, played, led, winner, (win_suit, win_bit)
+        )
+        for suit, bit, wins in moves:
+            if wins:
+                next_win = player, suit, bit
+            else:
+                next_win = winner, win_suit, win_bit
+            hand[suit] ^= bit
+            self.in_trick[suit] |= bit
+            value = self.search(
+                leader,
+                played + 1,
+                suit if led is None else led,
+                *next_win,
+                depth,
+                alpha,
+                beta,
+            )
+            hand[suit] ^= bit
+            self.in_trick[suit] ^= bit
+            if maximizing:
+                best = max(best, value)
+                alpha = max(alpha, value)
+            else:
+                best = min(best, value)
+                beta = min(beta, value)
+            if alpha >= beta:
+                break
+        return best
+
+
+@dataclass(frozen=True)
+class SearchResult:
+    """A move chosen by choose_move
+
+    scores holds (card, mean tricks won) for each distinct move,
+    best first.
+    """
+
+    card: Card
+    scores: tuple
+    samples: int
+    nodes: int
+    seconds: float
+
+    @property
+    def nodes_per_second(self) -> float:
+        return self.nodes / self.seconds if self.seconds else 0.0
+
+
+def _deal_unseen(position, rng, tries=20):
+    """Deals the cards a player cannot see to the other players
+
+    Players who have shown out of a suit are not dealt it, unless
+    no such deal turns up within a few tries, after which voids are
+    ignored.
+    """
+    player, hand, unseen, counts, voids = position[:5]
+    while True:
+        cards = unseen[:]
+        rng.shuffle(cards)
+        hands = [[0] * 4 for _ in range(PLAYERS)]
+        hands[player] = list(hand)
+        room = list(counts)
+        for suit, bit in cards:
+            takers = [
+                other
+                for other in range(PLAYERS)
+                if room[other]
+                and (not tries or not voids[other] >> suit & 1)
+            ]
+            if not takers:
+                break
+            other = rng.choice(takers)
+            hands[other][suit] |= bit
+            room[other] -= 1
+        else:
+            return hands
+        tries -= 1
+
+
+def _run_samples(position, budget, depth, seed, max_samples):
+    """Solves random deals until the budget runs out
+
+    Returns:
+        tuple: total value per (suit, bit) move, deals solved and
+            nodes searched
+    """
+    player, _, _, _, _, trump, leader, trick = position
+    rng = Random(seed)
+    deadline = time.perf_counter() + budget
+    scores = {}
+    samples = 0
+    nodes = 0
+    led = trick[0][1] if trick else None
+    while samples < max_samples and time.perf_counter() < deadline:
+        hands = _deal_unseen(position, rng)
+        solver = Solver(hands, trump, player % 2, deadline)
+        for _, suit, bit in trick:
+            solver.in_trick[suit] |= bit
+        winner = win_suit = win_bit = 0
+        for index, (other, suit, bit) in enumerate(trick):
+            if not index or beats(
+                suit, bit, win_suit, win_bit, trump
+            ):
+                winner, win_suit, win_bit = other, suit, bit
+        values = {}
+        try:
+            for suit, bit in solver.moves(player, led):
+                if not trick or beats(
+                    suit, bit, win_suit, win_bit, trump
+                ):
+                    win = player, suit, bit
+                else:
+                    win = winner, win_suit, win_bit
+                hands[player][suit] ^= bit
+                solver.in_trick[suit] |= bit
+                values[suit, bit] = solver.search(
+                    leader,
+                    len(trick) + 1,
+                    suit if led is None else led,
+                    *win,
+                    depth,
+                    -1,
+                    depth + 1,
+                )
+                hands[player][suit] ^= bit
+                solver.in_trick[suit] ^= bit
+        except OutOfTime:
+            nodes += solver.nodes
+            break
+        nodes += solver.nodes
+        samples += 1
+        for move, value in values.items():
+            scores[move] = scores.get(move, 0) + value
+    return scores, samples, nodes
+
+
+def choose_move(
+    game,
+    player,
+    budget=0.1,
+    depth=2,
+    max_samples=1000,
+    executor=None,
+    jobs=None,
+    seed=None,
+) -> SearchResult:
+    """Picks a card for a player by determinized Monte Carlo search
+
+    Args:
+        game (Trumps): the game, with player to move
+        player (int): the player to move
+        budget (float, optional): seconds to think. Defaults to 0.1.
+        depth (int, optional): tricks searched per deal, this one
+            included. Defaults to 2.
+        max_samples (int, optional): most deals solved per job.
+            Defaults to 1000.
+        executor (concurrent.futures.Executor, optional): pool to
+            solve deals on; each job runs for the whole budget.
+            Defaults to searching in this process.
+        jobs (int, optional): jobs sent to the executor. Defaults to
+            os.cpu_count().
+        seed (int, optional): seed for repeatable deals
+
+    Returns:
+        SearchResult: the card chosen, with search statistics
+    """
+    if player != game.turn:
+        raise InvalidMoveException("Not your turn")
+    start = time.perf_counter()
+    seen = [
+        game.hands[player][suit] | game.played[suit]
+        for suit in range(4)
+    ]
+    unseen = [
+        (suit, bit)
+        for suit in range(4)
+        for bit in _bits(FULL_SUIT & ~seen[suit])
+    ]
+    in_trick = {other for other, _, _ in game.trick}
+    tricks_left = TRICKS - sum(game.tricks)
+    counts = [
+        0 if other == player else tricks_left - (other in in_trick)
+        for other in range(PLAYERS)
+    ]
+    position = (
+        player,
+        tuple(game.hands[player]),
+        unseen,
+        counts,
+        tuple(game.voids),
+        game.trump,
+        game.leader,
+        tuple(game.trick),
+    )
+    depth = min(depth, tricks_left)
+    rng = Random(seed)
+    legal = game.legal_mask(player)
+    if sum(mask.bit_count() for mask in legal) == 1:
+        runs = []
+    elif executor is None:
+        runs = [
+            _run_samples(position, budget, depth, seed, max_samples)
+        ]
+    else:
+        jobs = jobs or os.cpu_count()
+        futures = [
+            executor.submit(
+                _run_samples,
+                position,
+                budget,
+                depth,
+                rng.getrandbits(64),
+                max_samples,
+            )
+            for _ in range(jobs)
+        ]
+        runs = [future.result() for future in futures]
+    scores = {}
+    for run_scores, _, _ in runs:
+        for move, value in run_scores.items():
+            scores[move] = scores.get(move, 0) + value
+    samples = sum(run[1] for run in runs)
+    if scores:
+        # Highest total; ties go to the lower card
+        suit, bit = max(
+            scores, key=lambda move: (scores[move], -move[1])
+        )
+    else:
+        suit, bit = next(
+            (suit, mask & -mask)
+            for suit, mask in enumerate(legal)
+            if mask
+        )
+    return SearchResult(
+        card=bit_card(suit, bit),
+        scores=tuple(
+            (bit_card(*move), value / samples)
+            for move, value in sorted(
+                scores.items(), key=lambda item: -item[1]
+            )
+        ),
+        samples=samples,
+        nodes=sum(run[2] for run in runs),
+        seconds=time.perf_counter() - start,
+    )
@@ -0,0 +1,189 @@
+import asyncio
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.admission import (
+    PLAY,
+    START,
+    Admission,
+    AdmissionMiddleware,
+    LiveGames,
+    create_admission,
+)
+
+
+def test_create_admission():
+    assert create_admission(environ={}) is None
+    admission = create_admission(
+        lambda: 0,
+        {"MAX_IN_FLIGHT": "8", "ADMISSION_TARGET_MS": "20"},
+    )
+    assert admission.max_in_flight == 8
+    assert admission.target == 0.02
+    assert admission.retry_after == 1
+
+
+def test_slots_go_to_actions_before_starts():
+    admission = Admission(max_in_flight=1, target=1)
+    order = []
+
+    async def request(name, priority):
+        assert await admission.acquire(priority)
+        order.append(name)
+        await asyncio.sleep(0)
+        admission.release()
+
+    async def main():
+        assert await admission.acquire(PLAY)
+        tasks = [
+            asyncio.create_task(request("start", START)),
+            asyncio.create_task(request("hit", PLAY)),
+        ]
+        await asyncio.sleep(0)
+        assert admission.waiting == 2
+        admission.release()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+    assert order == ["hit", "start"]
+    assert admission.in_flight == 0
+
+
+def test_requests_waiting_past_the_target_are_shed():
+    admission = Admission(max_in_flight=1, target=0.01)
+
+    async def main():
+        await admission.acquire(PLAY)
+        admitted = await admission.acquire(PLAY)
+        admission.release()
+        return admitted
+
+    assert not asyncio.run(main())
+    assert admission.shed.value("timeout") == 1
+    assert (admission.in_flight, admission.waiting) == (0, 0)
+
+
+def test_requests_are_shed_at_once_when_the_wait_is_too_long():
+    admission = Admission(max_in_flight=1, target=0.01)
+    admission.service = 1.0
+
+    async def main():
+        await admission.acquire(PLAY)
+        return await admission.acquire(PLAY)
+
+    assert not asyncio.run(main())
+    assert admission.shed.value("queue") == 1
+
+
+def test_starts_are_shed_first_while_the_loop_lags():
+    admission = Admission(target=0.1)
+
+    async def main():
+        admission.watch()
+        await asyncio.sleep(0.01)
+        time.sleep(0.075)
+        await asyncio.sleep(0.001)
+        await asyncio.sleep(0.001)
+        return (
+            await admission.acquire(PLAY),
+            await admission.acquire(START),
+        )
+
+    assert asyncio.run(main()) == (True, False)
+    assert admission.shed.value("lag") == 1
+
+
+def busy_app(admission):
+    inner = FastAPI()
+
+    @inner.post("/start")
+    async def start():
+        return {}
+
+    @inner.post("/table/start")
+    async def start_table():
+        return {}
+
+    @inner.post("/hit")
+    async def hit():
+        await asyncio.sleep(0.05)
+        return {}
+
+    return AdmissionMiddleware(inner, admission)
+
+
+def test_start_is_refused_over_the_game_limit():
+    live = [0]
+    admission = Admission(max_games=2, live_games=lambda: live[0])
+    client = TestClient(busy_app(admission))
+    assert client.post("/start").status_code == 200
+    live[0] = 2
+    response = client.post("/start")
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    assert client.post("/table/start").status_code == 503
+    assert client.post("/hit").status_code == 200
+    assert admission.shed.value("games") == 2
+
+
+def test_live_games_count_games_until_they_finish():
+    now = [0.0]
+    live = LiveGames(ttl=10, clock=lambda: now[0])
+    live.start("a")
+    now[0] = 5
+    live.start("b")
+    live.start("c")
+    live.finish("b")
+    live.finish("missing")
+    assert len(live) == 2
+    now[0] = 10
+    assert len(live) == 1
+    now[0] = 15
+    assert len(live) == 0
+
+
+def test_finished_games_leave_the_live_count():
+    import src.pontoon as pontoon
+
+    client = TestClient(pontoon.app)
+    before = len(pontoon.live_games)
+    finished = client.post("/start").json()["game_id"]
+    client.post("/start")
+    client.post("/stick", json={"game_id": finished})
+    client.post("/hit", json={"game_id": finished})
+    assert len(pontoon.live_games) == before + 1
+
+
+def test_overload_is_answered_with_503():
+    admission = Admission(max_in_flight=2, target=0.01)
+    app = busy_app(admission)
+
+    async def call():
+        statuses = []
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                statuses.append(message["status"])
+
+        async def receive():
+            return {"type": "http.request", "body": b""}
+
+        scope = {
+            "type": "http",
+            "method": "POST",
+            "path": "/hit",
+            "headers": [],
+            "query_string": b"",
+        }
+        await app(scope, receive, send)
+        return statuses[0]
+
+    async def main():
+        return await asyncio.gather(*(call() for _ in range(6)))
+
+    statuses = asyncio.run(main())
+    assert statuses.count(200) == 2
+    assert statuses.count(503) == 4
+    assert admission.in_flight == 0
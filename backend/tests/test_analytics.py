@@ -0,0 +1,159 @@
+from fastapi.testclient import TestClient
+
+import src.pontoon as pontoon
+from src.analytics import (
+    Analytics,
+    Outcomes,
+    create_analytics,
+    merge_snapshots,
+)
+
+
+class Clock:
+    def __init__(self, now=0.0) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_outcomes_count_results_and_values():
+    outcomes = Outcomes(clock=Clock())
+    outcomes.add(20, 18, "win", 0)
+    outcomes.add(25, 17, "loss", 1)
+    outcomes.add(18, 18, "tie", 2)
+    outcomes.add(17, 20, "loss", 3)
+    stats = outcomes.snapshot()
+    assert stats["all_time"] == {
+        "win": 1,
+        "loss": 2,
+        "tie": 1,
+        "games": 4,
+        "house_edge": 0.25,
+    }
+    assert stats["player_values"][25] == 1
+    assert stats["dealer_values"][18] == 2
+    assert sum(stats["player_values"]) == 4
+
+
+def test_values_past_the_histogram_share_its_last_bucket():
+    outcomes = Outcomes()
+    outcomes.add(40, 17, "loss", 0)
+    assert outcomes.player_values[-1] == 1
+
+
+def test_rolling_window_forgets_old_buckets():
+    clock = Clock()
+    outcomes = Outcomes(bucket_seconds=10, buckets=3, clock=clock)
+    outcomes.add(20, 18, "win", 5)
+    outcomes.add(20, 18, "win", 15)
+    outcomes.add(17, 19, "loss", 25)
+    clock.now = 29
+    stats = outcomes.snapshot()
+    assert [window["start"] for window in stats["windows"]] == [
+        0,
+        10,
+        20,
+    ]
+    assert stats["rolling"]["games"] == 3
+    clock.now = 35
+    stats = outcomes.snapshot()
+    assert [window["start"] for window in stats["windows"]] == [
+        10,
+        20,
+    ]
+    assert stats["rolling"]["win"] == 1
+    # A new bucket reuses the ring slot of the oldest
+    outcomes.add(18, 20, "loss", 35)
+    assert outcomes.snapshot()["windows"][-1]["loss"] == 1
+    assert stats["all_time"]["games"] == 3
+
+
+def test_results_are_counted_in_the_background():
+    analytics = Analytics()
+    for _ in range(100):
+        analytics.submit(
+            {"player_value": 19, "dealer_value": 22, "status": "win"}
+        )
+    analytics.flush()
+    stats = analytics.snapshot()
+    analytics.close()
+    assert stats["all_time"]["win"] == 100
+    assert (stats["pending"], stats["dropped"]) == (0, 0)
+
+
+def test_results_are_dropped_when_the_queue_is_full():
+    analytics = Analytics(max_pending=1)
+    result = {
+        "player_value": 19,
+        "dealer_value": 22,
+        "status": "win",
+    }
+    with analytics.outcomes._lock:
+        for _ in range(5):
+            analytics.submit(result)
+    analytics.flush()
+    analytics.close()
+    assert analytics.dropped >= 3
+    assert analytics.outcomes.totals["win"] + analytics.dropped == 5
+
+
+def test_create_analytics():
+    assert create_analytics({"ANALYTICS": "0"}) is None
+    analytics = create_analytics({"ANALYTICS_BUCKETS": "5"})
+    assert len(analytics.snapshot()["windows"]) == 0
+    assert analytics.snapshot()["rolling"]["seconds"] == 300
+
+
+def test_stats_endpoint_counts_finished_games():
+    client = TestClient(pontoon.app)
+    pontoon.analytics.flush()
+    before = client.get("/stats").json()["all_time"]["games"]
+    for _ in range(3):
+        game_id = client.post("/start").json()["game_id"]
+        client.post("/stick", json={"game_id": game_id})
+    pontoon.analytics.flush()
+    stats = client.get("/stats").json()
+    assert stats["all_time"]["games"] == before + 3
+    assert stats["rolling"]["games"] >= 3
+
+
+def test_stats_count_a_game_once_however_often_it_is_hit():
+    client = TestClient(pontoon.app)
+    game_id = client.post("/start").json()["game_id"]
+    pontoon.analytics.flush()
+    before = client.get("/stats").json()["all_time"]["games"]
+    client.post("/stick", json={"game_id": game_id})
+    for _ in range(5):
+        client.post("/hit", json={"game_id": game_id})
+    client.post(
+        "/batch",
+        json={
+            "actions": [{"game_id": game_id, "action": "hit"}] * 3
+        },
+    )
+    pontoon.analytics.flush()
+    stats = client.get("/stats").json()
+    assert stats["all_time"]["games"] == before + 1
+
+
+def test_merged_snapshots_count_as_one():
+    clock = Clock(6125)
+    together = Outcomes(bucket_seconds=10, clock=clock)
+    apart = [Outcomes(bucket_seconds=10, clock=clock) for _ in "ab"]
+    games = [(20, 18, "win", 6101), (25, 17, "loss", 6112)]
+    games += [(18, 18, "tie", 6113), (19, 20, "loss", 6124)]
+    for index, game in enumerate(games):
+        together.add(*game)
+        apart[index % 2].add(*game)
+    merged = merge_snapshots(
+        [
+            {**outcomes.snapshot(), "pending": 1, "dropped": 0}
+            for outcomes in apart
+        ]
+    )
+    assert merged == {
+        **together.snapshot(),
+        "pending": 2,
+        "dropped": 0,
+    }
@@ -1,4 +1,5 @@
 from src.cards import Card, Deck
+import pickle
 import pytest
 
 
@@ -33,6 +34,21 @@ class TestCardClass:
     def test_alike_cards_are_equal(self):
         assert Card(1, 2) == Card(1, 2)
 
+    def test_cards_are_hashable(self):
+        cards = {Card(1, 2), Card(1, 2), Card(0, 1)}
+        assert cards == {Card(1, 2), Card(0, 1)}
+        assert {Card(5, 3): "five"}[Card(5, 3)] == "five"
+        assert Card(1, 1) != Card(1, 2)
+        assert Card(1, 1) != (1, 1)
+
+    def test_cards_are_immutable(self):
+        card = Card(1, 4)
+        with pytest.raises(AttributeError):
+            card.rank = 2
+        with pytest.raises(AttributeError):
+            del card.suit
+        assert Card(1, 4).rank == 1
+
 
 class TestDeck:
     def test_single_card_deck_has_length_1(self):
@@ -120,3 +136,98 @@ class TestDeck:
                 ]
             ]
         )
+
+    def test_adding_deck_in_place(self):
+        deck = Deck([4], [1])
+        other = Deck([2], [3])
+        deck += other
+        assert isinstance(deck, Deck)
+        assert len(deck) == 2
+        assert deck.pop() == Card(2, 3)
+
+    def test_adding_non_deck_raises_type_error(self):
+        with pytest.raises(TypeError):
+            _ = Deck() + [Card(1, 1)]
+
+    def test_decks_with_same_cards_in_same_order_are_equal(self):
+        assert Deck() == Deck()
+        shuffled = Deck()
+        shuffled.shuffle()
+        assert sorted(shuffled.to_bytes()) == sorted(
+            Deck().to_bytes()
+        )
+        assert Deck([1], [1]) != Deck([1], [2])
+
+    def test_shuffle_keeps_all_cards(self):
+        deck = Deck()
+        deck.shuffle()
+        assert len(deck) == 52
+        assert all(
+            Card(v, s) in deck
+            for v in range(1, 14)
+            for s in range(1, 5)
+        )
+
+    def test_deck_round_trips_through_bytes(self):
+        deck = Deck()
+        deck.shuffle()
+        restored = Deck.from_bytes(deck.to_bytes())
+        assert restored == deck
+        assert list(restored) == list(deck)
+
+    def test_repeats_multiplies_cards(self):
+        shoe = Deck(repeats=6)
+        assert len(shoe) == 312
+        assert shoe.count(Card(1, 4)) == 6
+
+    def test_counts_follow_changes_to_the_deck(self):
+        deck = Deck([1, 2], [1])
+        ace, two = Card(1, 1), Card(2, 1)
+        assert deck.count(ace) == 1
+        deck.append(ace)
+        deck.appendleft(two)
+        assert (deck.count(ace), deck.count(two)) == (2, 2)
+        deck.remove(ace)
+        deck.popleft()
+        assert deck.pop() is ace
+        assert (deck.count(ace), deck.count(two)) == (0, 1)
+        assert ace not in deck and two in deck
+        deck += Deck([2], [1], repeats=3)
+        assert deck.count(two) == 4
+        deck.clear()
+        assert two not in deck
+        with pytest.raises(ValueError):
+            deck.remove(two)
+        assert deck.count("A") == 0 and "A" not in deck
+
+
+class TestCardEncoding:
+    def test_cards_are_interned(self):
+        assert Card(1, 4) is Card(1, 4)
+        assert Card.from_code(Card(12, 2).code) is Card(12, 2)
+
+    def test_codes_cover_0_to_51_for_regular_cards(self):
+        codes = {
+            Card(v, s).code
+            for v in range(1, 14)
+            for s in range(1, 5)
+        }
+        assert codes == set(range(52))
+
+    def test_jokers_have_codes_above_51(self):
+        assert {Card(0, s).code for s in range(1, 5)} == {
+            52,
+            53,
+            54,
+            55,
+        }
+
+    def test_cards_have_no_instance_dict(self):
+        assert not hasattr(Card(1, 1), "__dict__")
+
+    def test_pickled_cards_and_decks_keep_identity(self):
+        deck = Deck()
+        deck.shuffle()
+        restored = pickle.loads(pickle.dumps(deck))
+        assert restored == deck
+        assert restored.pop() is deck.pop()
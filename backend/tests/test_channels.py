@@ -0,0 +1,106 @@
+import asyncio
+
+from src.cards import Card
+from src.channels import GameChannels, Subscriber, diff, view
+from src.hand_value import Hand
+from src.pontoon_logic import Pontoon
+
+
+def make_game():
+    game = Pontoon()
+    game.start_game(seed=1)
+    game.player_hand = Hand([Card(2, 1), Card(3, 1)])
+    game.dealer_hand = Hand([Card(10, 2), Card(7, 3)])
+    return game
+
+
+def test_view_hides_the_dealers_second_card():
+    latest = view(make_game())
+    assert list(latest["d"]) == [Card(10, 2).code]
+    assert latest["dv"] is None
+    assert latest["o"] is None
+
+
+def test_first_message_is_a_full_state():
+    message = diff(None, view(make_game()))
+    assert message["t"] == "state"
+    assert message["p"] == [Card(2, 1).code, Card(3, 1).code]
+    assert message["pv"] == 5
+
+
+def test_hit_sends_only_the_new_card_and_value():
+    game = make_game()
+    before = view(game)
+    game.player_hand.append(Card(4, 2))
+    assert diff(before, view(game)) == {
+        "t": "delta",
+        "p": [Card(4, 2).code],
+        "pv": 9,
+    }
+
+
+def test_stick_reveals_the_dealer_and_outcome():
+    game = make_game()
+    before = view(game)
+    game.player_stuck = True
+    game.game_over = True
+    message = diff(before, view(game))
+    assert message["d"] == [Card(7, 3).code]
+    assert message["dv"] == 17
+    assert message["go"] and message["ps"]
+    assert message["o"] == "loss"
+    assert "p" not in message
+
+
+def test_replaced_hands_send_a_full_state():
+    game = make_game()
+    before = view(game)
+    game.player_hand = Hand([Card(9, 4), Card(9, 3)])
+    assert diff(before, view(game))["t"] == "state"
+
+
+def test_slow_subscriber_gets_one_merged_delta():
+    async def main():
+        game = make_game()
+        subscriber = Subscriber(game)
+        assert subscriber.next_messages()[0]["t"] == "state"
+        for rank in (4, 5):
+            game.player_hand.append(Card(rank, 2))
+            subscriber.update(view(game))
+        return subscriber.next_messages()
+
+    (message,) = asyncio.run(main())
+    assert message["p"] == [Card(4, 2).code, Card(5, 2).code]
+    assert message["v"] == 2
+
+
+def test_notices_are_bounded_and_come_first():
+    async def main():
+        subscriber = Subscriber(make_game(), max_notices=2)
+        for n in range(5):
+            subscriber.notify({"t": "error", "message": str(n)})
+        return subscriber.next_messages()
+
+    messages = asyncio.run(main())
+    assert [m.get("message") for m in messages] == ["3", "4", None]
+
+
+def test_publish_reaches_only_that_games_subscribers():
+    async def main():
+        channels = GameChannels()
+        game = make_game()
+        watching = channels.subscribe("a", game)
+        other = channels.subscribe("b", game)
+        watching.next_messages()
+        other.next_messages()
+        game.player_hand.append(Card(6, 1))
+        channels.publish("a", game)
+        result = watching.next_messages(), other.next_messages()
+        channels.unsubscribe("a", watching)
+        channels.unsubscribe("b", other)
+        return result, len(channels)
+
+    (watched, unwatched), remaining = asyncio.run(main())
+    assert watched[0]["p"] == [Card(6, 1).code]
+    assert unwatched == []
+    assert remaining == 0
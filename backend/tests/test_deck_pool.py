@@ -0,0 +1,94 @@
+import random
+import time
+
+from src.cards import Deck
+from src.deck_pool import DeckPool, create_deck_pool
+from src.pontoon_logic import Pontoon
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return condition()
+
+
+def test_decks_are_full_and_shuffled():
+    pool = DeckPool(depth=4)
+    pool.fill()
+    decks = [pool.get() for _ in range(4)]
+    for deck in decks:
+        assert sorted(deck.to_bytes()) == sorted(Deck().to_bytes())
+    assert len({deck.to_bytes() for deck in decks}) == 4
+    pool.close()
+
+
+def test_pool_refills_in_the_background():
+    pool = DeckPool(depth=8)
+    pool.get()
+    assert wait_for(lambda: len(pool) == 8)
+    pool.close()
+
+
+def test_drained_pool_shuffles_on_demand():
+    pool = DeckPool(depth=2, refill_rate=1)
+    pool.fill()
+    decks = [pool.get() for _ in range(5)]
+    assert all(len(deck) == 52 for deck in decks)
+    assert pool.hits + pool.misses == 5
+    assert pool.misses >= 2
+    pool.close()
+
+
+def test_secure_pool_uses_system_random():
+    pool = DeckPool(depth=1, secure=True)
+    assert isinstance(pool.rng, random.SystemRandom)
+    assert len(pool.get()) == 52
+    pool.close()
+
+
+def test_pontoon_deals_from_the_provider():
+    pool = DeckPool(depth=2)
+    pool.fill()
+    expected = pool._decks[0].copy()
+    game = Pontoon(deck_provider=pool)
+    game.start_game()
+    assert game.player_hand == [expected[-1], expected[-2]]
+    assert len(game.deck) == 48
+    pool.close()
+
+
+def test_seeded_games_ignore_the_provider():
+    pool = DeckPool(depth=2)
+    game = Pontoon(deck_provider=pool)
+    game.start_game(seed=4)
+    other = Pontoon()
+    other.start_game(seed=4)
+    assert game.deck == other.deck
+    assert pool.hits == pool.misses == 0
+    pool.close()
+
+
+def test_create_deck_pool_from_environment():
+    assert create_deck_pool({"DECK_POOL_DEPTH": "0"}) is None
+    pool = create_deck_pool(
+        {
+            "DECK_POOL_DEPTH": "16",
+            "DECK_POOL_REFILL_RATE": "100",
+            "DECK_POOL_SECURE": "1",
+        }
+    )
+    assert pool.depth == 16
+    assert pool.refill_rate == 100
+    assert pool.secure
+
+
+def test_secure_shuffles_are_kept_without_a_pool():
+    pool = create_deck_pool(
+        {"DECK_POOL_DEPTH": "0", "DECK_POOL_SECURE": "1"}
+    )
+    assert pool.secure and pool.depth == 0
+    game = Pontoon(deck_provider=pool)
+    game.start_game()
+    assert (pool.hits, pool.misses, len(pool)) == (0, 1, 0)
+    assert pool._thread is None
@@ -0,0 +1,227 @@
+import os
+import uuid
+
+from src.events import (
+    HIT,
+    STICK,
+    EventLog,
+    apply_events,
+    archived_logs,
+    create_event_log,
+    encode_event,
+    game_id,
+    read_events,
+    read_snapshot,
+    recover,
+    replay,
+    write_snapshot,
+)
+from src.pontoon_logic import Pontoon
+
+
+def play(log, games, count, seed):
+    for index in range(count):
+        key = str(uuid.uuid4())
+        game = Pontoon()
+        game.start_game(seed=None if index % 2 else seed + index)
+        log.start(key, game)
+        if index % 3:
+            game.player_hit()
+            log.append(key, HIT)
+        if not game.game_over:
+            game.player_stick()
+            log.append(key, STICK)
+        games[key] = game
+
+
+def states(games):
+    return {
+        key: (
+            game.player_hand,
+            game.dealer_hand,
+            game.deck.to_bytes(),
+            game.game_over,
+            game.player_stuck,
+        )
+        for key, game in games.items()
+    }
+
+
+def by_id(games):
+    return {game_id(raw_id): game for raw_id, game in games.items()}
+
+
+def test_replay_rebuilds_every_game(tmp_path):
+    path = tmp_path / "games.log"
+    log = EventLog(path, fsync=False)
+    games = {}
+    play(log, games, 50, seed=1)
+    log.close()
+    replayed, offset = replay(path)
+    assert states(by_id(replayed)) == states(games)
+    assert offset == path.stat().st_size
+
+
+def test_half_written_record_is_ignored(tmp_path):
+    key = str(uuid.uuid4())
+    data = encode_event(key, HIT) + encode_event(key, STICK)[:-3]
+    assert [kind for _, kind, _ in read_events(data)] == [HIT]
+
+
+def test_snapshot_then_tail(tmp_path):
+    path = tmp_path / "games.log"
+    snapshot = tmp_path / "games.snapshot"
+    log = EventLog(path, fsync=False)
+    games = {}
+    play(log, games, 20, seed=2)
+    log.flush()
+    replayed, offset = replay(path)
+    write_snapshot(snapshot, replayed, offset)
+    play(log, games, 20, seed=3)
+    log.close()
+    replayed, _ = replay(path, snapshot)
+    assert states(by_id(replayed)) == states(games)
+
+
+def test_recover_truncates_a_torn_tail(tmp_path):
+    path = tmp_path / "games.log"
+    log = EventLog(path, fsync=False)
+    games = {}
+    play(log, games, 5, seed=4)
+    log.close()
+    size = path.stat().st_size
+    with open(path, "ab") as file:
+        file.write(encode_event(str(uuid.uuid4()), HIT)[:10])
+    recovered = recover(path, tmp_path / "games.snapshot")
+    assert states(recovered) == states(games)
+    assert archived_logs(path) == [f"{path}-000001"]
+    assert os.path.getsize(f"{path}-000001") == size
+    assert not path.exists()
+
+    # The games recovered were all over, so were not snapshotted
+    log = EventLog(path, fsync=False)
+    games = {}
+    play(log, games, 5, seed=5)
+    log.close()
+    recovered = recover(path, tmp_path / "games.snapshot")
+    assert states(recovered) == states(games)
+
+
+def unfinished(log, games, count):
+    for _ in range(count):
+        key = str(uuid.uuid4())
+        game = Pontoon()
+        game.start_game()
+        log.start(key, game)
+        games[key] = game
+
+
+def test_snapshot_keeps_only_games_in_play(tmp_path):
+    path = tmp_path / "games.log"
+    snapshot = tmp_path / "games.log.snapshot"
+    games, evicted = {}, {}
+    log = EventLog(
+        path, fsync=False, keep=lambda key: key not in evicted
+    )
+    play(log, {}, 10, seed=7)
+    unfinished(log, games, 5)
+    unfinished(log, evicted, 3)
+    log.snapshot()
+    assert log.snapshots == 1
+    assert path.stat().st_size == 0
+    assert os.path.getsize(f"{path}-000001") > 0
+    snapshotted, offset = read_snapshot(snapshot)
+    assert offset == 0
+    assert states(by_id(snapshotted)) == states(games)
+
+    for key, game in games.items():
+        game.player_hit()
+        log.append(key, HIT)
+    log.close()
+    replayed, _ = replay(path, snapshot)
+    assert states(by_id(replayed)) == states(games)
+
+
+def test_log_is_rotated_as_it_grows(tmp_path):
+    path = tmp_path / "games.log"
+    log = EventLog(
+        path, flush_interval=0.01, fsync=False, snapshot_bytes=1000
+    )
+    games = {}
+    unfinished(log, games, 20)
+    for _ in range(100):
+        if log.snapshots:
+            break
+        log._stopped.wait(0.01)
+    log.close()
+    assert log.snapshots >= 1
+    replayed, _ = replay(path, log.snapshot_path)
+    assert states(by_id(replayed)) == states(games)
+
+
+def test_recover_finishes_a_rotation_cut_short(tmp_path):
+    path = tmp_path / "games.log"
+    snapshot = tmp_path / "games.log.snapshot"
+    log = EventLog(path, fsync=False)
+    games = {}
+    unfinished(log, games, 5)
+    log.close()
+    replayed, _ = replay(path)
+    # As if the process died between rotate's renames
+    write_snapshot(f"{snapshot}.tmp", replayed, 0)
+    os.rename(path, f"{path}-000001")
+    assert states(recover(path, snapshot)) == states(games)
+    assert not os.path.exists(f"{snapshot}.tmp")
+
+
+def test_events_are_written_in_groups(tmp_path):
+    path = tmp_path / "games.log"
+    log = EventLog(path, flush_interval=60)
+    play(log, {}, 10, seed=6)
+    assert path.stat().st_size == 0
+    log.flush()
+    assert log.syncs == 1
+    assert path.stat().st_size > 0
+    log.close()
+
+
+def test_create_event_log(tmp_path):
+    assert create_event_log({}) is None
+    log = create_event_log(
+        {
+            "EVENT_LOG": str(tmp_path / "a.log"),
+            "EVENT_LOG_FSYNC": "0",
+        }
+    )
+    assert not log.fsync
+    assert log.snapshot_path == str(tmp_path / "a.log.snapshot")
+    assert log.snapshot_interval == 300
+    log.close()
+    log = create_event_log(
+        {
+            "EVENT_LOG": str(tmp_path / "b.log"),
+            "EVENT_LOG_SNAPSHOT_INTERVAL": "5",
+            "EVENT_LOG_SNAPSHOT_BYTES": "4096",
+        }
+    )
+    assert (log.snapshot_interval, log.snapshot_bytes) == (5, 4096)
+    log.close()
+
+
+def test_rotations_keep_every_archived_log(tmp_path):
+    path = tmp_path / "games.log"
+    log = EventLog(path, fsync=False)
+    games = {}
+    for seed in range(3):
+        play(log, games, 5, seed=seed)
+        log.snapshot()
+    log.snapshot()
+    log.close()
+    assert archived_logs(path) == [
+        f"{path}-{number:06d}" for number in (1, 2, 3)
+    ]
+    replayed = {}
+    for archive in archived_logs(path):
+        with open(archive, "rb") as file:
+            apply_events(replayed, read_events(file.read()))
+    assert states(by_id(replayed)) == states(games)
@@ -0,0 +1,220 @@
+import os
+import random
+
+import orjson
+from fastapi.testclient import TestClient
+
+import src.pontoon as pontoon
+from src.events import HIT, STICK, EventLog
+from src.export import (
+    MAGIC,
+    batches,
+    binary_chunks,
+    finished_games,
+    logged_games,
+    main,
+    ndjson_chunks,
+    read_batches,
+)
+from src.pontoon_logic import Pontoon
+from src.sharding import new_id
+from src.store import MemoryGameStore
+
+
+def played_games(count, seed=7):
+    rng = random.Random(seed)
+    store = MemoryGameStore()
+    for _ in range(count):
+        game = Pontoon()
+        game.start_game(seed=rng.getrandbits(32))
+        while not game.game_over and rng.random() < 0.5:
+            game.player_hit()
+        if not game.game_over and rng.random() < 0.8:
+            game.player_stick()
+        store.put(new_id(), game)
+    return store
+
+
+def expected(game_id, game):
+    result = game.check_winner()
+    return {
+        "game_id": game_id,
+        "player_hand": [card.code for card in game.player_hand],
+        "dealer_hand": [card.code for card in game.dealer_hand],
+        "player_value": result["player_value"],
+        "dealer_value": result["dealer_value"],
+        "result": result["status"],
+        "started_at": game.started_at,
+        "finished_at": game.finished_at,
+    }
+
+
+def test_only_finished_games_are_exported():
+    store = played_games(50)
+    finished = list(finished_games(store))
+    assert 0 < len(finished) < 50
+    assert all(game.game_over for _, game in finished)
+
+
+def test_batches_hold_the_games_as_columns():
+    store = played_games(50)
+    games = list(finished_games(store))
+    parts = list(batches(games, rows=16))
+    assert [len(part) for part in parts[:-1]] == [16] * (
+        len(parts) - 1
+    )
+    records = [record for part in parts for record in part.records()]
+    assert records == [expected(*item) for item in games]
+    assert parts[0].player_cards.dtype.itemsize == 1
+
+
+def test_binary_export_round_trips():
+    store = played_games(100)
+    games = list(finished_games(store))
+    data = b"".join(binary_chunks(games, rows=32))
+    assert data.startswith(MAGIC)
+    records = [
+        record
+        for batch in read_batches(data)
+        for record in batch.records()
+    ]
+    assert records == [expected(*item) for item in games]
+
+
+def test_ndjson_export_has_a_line_per_game():
+    store = played_games(40)
+    games = list(finished_games(store))
+    lines = b"".join(ndjson_chunks(games, rows=8)).splitlines()
+    assert [orjson.loads(line) for line in lines] == [
+        expected(*item) for item in games
+    ]
+
+
+def test_export_endpoint_streams_finished_games():
+    client = TestClient(pontoon.app)
+    game_id = client.post("/start").json()["game_id"]
+    client.post("/stick", json={"game_id": game_id})
+    unfinished = client.post("/start").json()["game_id"]
+
+    response = client.get("/export")
+    assert response.headers["content-type"] == "application/x-ndjson"
+    exported = {
+        orjson.loads(line)["game_id"]
+        for line in response.content.splitlines()
+    }
+    assert game_id in exported and unfinished not in exported
+
+    response = client.get("/export", params={"format": "binary"})
+    ids = {
+        record["game_id"]
+        for batch in read_batches(response.content)
+        for record in batch.records()
+    }
+    assert ids == exported
+    assert client.get("/export?format=csv").status_code == 422
+
+
+def log_games(log, count, seed=3):
+    """Plays games into an event log, returning the finished ones"""
+    rng = random.Random(seed)
+    finished = {}
+    for _ in range(count):
+        game_id = new_id()
+        game = Pontoon()
+        game.start_game(seed=rng.getrandbits(32))
+        log.start(game_id, game)
+        if rng.random() < 0.5:
+            game.player_hit()
+            log.append(game_id, HIT)
+        if not game.game_over and rng.random() < 0.8:
+            game.player_stick()
+            log.append(game_id, STICK)
+        if game.game_over:
+            finished[game_id] = game
+    return finished
+
+
+def hands(games):
+    return {
+        game_id: (game.player_hand, game.dealer_hand)
+        for game_id, game in games
+    }
+
+
+def test_logged_games_replay_every_rotated_log(tmp_path):
+    path = tmp_path / "games.log"
+    log = EventLog(path, fsync=False)
+    finished = log_games(log, 30)
+    spanning = new_id()
+    game = Pontoon()
+    game.start_game(seed=1)
+    log.start(spanning, game)
+    log.snapshot()
+    finished.update(log_games(log, 30, seed=4))
+    log.snapshot()
+    game.player_stick()
+    log.append(spanning, STICK)
+    finished[spanning] = game
+    log.close()
+    files = {file: file.read_bytes() for file in tmp_path.iterdir()}
+
+    exported = list(logged_games(path))
+    assert hands(exported) == hands(finished.items())
+    assert len(exported) == len(finished)
+    assert {
+        file: file.read_bytes() for file in tmp_path.iterdir()
+    } == files
+
+
+def test_logged_games_give_up_on_abandoned_games(tmp_path):
+    path = tmp_path / "games.log"
+    log = EventLog(path, fsync=False)
+    abandoned = new_id()
+    game = Pontoon()
+    game.start_game()
+    log.start(abandoned, game)
+    later = Pontoon()
+    later.start_game()
+    later.started_at = game.started_at + 100
+    log.start(new_id(), later)
+    game.player_stick()
+    log.append(abandoned, STICK)
+    log.close()
+    assert [key for key, _ in logged_games(path)] == [abandoned]
+    assert list(logged_games(path, max_age=50)) == []
+
+
+def test_export_cli_reads_every_logged_game(tmp_path):
+    path = tmp_path / "games.log"
+    log = EventLog(path, fsync=False)
+    finished = log_games(log, 80)
+    log.close()
+    output = tmp_path / "games.bin"
+    main(
+        [str(output)],
+        {"EVENT_LOG": str(path), "GAME_STORE_MAX_GAMES": "20"},
+    )
+    ids = {
+        record["game_id"]
+        for batch in read_batches(output.read_bytes())
+        for record in batch.records()
+    }
+    assert len(finished) > 20
+    assert ids == set(finished)
+    assert sorted(os.listdir(tmp_path)) == ["games.bin", "games.log"]
+
+
+def test_export_endpoint_reads_the_event_log(tmp_path, monkeypatch):
+    log = EventLog(tmp_path / "games.log", fsync=False)
+    monkeypatch.setattr(pontoon, "event_log", log)
+    with TestClient(pontoon.app) as client:
+        game_id = client.post("/start").json()["game_id"]
+        client.post("/stick", json={"game_id": game_id})
+        pontoon.games.delete(game_id)
+        log.flush()
+        response = client.get("/export")
+    exported = [
+        orjson.loads(line)["game_id"]
+        for line in response.content.splitlines()
+    ]
+    assert exported == [game_id]
@@ -0,0 +1,95 @@
+import random
+
+import numpy as np
+import pytest
+from src.cards import Card, Deck
+from src.hand_value import (
+    Hand,
+    batch_hand_values,
+    hand_value,
+    ranks_array,
+)
+
+
+def rescan_value(hand):
+    value = 0
+    aces = 0
+    for card in hand:
+        rank = card.get_rank()
+        if rank == 1:
+            aces += 1
+            value += 11
+        elif rank > 10:
+            value += 10
+        else:
+            value += rank
+    while value > 21 and aces:
+        value -= 10
+        aces -= 1
+    return value
+
+
+@pytest.fixture
+def random_hands():
+    rng = random.Random(7)
+    hands = []
+    for _ in range(500):
+        deck = Deck()
+        rng.shuffle(deck._cards)
+        hands.append([deck.pop() for _ in range(rng.randint(0, 8))])
+    return hands
+
+
+def test_hand_value_scores_aces_high_then_low():
+    assert hand_value([Card(1, 1), Card(10, 2)]) == 21
+    assert hand_value([Card(1, 1), Card(1, 2), Card(10, 3)]) == 12
+    assert hand_value([Card(13, 1), Card(12, 2), Card(5, 3)]) == 25
+    assert hand_value([]) == 0
+
+
+def test_hand_value_matches_rescan(random_hands):
+    for cards in random_hands:
+        assert hand_value(cards) == rescan_value(cards)
+        assert hand_value(Hand(cards)) == rescan_value(cards)
+
+
+def test_hand_keeps_totals_as_cards_are_added(random_hands):
+    for cards in random_hands:
+        hand = Hand()
+        for card in cards:
+            hand.append(card)
+            assert hand.value == rescan_value(hand)
+
+
+def test_hand_totals_follow_removal_and_replacement():
+    hand = Hand([Card(1, 1), Card(5, 2), Card(9, 3)])
+    assert hand.value == 15
+    hand.pop()
+    assert hand.value == 16 and hand.soft
+    hand.remove(Card(1, 1))
+    assert hand.value == 5 and not hand.soft
+    hand[0] = Card(1, 4)
+    assert hand.value == 11 and hand.soft
+    hand += [Card(10, 1)]
+    assert hand.value == 21
+    hand.clear()
+    assert hand.value == 0
+
+
+def test_hand_is_still_a_list():
+    hand = Hand([Card(4, 1)])
+    assert hand == [Card(4, 1)]
+    assert isinstance(hand, list)
+
+
+def test_batch_hand_values_matches_single_hands(random_hands):
+    values, soft = batch_hand_values(
+        ranks_array(random_hands), return_soft=True
+    )
+    assert values.tolist() == [rescan_value(h) for h in random_hands]
+    assert soft.tolist() == [Hand(h).soft for h in random_hands]
+
+
+def test_batch_hand_values_accepts_padded_rank_array():
+    ranks = np.array([[1, 10, 0, 0], [1, 1, 10, 0], [10, 10, 5, 0]])
+    assert batch_hand_values(ranks).tolist() == [21, 12, 25]
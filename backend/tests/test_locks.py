@@ -0,0 +1,54 @@
+import asyncio
+
+from src.locks import GameLocks
+
+
+def test_actions_on_one_game_are_serialised():
+    locks = GameLocks()
+    events = []
+
+    async def action(name):
+        async with locks("game"):
+            events.append(f"{name} start")
+            await asyncio.sleep(0.01)
+            events.append(f"{name} end")
+
+    async def main():
+        await asyncio.gather(action("a"), action("b"))
+
+    asyncio.run(main())
+    assert events == ["a start", "a end", "b start", "b end"]
+
+
+def test_different_games_do_not_wait_for_each_other():
+    locks = GameLocks()
+    events = []
+
+    async def action(game_id):
+        async with locks(game_id):
+            events.append(f"{game_id} start")
+            await asyncio.sleep(0.01)
+            events.append(f"{game_id} end")
+
+    async def main():
+        await asyncio.gather(action("a"), action("b"))
+
+    asyncio.run(main())
+    assert events[:2] == ["a start", "b start"]
+
+
+def test_locks_are_dropped_when_released():
+    locks = GameLocks()
+
+    async def main():
+        async with locks("a"):
+            assert len(locks) == 1
+        assert len(locks) == 0
+        try:
+            async with locks("b"):
+                raise KeyError
+        except KeyError:
+            pass
+        assert len(locks) == 0
+
+    asyncio.run(main())
@@ -0,0 +1,170 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src import metrics, serialization
+from src.admission import LiveGames
+from src.cards import Deck
+from src.pontoon_logic import Pontoon
+from src.store import MemoryGameStore
+
+
+def test_enabled():
+    assert not metrics.enabled({})
+    assert not metrics.enabled({"METRICS": "0"})
+    assert metrics.enabled({"METRICS": "1"})
+
+
+def test_histogram_counts_into_cumulative_buckets():
+    histogram = metrics.Histogram(
+        "test_seconds", "Test", label="path", buckets=(0.1, 1.0)
+    )
+    histogram.observe(0.05, "a")
+    histogram.observe(0.1, "a")
+    histogram.observe(0.5, "a")
+    histogram.observe(5, "a")
+    histogram.observe(0.5, "b")
+    samples = list(histogram.samples())
+    assert samples[:5] == [
+        ("test_seconds_bucket", (("path", "a"), ("le", "0.1")), 2),
+        ("test_seconds_bucket", (("path", "a"), ("le", "1.0")), 3),
+        ("test_seconds_bucket", (("path", "a"), ("le", "+Inf")), 4),
+        ("test_seconds_sum", (("path", "a"),), 5.65),
+        ("test_seconds_count", (("path", "a"),), 4),
+    ]
+    assert histogram.count("a") == 4
+    assert histogram.count("b") == 1
+    assert histogram.count("c") == 0
+
+
+def test_render_text_format():
+    registry = metrics.Registry()
+    histogram = registry.register(
+        metrics.Histogram("test_seconds", "Test", buckets=(1.0,))
+    )
+    counter = registry.register(
+        metrics.Counter("test_total", "Things", label="kind")
+    )
+    registry.register(
+        metrics.Gauge("test_games", "Games", lambda: 3)
+    )
+    histogram.observe(0.5)
+    counter.inc('say "hi"')
+    counter.inc('say "hi"', amount=2)
+    assert registry.render() == (
+        "# HELP test_seconds Test\n"
+        "# TYPE test_seconds histogram\n"
+        'test_seconds_bucket{le="1.0"} 1\n'
+        'test_seconds_bucket{le="+Inf"} 1\n'
+        "test_seconds_sum 0.5\n"
+        "test_seconds_count 1\n"
+        "# HELP test_total Things\n"
+        "# TYPE test_total counter\n"
+        'test_total{kind="say \\"hi\\""} 3\n'
+        "# HELP test_games Games\n"
+        "# TYPE test_games gauge\n"
+        "test_games 3\n"
+    )
+
+
+def test_register_returns_existing_metric():
+    registry = metrics.Registry()
+    first = registry.register(metrics.Counter("test_total", "A"))
+    second = registry.register(metrics.Counter("test_total", "B"))
+    assert second is first
+    assert registry.get("test_total") is first
+
+
+def test_store_gauges():
+    store = MemoryGameStore()
+    live = LiveGames()
+    for index in range(3):
+        game = Pontoon()
+        game.start_game(seed=index)
+        live.start(str(index))
+        if index == 0:
+            game.player_stick()
+            live.finish(str(index))
+        store.put(str(index), game)
+    registry = metrics.Registry()
+    metrics.register_store_gauges(store, live, registry)
+    games = dict(
+        (labels[0][1], value)
+        for _, labels, value in registry.get(
+            "pontoon_games"
+        ).samples()
+    )
+    assert games == {"finished": 1, "live": 2}
+    [(_, _, size)] = registry.get("pontoon_store_bytes").samples()
+    assert size > 3 * 100
+
+
+@pytest.fixture
+def hot_paths():
+    histogram = metrics.Histogram("test_seconds", "Test", "path")
+    yield histogram
+    metrics.uninstrument()
+
+
+def test_instrument_times_hot_paths(hot_paths):
+    original = Pontoon.player_hit
+    metrics.instrument(histogram=hot_paths)
+    metrics.instrument(histogram=hot_paths)
+    assert Pontoon.player_hit.__wrapped__ is original
+    game = Pontoon()
+    game.start_game(seed=1)
+    game.player_hit()
+    serialization.loads(serialization.dumps(game))
+    assert hot_paths.count("Pontoon.start_game") == 1
+    assert hot_paths.count("Pontoon.player_hit") == 1
+    assert hot_paths.count("Deck.__init__") >= 1
+    assert hot_paths.count("serialization.dumps") == 1
+    metrics.uninstrument()
+    assert Pontoon.player_hit is original
+    assert not hasattr(Deck.shuffle, "__wrapped__")
+
+
+def test_middleware_labels_by_route():
+    histogram = metrics.Histogram("test_seconds", "Test", "endpoint")
+    app = FastAPI()
+
+    @app.get("/items/{item}")
+    async def item(item: int):
+        return {"item": item}
+
+    app.add_middleware(
+        metrics.MetricsMiddleware, histogram=histogram
+    )
+    client = TestClient(app)
+    assert client.get("/items/1").status_code == 200
+    assert client.get("/items/2").status_code == 200
+    assert client.get("/missing").status_code == 404
+    assert histogram.count("/items/{item}") == 2
+    assert histogram.count("unmatched") == 1
+
+
+def test_merge_text_adds_up_samples():
+    first = (
+        "# HELP a_seconds A\n"
+        "# TYPE a_seconds histogram\n"
+        'a_seconds_bucket{le="+Inf"} 2\n'
+        "a_seconds_sum 0.5\n"
+    )
+    second = (
+        "# HELP b_total B\n"
+        "# TYPE b_total counter\n"
+        "b_total 4\n"
+        "# HELP a_seconds A\n"
+        "# TYPE a_seconds histogram\n"
+        'a_seconds_bucket{le="+Inf"} 1\n'
+        "a_seconds_sum 0.25\n"
+    )
+    assert metrics.merge_text([first, second]) == (
+        "# HELP a_seconds A\n"
+        "# TYPE a_seconds histogram\n"
+        'a_seconds_bucket{le="+Inf"} 3\n'
+        "a_seconds_sum 0.75\n"
+        "# HELP b_total B\n"
+        "# TYPE b_total counter\n"
+        "b_total 4\n"
+    )
@@ -1,4 +1,10 @@
+import asyncio
+import uuid
+
+import httpx
+import pytest
 from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
 from src.pontoon import app, games
 
 client = TestClient(app)
@@ -71,6 +77,31 @@ def test_state():
     assert "game_over" in data
 
 
+def test_state_etag():
+    game_id = client.post("/start").json()["game_id"]
+    first = client.get("/state", params={"game_id": game_id})
+    etag = first.headers["etag"]
+
+    unchanged = client.get(
+        "/state",
+        params={"game_id": game_id},
+        headers={"If-None-Match": etag},
+    )
+    assert unchanged.status_code == 304
+    assert unchanged.content == b""
+    assert unchanged.headers["etag"] == etag
+
+    client.post("/hit", json={"game_id": game_id})
+    changed = client.get(
+        "/state",
+        params={"game_id": game_id},
+        headers={"If-None-Match": etag},
+    )
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert len(changed.json()["player_hand"]) == 3
+
+
 def test_invalid_game_id():
     # Test with an invalid game_id
     invalid_game_id = "invalid_id"
@@ -89,3 +120,226 @@ def test_invalid_game_id():
     state_response = client.get(f"/state?game_id={invalid_game_id}")
     assert state_response.status_code == 404
     assert state_response.json()["detail"] == "Invalid game_id"
+
+
+def test_hint():
+    start_response = client.post("/start")
+    game_id = start_response.json()["game_id"]
+
+    hint_response = client.get(f"/hint?game_id={game_id}")
+    assert hint_response.status_code == 200
+    data = hint_response.json()
+    assert data["status"] == "success"
+    assert data["action"] in ["hit", "stick"]
+
+    client.post("/stick", json={"game_id": game_id})
+    hint_response = client.get(f"/hint?game_id={game_id}")
+    assert hint_response.json()["status"] == "error"
+
+    hint_response = client.get("/hint?game_id=invalid_id")
+    assert hint_response.status_code == 404
+
+
+def test_concurrent_hits_on_one_game_all_apply():
+    start_response = client.post("/start")
+    game_id = start_response.json()["game_id"]
+
+    async def hit_many():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as async_client:
+            requests = [
+                async_client.post("/hit", json={"game_id": game_id})
+                for _ in range(10)
+            ]
+            return await asyncio.gather(*requests)
+
+    responses = asyncio.run(hit_many())
+    statuses = [r.json()["result"]["status"] for r in responses]
+    hits = len(statuses) - statuses.count("error")
+    state = client.get(f"/state?game_id={game_id}").json()
+    assert len(state["player_hand"]) == 2 + hits
+
+
+def test_websocket_pushes_deltas():
+    game_id = client.post("/start").json()["game_id"]
+
+    with client.websocket_connect(f"/ws/{game_id}") as websocket:
+        first = websocket.receive_json()
+        assert first["t"] == "state"
+        assert len(first["p"]) == 2
+        assert len(first["d"]) == 1
+
+        websocket.send_json({"action": "hit"})
+        delta = websocket.receive_json()
+        assert delta["t"] == "delta"
+        assert len(delta["p"]) == 1
+
+        if not delta.get("go"):
+            websocket.send_json({"action": "stick"})
+            delta = websocket.receive_json()
+        assert delta["go"]
+        assert delta["o"] in ["win", "loss", "tie"]
+
+        websocket.send_json({"action": "hit"})
+        assert websocket.receive_json()["t"] == "error"
+
+        websocket.send_json({"action": "state"})
+        assert websocket.receive_json()["t"] == "state"
+
+    state = client.get(f"/state?game_id={game_id}").json()
+    assert state["game_over"]
+
+
+def test_websocket_sees_http_actions():
+    game_id = client.post("/start").json()["game_id"]
+
+    with client.websocket_connect(f"/ws/{game_id}") as websocket:
+        websocket.receive_json()
+        client.post("/hit", json={"game_id": game_id})
+        delta = websocket.receive_json()
+        assert len(delta["p"]) == 1
+
+
+def test_websocket_rejects_invalid_game_id():
+    with pytest.raises(WebSocketDisconnect) as error:
+        with client.websocket_connect("/ws/invalid_id") as websocket:
+            websocket.receive_json()
+    assert error.value.code == 4404
+
+
+def test_table_round():
+    response = client.post("/table/start", json={"seats": 2})
+    assert response.status_code == 200
+    data = response.json()
+    table_id = data["table_id"]
+    assert len(data["table_state"]["seats"]) == 2
+    assert data["table_state"]["turn"] == 0
+
+    response = client.post(
+        "/table/stick", json={"table_id": table_id, "seat": 1}
+    )
+    assert response.json()["result"]["status"] == "error"
+
+    response = client.post(
+        "/table/deal", json={"table_id": table_id}
+    )
+    assert response.json()["result"]["status"] == "error"
+
+    for seat in range(2):
+        response = client.post(
+            "/table/stick", json={"table_id": table_id, "seat": seat}
+        )
+    state = response.json()["table_state"]
+    assert state["game_over"]
+    assert len(state["results"]) == 2
+
+    response = client.post(
+        "/table/deal", json={"table_id": table_id}
+    )
+    assert response.json()["result"]["status"] == "success"
+    response = client.get(
+        "/table/state", params={"table_id": table_id}
+    )
+    assert not response.json()["game_over"]
+
+
+def test_invalid_table():
+    response = client.post("/table/start", json={"seats": 8})
+    assert response.status_code == 422
+    response = client.get("/table/state", params={"table_id": "x"})
+    assert response.status_code == 404
+
+
+def test_actions_are_logged(tmp_path, monkeypatch):
+    import src.pontoon as pontoon
+    from src import events
+
+    path = tmp_path / "games.log"
+    monkeypatch.setattr(pontoon, "event_log", events.EventLog(path))
+    with TestClient(app) as logged_client:
+        game_id = logged_client.post("/start").json()["game_id"]
+        logged_client.post("/hit", json={"game_id": game_id})
+    replayed, _ = events.replay(path)
+    game = replayed[uuid.UUID(game_id).bytes]
+    assert len(game.player_hand) == 3
+    assert games.get(game_id).player_hand == game.player_hand
+
+
+def test_batch_actions():
+    first = client.post("/start").json()["game_id"]
+    second = client.post("/start").json()["game_id"]
+    response = client.post(
+        "/batch",
+        json={
+            "actions": [
+                {"game_id": first, "action": "hit"},
+                {"game_id": second, "action": "stick"},
+                {"game_id": first, "action": "state"},
+                {"game_id": second, "action": "stick"},
+                {"game_id": "nope", "action": "hit"},
+                {"game_id": first, "action": "fold"},
+            ]
+        },
+    )
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert len(results) == 6
+    assert results[0]["result"]["status"] in ("success", "busted")
+    assert len(results[0]["game_state"]["player_hand"]) == 3
+    assert results[2]["game_state"] == results[0]["game_state"]
+    assert results[1]["game_state"]["game_over"]
+    assert results[3] == {"error": "The game is over"}
+    assert results[4] == {"error": "Invalid game_id"}
+    assert results[5] == {"error": "Unknown action 'fold'"}
+    state = client.get("/state", params={"game_id": first}).json()
+    assert state == results[2]["game_state"]
+
+
+def test_batch_size_is_capped():
+    from src.pontoon import MAX_BATCH
+
+    items = [{"game_id": "x", "action": "state"}] * (MAX_BATCH + 1)
+    response = client.post("/batch", json={"actions": items})
+    assert response.status_code == 422
+
+
+def test_refused_hits_are_not_logged(tmp_path, monkeypatch):
+    import src.pontoon as pontoon
+    from src import events
+
+    path = tmp_path / "games.log"
+    monkeypatch.setattr(pontoon, "event_log", events.EventLog(path))
+    with TestClient(app) as logged_client:
+        game_id = logged_client.post("/start").json()["game_id"]
+        logged_client.post("/stick", json={"game_id": game_id})
+        logged_client.post("/hit", json={"game_id": game_id})
+        logged_client.post(
+            "/batch",
+            json={
+                "actions": [{"game_id": game_id, "action": "hit"}]
+            },
+        )
+    kinds = [kind for _, kind, _ in events.iter_events(path)]
+    assert kinds == [events.START, events.STICK]
+
+
+def test_event_log_snapshots_against_the_game_store(
+    tmp_path, monkeypatch
+):
+    import src.pontoon as pontoon
+    from src import events
+
+    path = tmp_path / "games.log"
+    log = events.EventLog(path, keep=pontoon.games.__contains__)
+    monkeypatch.setattr(pontoon, "event_log", log)
+    with TestClient(app) as logged_client:
+        kept = logged_client.post("/start").json()["game_id"]
+        evicted = logged_client.post("/start").json()["game_id"]
+        pontoon.games.delete(evicted)
+        log.snapshot()
+        assert log.snapshots == 1
+        assert path.stat().st_size == 0
+    snapshotted, _ = events.read_snapshot(log.snapshot_path)
+    assert set(map(events.game_id, snapshotted)) == {kept}
@@ -1,6 +1,9 @@
+import pickle
+
 import pytest
 from src.cards import Card
 from src.pontoon_logic import Pontoon
+from src.strategy import load_tables
 
 
 @pytest.fixture
@@ -181,3 +184,68 @@ def test_get_game_state(pontoon_game):
         pontoon_game.dealer_hand
     )
     assert game_state["game_over"]
+
+
+def test_get_hint(pontoon_game):
+    tables = load_tables()
+    pontoon_game.start_game()
+    pontoon_game.player_hand = [Card(10, 1), Card(10, 2)]
+    pontoon_game.dealer_hand = [Card(6, 1), Card(10, 3)]
+    hint = pontoon_game.get_hint(tables)
+    assert hint["status"] == "success"
+    assert hint["action"] == "stick"
+
+    pontoon_game.player_hand = [Card(2, 1), Card(3, 2)]
+    assert pontoon_game.get_hint(tables)["action"] == "hit"
+
+    pontoon_game.player_stuck = True
+    assert pontoon_game.get_hint(tables)["status"] == "error"
+
+
+def test_actions_change_the_version(pontoon_game):
+    versions = [pontoon_game.version]
+    pontoon_game.start_game(seed=4)
+    versions.append(pontoon_game.version)
+    pontoon_game.player_hit()
+    versions.append(pontoon_game.version)
+    if not pontoon_game.game_over:
+        pontoon_game.player_stick()
+        versions.append(pontoon_game.version)
+    assert versions == sorted(set(versions))
+
+
+def test_game_state_is_cached_until_the_state_changes(pontoon_game):
+    pontoon_game.start_game(seed=4)
+    renders = []
+
+    def render(game):
+        renders.append(game.version)
+        return object()
+
+    first = pontoon_game.cached_view("test", render)
+    assert pontoon_game.cached_view("test", render) is first
+    pontoon_game.player_hand = [Card(10, 1), Card(9, 2)]
+    second = pontoon_game.cached_view("test", render)
+    assert second is not first
+    pontoon_game.player_hand.append(Card(2, 3))
+    assert pontoon_game.cached_view("test", render) is not second
+    assert len(renders) == 3
+
+
+def test_game_state_follows_direct_changes(pontoon_game):
+    pontoon_game.start_game(seed=4)
+    pontoon_game.player_hand = [Card(10, 1), Card(9, 2)]
+    assert pontoon_game.get_game_state()["player_value"] == 19
+    pontoon_game.player_hand.append(Card(2, 3))
+    assert pontoon_game.get_game_state()["player_value"] == 21
+    pontoon_game.game_over = True
+    assert pontoon_game.get_game_state()["game_over"]
+
+
+def test_pickled_game_keeps_its_state(pontoon_game):
+    pontoon_game.start_game(seed=4)
+    pontoon_game.get_game_state()
+    copy = pickle.loads(pickle.dumps(pontoon_game))
+    assert copy.player_hand == pontoon_game.player_hand
+    assert copy.get_game_state() == pontoon_game.get_game_state()
+    assert copy._views[0] == pontoon_game._views[0]
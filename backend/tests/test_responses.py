@@ -0,0 +1,106 @@
+import orjson
+import pytest
+
+from src.cards import Card
+from src.hand_value import Hand
+from src.pontoon_logic import Pontoon
+from src.responses import (
+    CARD_JSON,
+    GameJSONResponse,
+    default,
+    etag_matches,
+    state_bytes,
+    state_etag,
+    state_fragment,
+)
+
+
+def card_dict(card):
+    return {
+        "rank": card.rank,
+        "suit": card.suit,
+        "rank_char": card.get_rank_char(),
+        "suit_char": card.get_suit_char(),
+    }
+
+
+def expected_state(game):
+    state = game.get_game_state()
+    for hand in ("player_hand", "dealer_hand"):
+        state[hand] = [
+            card_dict(card) if isinstance(card, Card) else card
+            for card in state[hand]
+        ]
+    return state
+
+
+def make_game():
+    game = Pontoon()
+    game.start_game(seed=3)
+    game.player_hand = Hand([Card(1, 4), Card(13, 2)])
+    game.dealer_hand = Hand([Card(9, 1), Card(7, 3)])
+    return game
+
+
+def test_card_json_matches_card():
+    for code, data in enumerate(CARD_JSON):
+        assert orjson.loads(data) == card_dict(Card.from_code(code))
+
+
+def test_state_bytes_hides_the_dealers_second_card():
+    game = make_game()
+    document = orjson.loads(state_bytes(game))
+    assert document == expected_state(game)
+    assert document["dealer_hand"][1] == "Hidden"
+    assert document["dealer_value"] == "Hidden"
+
+
+def test_state_bytes_when_game_over():
+    game = make_game()
+    game.player_stick()
+    document = orjson.loads(state_bytes(game))
+    assert document == expected_state(game)
+    assert document["game_over"] is True
+
+
+def test_state_fragment_nests_in_a_response():
+    game = make_game()
+    response = GameJSONResponse(
+        {"result": "ok", "game_state": state_fragment(game)}
+    )
+    assert orjson.loads(response.body) == {
+        "result": "ok",
+        "game_state": expected_state(game),
+    }
+
+
+def test_cards_render_through_default():
+    response = GameJSONResponse({"card": Card(12, 3)})
+    assert orjson.loads(response.body) == {
+        "card": card_dict(Card(12, 3))
+    }
+    with pytest.raises(TypeError):
+        default(object())
+
+
+def test_bytes_are_sent_as_is():
+    response = GameJSONResponse(b'{"a":1}')
+    assert response.body == b'{"a":1}'
+    assert response.media_type == "application/json"
+
+
+def test_state_bytes_are_rendered_once_per_state():
+    game = make_game()
+    assert state_bytes(game) is state_bytes(game)
+    etag = state_etag(game)
+    game.player_hit()
+    assert state_etag(game) != etag
+    assert orjson.loads(state_bytes(game)) == expected_state(game)
+
+
+def test_etag_matches():
+    assert etag_matches('"a"', '"a"')
+    assert etag_matches('"b", W/"a"', '"a"')
+    assert etag_matches("*", '"a"')
+    assert not etag_matches('"b"', '"a"')
+    assert not etag_matches(None, '"a"')
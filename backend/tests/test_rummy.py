@@ -0,0 +1,144 @@
+import random
+from itertools import combinations
+
+import pytest
+
+from src.cards import Card, Deck
+from src.rummy import (
+    InvalidMoveException,
+    Rummy,
+    RummyHand,
+    arrange,
+    meldable,
+)
+
+
+def mask_of(cards):
+    return sum(1 << card.code for card in cards)
+
+
+def is_meld(cards):
+    if len(cards) < 3:
+        return False
+    if len({card.rank for card in cards}) == 1:
+        return len(cards) <= 4
+    if len({card.suit for card in cards}) != 1:
+        return False
+    ranks = sorted(card.rank for card in cards)
+    return ranks == list(range(ranks[0], ranks[0] + len(ranks)))
+
+
+def brute_force_deadwood(cards):
+    """Least deadwood by trying every way of pulling out melds"""
+    if not cards:
+        return 0
+    first, rest = cards[0], cards[1:]
+    best = min(first.rank, 10) + brute_force_deadwood(rest)
+    for size in range(2, len(rest) + 1):
+        for others in combinations(rest, size):
+            if is_meld((first,) + others):
+                left = tuple(c for c in rest if c not in others)
+                best = min(best, brute_force_deadwood(left))
+    return best
+
+
+def test_runs_and_sets_are_meldable():
+    cards = [Card(5, 1), Card(6, 1), Card(7, 1), Card(9, 2)]
+    cards += [Card(12, 2), Card(12, 3), Card(12, 4)]
+    assert meldable(mask_of(cards)) == mask_of(cards[:3] + cards[4:])
+
+
+def test_runs_do_not_wrap_between_suits():
+    cards = [Card(12, 1), Card(13, 1), Card(1, 2)]
+    assert meldable(mask_of(cards)) == 0
+
+
+def test_arrange_uses_overlapping_cards_once():
+    # 7♣ could join the set or the run; the run scores better
+    cards = [Card(7, 1), Card(7, 2), Card(7, 3)]
+    cards += [Card(8, 1), Card(9, 1), Card(13, 4)]
+    deadwood, melds = arrange(mask_of(cards))
+    assert deadwood == 10 + 7 + 7
+    assert melds == (mask_of([Card(7, 1), Card(8, 1), Card(9, 1)]),)
+
+
+@pytest.mark.parametrize("size", [7, 10])
+def test_arrange_matches_brute_force(size):
+    rng = random.Random(size)
+    # Draw from a few ranks so hands are dense with melds
+    pool = [
+        Card(rank, suit)
+        for rank in range(1, 7)
+        for suit in range(1, 5)
+    ]
+    for _ in range(40):
+        cards = tuple(rng.sample(pool, size))
+        assert arrange(mask_of(cards))[0] == brute_force_deadwood(
+            cards
+        )
+
+
+def test_hand_tracks_draws_and_discards():
+    rng = random.Random(3)
+    deck = Deck()
+    deck.shuffle(rng)
+    hand = RummyHand(deck.pop() for _ in range(10))
+    for _ in range(200):
+        hand.add(deck.pop())
+        assert hand.deadwood == arrange(hand.mask)[0]
+        card = rng.choice(list(hand))
+        hand.remove(card)
+        deck.appendleft(card)
+        assert hand.deadwood == arrange(hand.mask)[0]
+        melded = sum(len(meld) for meld in hand.melds)
+        assert melded + len(hand.deadwood_cards) == len(hand) == 10
+
+
+def test_hand_rejects_bad_cards():
+    hand = RummyHand([Card(1, 1)])
+    with pytest.raises(ValueError):
+        hand.add(Card(1, 1))
+    with pytest.raises(ValueError):
+        hand.add(Card(0, 1))
+    with pytest.raises(ValueError):
+        hand.remove(Card(2, 1))
+    assert Card(1, 1) in hand
+    assert Card(0, 1) not in hand
+
+
+def test_best_discard():
+    cards = [Card(2, 1), Card(3, 1), Card(4, 1), Card(13, 2)]
+    cards += [Card(9, 3)]
+    card, deadwood = RummyHand(cards).best_discard()
+    assert card == Card(13, 2)
+    assert deadwood == 9
+
+
+def test_game_turns():
+    game = Rummy(players=2, seed=1)
+    assert [len(hand) for hand in game.hands] == [10, 10]
+    assert len(game.stock) == 31
+    with pytest.raises(InvalidMoveException):
+        game.draw(1)
+    with pytest.raises(InvalidMoveException):
+        game.discard(0, next(iter(game.hands[0])))
+    top = game.discard_pile[-1]
+    assert game.draw(0, from_discard=True) == top
+    assert top in game.hands[0]
+    card, _ = game.hands[0].best_discard()
+    game.discard(0, card)
+    assert game.discard_pile[-1] == card
+    assert game.turn == 1
+
+
+def test_stock_is_rebuilt_from_discards():
+    game = Rummy(players=2, seed=2)
+    turns = 0
+    while game.winner is None and turns < 200:
+        player = game.turn
+        game.draw(player)
+        card, _ = game.hands[player].best_discard()
+        game.discard(player, card)
+        turns += 1
+    cards = sum(len(hand) for hand in game.hands)
+    assert cards + len(game.stock) + len(game.discard_pile) == 52
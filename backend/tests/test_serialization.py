@@ -0,0 +1,100 @@
+import random
+
+import pytest
+from src.cards import Card
+from src.hand_value import Hand
+from src.pontoon_logic import Pontoon
+from src.serialization import dumps, loads
+
+
+def play_randomly(rng, seeded):
+    game = Pontoon()
+    game.start_game(seed=rng.getrandbits(64) if seeded else None)
+    for _ in range(rng.randint(0, 4)):
+        action = rng.choice(["hit", "hit", "stick"])
+        if action == "hit":
+            game.player_hit()
+        elif not game.game_over:
+            game.player_stick()
+    return game
+
+
+def assert_same_game(decoded, game):
+    assert decoded.get_game_state() == game.get_game_state()
+    assert decoded.deck == game.deck
+    assert decoded.seed == game.seed
+    assert isinstance(decoded.player_hand, Hand)
+
+
+@pytest.mark.parametrize("seeded", [False, True])
+def test_fuzz_round_trip(seeded):
+    rng = random.Random(1234 + seeded)
+    for _ in range(2_000):
+        game = play_randomly(rng, seeded)
+        assert_same_game(loads(dumps(game)), game)
+
+
+def test_fresh_game_round_trips():
+    game = Pontoon()
+    decoded = loads(dumps(game))
+    assert decoded.deck == game.deck
+    assert decoded.player_hand == decoded.dealer_hand == []
+
+
+def test_seeded_games_store_the_seed_not_the_deck():
+    game = Pontoon()
+    game.start_game(seed=99)
+    assert len(dumps(game)) == 4 + 12 + 4 + 9
+
+    unseeded = Pontoon()
+    unseeded.start_game()
+    assert len(dumps(unseeded)) == 4 + 12 + 4 + 48
+
+
+def test_times_round_trip_to_the_millisecond():
+    game = Pontoon()
+    game.start_game(seed=3)
+    decoded = loads(dumps(game))
+    assert decoded.started_at == game.started_at
+    assert decoded.finished_at is None
+    game.player_stick()
+    decoded = loads(dumps(game))
+    assert decoded.finished_at == pytest.approx(
+        game.finished_at, abs=0.001
+    )
+    assert loads(dumps(Pontoon())).started_at is None
+
+
+def test_version_1_games_are_still_read():
+    game = Pontoon()
+    game.start_game(seed=3)
+    data = dumps(game)
+    old = bytes([1]) + data[1:4] + data[16:]
+    decoded = loads(old)
+    assert_same_game(decoded, game)
+    assert decoded.started_at is None
+
+
+def test_seeded_decks_are_repeatable():
+    first, second = Pontoon(), Pontoon()
+    first.start_game(seed=5)
+    second.start_game(seed=5)
+    assert first.deck == second.deck
+    assert first.player_hand == second.player_hand
+
+
+def test_hand_edits_survive_round_trip():
+    game = Pontoon()
+    game.start_game(seed=3)
+    game.player_hand = [Card(10, 1), Card(1, 3)]
+    game.player_stuck = True
+    decoded = loads(dumps(game))
+    assert decoded.player_hand == [Card(10, 1), Card(1, 3)]
+    assert decoded.player_stuck and not decoded.game_over
+
+
+def test_unknown_version_is_rejected():
+    data = bytearray(dumps(Pontoon()))
+    data[0] = 99
+    with pytest.raises(ValueError):
+        loads(bytes(data))
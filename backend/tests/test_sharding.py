@@ -0,0 +1,371 @@
+import asyncio
+import uuid
+
+import orjson
+import pytest
+from fastapi import FastAPI, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+
+import src.pontoon as pontoon
+from src.analytics import Outcomes
+from src.dispatcher import Dispatcher, request_id
+from src.metrics import Counter, Gauge, Registry
+from src.sharding import (
+    Shard,
+    ShardClient,
+    call_app,
+    create_shard,
+    new_id,
+    serve_app,
+    shard_of,
+)
+
+
+def test_shard_ids_carry_their_shard():
+    shard = Shard(5, 8)
+    game_id = shard.new_id()
+    assert str(uuid.UUID(game_id)) == game_id
+    assert shard_of(game_id) == 5
+    assert shard.owns(game_id)
+    assert not Shard(4, 8).owns(game_id)
+    assert len({shard.new_id() for _ in range(100)}) == 100
+
+
+def test_new_id_without_shard_is_a_uuid():
+    game_id = new_id()
+    assert str(uuid.UUID(game_id)) == game_id
+
+
+def test_shard_of_rejects_other_ids():
+    assert shard_of("not-a-uuid") is None
+    assert shard_of(None) is None
+
+
+def test_shard_bounds():
+    with pytest.raises(ValueError):
+        Shard(2, 2)
+    with pytest.raises(ValueError):
+        Shard(0, 257)
+
+
+def test_create_shard():
+    assert create_shard({}) is None
+    shard = create_shard({"SHARD": "1", "SHARDS": "3"})
+    assert (shard.index, shard.count) == (1, 3)
+
+
+def test_request_id():
+    assert request_id(b"game_id=abc", b"") == "abc"
+    assert (
+        request_id(b"", b'{"table_id": "xyz", "seat": 0}') == "xyz"
+    )
+    assert request_id(b"", b"not json") is None
+    assert request_id(b"", b"[1, 2]") is None
+
+
+class Item(BaseModel):
+    game_id: str
+
+
+class Batch(BaseModel):
+    actions: list[Item]
+
+
+def shard_app(index: int, count: int) -> FastAPI:
+    """An app answering with the shard that served each request"""
+    shard = Shard(index, count)
+    app = FastAPI()
+
+    @app.post("/start")
+    async def start():
+        return {"game_id": shard.new_id(), "shard": index}
+
+    @app.post("/hit")
+    async def hit(item: Item):
+        return {"owned": shard.owns(item.game_id), "shard": index}
+
+    @app.get("/state")
+    async def state(game_id: str):
+        return {"owned": shard.owns(game_id), "shard": index}
+
+    @app.get("/stats")
+    async def stats():
+        outcomes = Outcomes(clock=lambda: 6090.0)
+        for _ in range(index + 1):
+            outcomes.add(20, 18, "win", 6060.0)
+        outcomes.add(17, 19, "loss", 6000.0)
+        return {**outcomes.snapshot(), "pending": 0, "dropped": 0}
+
+    @app.get("/metrics")
+    async def metrics():
+        registry = Registry()
+        registry.register(
+            Counter("test_total", "Things", "shard")
+        ).inc(str(index))
+        registry.register(Gauge("test_games", "Games", lambda: 2))
+        return PlainTextResponse(registry.render())
+
+    @app.post("/batch")
+    async def batch(batch: Batch):
+        return {
+            "results": [
+                {"game_id": item.game_id, "shard": index}
+                for item in batch.actions
+            ]
+        }
+
+    return app
+
+
+def test_call_app():
+    app = shard_app(0, 1)
+    status, headers, body = asyncio.run(
+        call_app(app, "GET", "/state?game_id=x", b"")
+    )
+    assert status == 200
+    assert (b"content-type", b"application/json") in headers
+    assert orjson.loads(body) == {"owned": False, "shard": 0}
+
+
+def test_dispatcher_routes_by_shard(tmp_path):
+    count = 3
+    paths = [
+        str(tmp_path / f"{index}.sock") for index in range(count)
+    ]
+
+    async def main():
+        servers = [
+            asyncio.create_task(
+                serve_app(shard_app(index, count), path)
+            )
+            for index, path in enumerate(paths)
+        ]
+        dispatcher = Dispatcher(paths)
+        await dispatcher.connect()
+        client = dispatcher.clients
+
+        async def send(method, target, body=None):
+            body = b"" if body is None else orjson.dumps(body)
+            path, _, query = target.partition("?")
+            shard = dispatcher.shard(path, query.encode(), body)
+            status, _, content = await dispatcher.forward(
+                shard, method, target, body
+            )
+            assert status == 200
+            return orjson.loads(content)
+
+        try:
+            started = [
+                await send("POST", "/start") for _ in range(6)
+            ]
+            hits = [
+                await send(
+                    "POST", "/hit", {"game_id": game["game_id"]}
+                )
+                for game in started
+            ]
+            states = [
+                await send(
+                    "GET", f"/state?game_id={game['game_id']}"
+                )
+                for game in started
+            ]
+            actions = [
+                {"game_id": game["game_id"]} for game in started
+            ]
+            _, _, content = await dispatcher.batch(
+                "/batch", orjson.dumps({"actions": actions})
+            )
+            merged = orjson.loads(content)["results"]
+        finally:
+            await dispatcher.close()
+            for server in servers:
+                server.cancel()
+            await asyncio.gather(*servers, return_exceptions=True)
+        return client, started, hits, states, merged
+
+    client, started, hits, states, merged = asyncio.run(main())
+    assert len(client) == count
+    assert [game["shard"] for game in started] == [0, 1, 2, 0, 1, 2]
+    assert all(result["owned"] for result in hits + states)
+    assert [result["game_id"] for result in merged] == [
+        game["game_id"] for game in started
+    ]
+    assert [result["shard"] for result in merged] == [
+        0,
+        1,
+        2,
+        0,
+        1,
+        2,
+    ]
+
+
+def test_client_fails_requests_when_worker_goes(tmp_path):
+    path = str(tmp_path / "0.sock")
+
+    async def main():
+        server = asyncio.create_task(
+            serve_app(shard_app(0, 1), path)
+        )
+        client = ShardClient(path)
+        await client.connect()
+        status, _, _ = await client.request("POST", "/start")
+        server.cancel()
+        await asyncio.gather(server, return_exceptions=True)
+        await asyncio.sleep(0.05)
+        with pytest.raises(ConnectionError):
+            await client.request("POST", "/start")
+        await client.close()
+        return status
+
+    assert asyncio.run(main()) == 200
+
+
+@pytest.fixture
+def sharded(monkeypatch):
+    monkeypatch.setattr(pontoon, "shard", Shard(2, 4))
+
+
+def test_api_mints_ids_for_its_shard(sharded):
+    client = TestClient(pontoon.app)
+    game_id = client.post("/start").json()["game_id"]
+    assert shard_of(game_id) == 2
+    response = client.post("/hit", json={"game_id": game_id})
+    assert response.status_code == 200
+
+
+def test_api_refuses_other_shards_ids(sharded):
+    client = TestClient(pontoon.app)
+    response = client.post(
+        "/hit", json={"game_id": Shard(1, 4).new_id()}
+    )
+    assert response.status_code == 421
+
+
+def test_dispatcher_forwards_request_headers(tmp_path):
+    path = str(tmp_path / "0.sock")
+    preflight = [
+        (b"origin", b"http://localhost:5173"),
+        (b"access-control-request-method", b"POST"),
+    ]
+
+    async def main():
+        started = asyncio.Event()
+        server = asyncio.create_task(
+            serve_app(pontoon.app, path, started)
+        )
+        await started.wait()
+        dispatcher = Dispatcher([path])
+        await dispatcher.connect()
+        try:
+            allowed = await call_app(
+                dispatcher, "OPTIONS", "/start", b"", preflight
+            )
+            _, _, content = await call_app(
+                dispatcher, "POST", "/start", b""
+            )
+            target = (
+                f"/state?game_id={orjson.loads(content)['game_id']}"
+            )
+            _, headers, _ = await call_app(
+                dispatcher, "GET", target, b""
+            )
+            etag = dict(headers)[b"etag"]
+            cached = await call_app(
+                dispatcher,
+                "GET",
+                target,
+                b"",
+                [(b"if-none-match", etag)],
+            )
+        finally:
+            await dispatcher.close()
+            server.cancel()
+            await asyncio.gather(server, return_exceptions=True)
+        return allowed, cached
+
+    allowed, cached = asyncio.run(main())
+    status, headers, _ = allowed
+    assert status == 200
+    assert b"access-control-allow-methods" in dict(headers)
+    assert cached[0] == 304
+
+
+def test_dispatcher_adds_up_every_shards_stats(tmp_path):
+    count = 3
+    paths = [
+        str(tmp_path / f"{index}.sock") for index in range(count)
+    ]
+
+    async def main():
+        servers = [
+            asyncio.create_task(
+                serve_app(shard_app(index, count), path)
+            )
+            for index, path in enumerate(paths)
+        ]
+        dispatcher = Dispatcher(paths)
+        await dispatcher.connect()
+        try:
+            return [
+                await call_app(dispatcher, "GET", path, b"")
+                for path in ("/stats", "/metrics")
+            ]
+        finally:
+            await dispatcher.close()
+            for server in servers:
+                server.cancel()
+            await asyncio.gather(*servers, return_exceptions=True)
+
+    (status, _, stats), (_, headers, text) = asyncio.run(main())
+    assert status == 200
+    stats = orjson.loads(stats)
+    assert stats["all_time"]["win"] == 1 + 2 + 3
+    assert stats["all_time"]["games"] == 6 + 3
+    assert [window["games"] for window in stats["windows"]] == [3, 6]
+    assert stats["player_values"][20] == 6
+    assert dict(headers)[b"content-type"].startswith(b"text/plain")
+    assert text.decode() == (
+        "# HELP test_total Things\n"
+        "# TYPE test_total counter\n"
+        'test_total{shard="0"} 1\n'
+        'test_total{shard="1"} 1\n'
+        'test_total{shard="2"} 1\n'
+        "# HELP test_games Games\n"
+        "# TYPE test_games gauge\n"
+        "test_games 6\n"
+    )
+
+
+def test_batch_refuses_other_shards_ids_per_item(sharded):
+    client = TestClient(pontoon.app)
+    game_id = client.post("/start").json()["game_id"]
+    other = Shard(1, 4).new_id()
+    response = client.post(
+        "/batch",
+        json={
+            "actions": [
+                {"game_id": other, "action": "hit"},
+                {"game_id": game_id, "action": "state"},
+            ]
+        },
+    )
+    assert response.status_code == 200
+    first, second = response.json()["results"]
+    assert first == {"error": "game_id is on another shard"}
+    assert "game_state" in second
+
+
+def test_socket_refuses_other_shards_ids(sharded):
+    client = TestClient(pontoon.app)
+    other = Shard(1, 4).new_id()
+    with pytest.raises(WebSocketDisconnect) as closed:
+        with client.websocket_connect(f"/ws/{other}") as socket:
+            socket.receive_json()
+    assert closed.value.code == 4421
+    assert asyncio.run(pontoon.apply_action(other, "hit")) == (
+        "game_id is on another shard"
+    )
@@ -0,0 +1,69 @@
+import random
+from collections import Counter
+
+import pytest
+
+from src.cards import Deck
+from src.pontoon_logic import Pontoon
+from src.shoe import Shoe
+
+
+def test_shoe_holds_every_deck():
+    shoe = Shoe(decks=6, rng=random.Random(1))
+    assert len(shoe) == 312
+    assert sorted(shoe.to_bytes()) == sorted(
+        Deck(repeats=6).to_bytes()
+    )
+    assert shoe.counts()[1:] == (24,) * 13
+
+
+def test_counts_follow_every_pop():
+    shoe = Shoe(decks=2, rng=random.Random(2))
+    dealt = Counter(shoe.pop().rank for _ in range(40))
+    left = Counter(card.rank for card in shoe)
+    for rank in range(1, 14):
+        assert shoe.remaining(rank) == 8 - dealt[rank] == left[rank]
+    assert shoe.probability(1) == pytest.approx(left[1] / len(shoe))
+
+
+def test_reshuffles_only_past_the_cut_card():
+    shoe = Shoe(decks=1, penetration=0.5, rng=random.Random(3))
+    assert shoe.cut == 26
+    for _ in range(25):
+        shoe.pop()
+    assert shoe.get() is shoe
+    assert shoe.shuffles == 1
+    shoe.pop()
+    assert shoe.needs_shuffle
+    shoe.get()
+    assert shoe.shuffles == 2
+    assert len(shoe) == 52
+    assert shoe.remaining(13) == 4
+
+
+def test_exhausted_shoe_reshuffles():
+    shoe = Shoe(decks=1, penetration=1, rng=random.Random(4))
+    for _ in range(53):
+        shoe.pop()
+    assert shoe.shuffles == 2
+    assert len(shoe) == 51
+
+
+def test_invalid_penetration():
+    with pytest.raises(ValueError):
+        Shoe(penetration=0)
+
+
+def test_tables_share_a_shoe_across_rounds():
+    shoe = Shoe(decks=6, rng=random.Random(5))
+    tables = [Pontoon(deck_provider=shoe) for _ in range(3)]
+    dealt = 0
+    for _ in range(10):
+        for table in tables:
+            table.start_game()
+            assert table.deck is shoe
+        for table in tables:
+            table.player_stick()
+            dealt += len(table.player_hand) + len(table.dealer_hand)
+    assert shoe.shuffles == 1
+    assert len(shoe) == 312 - dealt
@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+from src.cards import Card
+from src.pontoon_logic import Pontoon
+from src.simulation import StandOn, play_rounds, settle, simulate
+
+
+def pontoon_rounds(n, stand_on):
+    game = Pontoon()
+    counts = {"win": 0, "loss": 0, "tie": 0}
+    for _ in range(n):
+        game.start_game()
+        while (
+            not game.game_over
+            and game.get_hand_value(game.player_hand) < stand_on
+        ):
+            game.player_hit()
+        if game.game_over:
+            counts["loss"] += 1
+        else:
+            counts[game.player_stick()["status"]] += 1
+    return counts
+
+
+def test_results_are_reproducible_for_a_seed():
+    first = simulate(50_000, workers=1, seed=3, chunk_size=10_000)
+    second = simulate(50_000, workers=1, seed=3, chunk_size=10_000)
+    assert (first.wins, first.losses, first.ties) == (
+        second.wins,
+        second.losses,
+        second.ties,
+    )
+
+
+def test_results_do_not_depend_on_worker_count():
+    single = simulate(40_000, workers=1, seed=5, chunk_size=10_000)
+    pooled = simulate(40_000, workers=2, seed=5, chunk_size=10_000)
+    assert (single.wins, single.losses, single.ties) == (
+        pooled.wins,
+        pooled.losses,
+        pooled.ties,
+    )
+
+
+def test_counts_add_up_and_rates_are_reported():
+    result = simulate(25_000, workers=1, seed=1, chunk_size=7_000)
+    assert result.rounds == 25_000
+    assert result.wins + result.losses + result.ties == 25_000
+    assert result.win_rate + result.loss_rate + result.tie_rate == (
+        pytest.approx(1.0)
+    )
+    assert result.rounds_per_second > 0
+
+
+def test_stand_on_zero_never_draws():
+    totals = play_rounds(5_000, StandOn(0), np.random.default_rng(0))
+    assert totals[:, 0].min() >= 2
+    assert totals[:, 0].max() <= 21
+    assert (totals[:, 1] >= 17).all()
+
+
+def test_dealer_does_not_draw_when_player_busts():
+    totals = play_rounds(
+        5_000, StandOn(22), np.random.default_rng(0)
+    )
+    assert (totals[:, 0] > 21).all()
+    assert (totals[:, 1] <= 21).all()
+
+
+def test_settle_follows_check_winner():
+    game = Pontoon()
+    hands = {
+        4: [Card(4, 1)],
+        15: [Card(10, 1), Card(5, 1)],
+        20: [Card(10, 1), Card(10, 2)],
+        21: [Card(1, 1), Card(10, 3)],
+        25: [Card(10, 1), Card(10, 2), Card(5, 3)],
+    }
+    for player in hands:
+        for dealer in hands:
+            game.player_hand = hands[player]
+            game.dealer_hand = hands[dealer]
+            expected = game.check_winner()["status"]
+            result = settle(np.array([[player, dealer]]))
+            status = {
+                (1, 0, 0): "win",
+                (0, 1, 0): "loss",
+                (0, 0, 1): "tie",
+            }[(result.wins, result.losses, result.ties)]
+            assert status == expected
+
+
+def test_rates_match_the_pontoon_class():
+    n = 20_000
+    expected = pontoon_rounds(n, stand_on=15)
+    result = simulate(200_000, StandOn(15), workers=1, seed=11)
+    assert result.win_rate == pytest.approx(
+        expected["win"] / n, abs=0.015
+    )
+    assert result.tie_rate == pytest.approx(
+        expected["tie"] / n, abs=0.015
+    )
@@ -0,0 +1,236 @@
+import pytest
+from src.pontoon_logic import Pontoon
+from src.store import (
+    MemoryGameStore,
+    SQLGameStore,
+    WriteBehindStore,
+    _database_url,
+    create_store,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class CountingStore(MemoryGameStore):
+    def __init__(self):
+        super().__init__(ttl=None)
+        self.batches = []
+
+    def put_many(self, items):
+        items = list(items)
+        self.batches.append([game_id for game_id, _ in items])
+        super().put_many(items)
+
+
+def new_game():
+    game = Pontoon()
+    game.start_game()
+    return game
+
+
+@pytest.fixture
+def sql_store(tmp_path):
+    store = SQLGameStore(f"sqlite:///{tmp_path / 'games.db'}")
+    yield store
+    store.close()
+
+
+class TestMemoryGameStore:
+    def test_put_and_get(self):
+        store = MemoryGameStore()
+        game = new_game()
+        store.put("a", game)
+        assert store.get("a") is game
+        assert "a" in store
+        assert store.get("b") is None
+        assert len(store) == 1
+
+    def test_least_recently_used_game_is_evicted(self):
+        store = MemoryGameStore(max_games=2)
+        store.put("a", new_game())
+        store.put("b", new_game())
+        store.get("a")
+        store.put("c", new_game())
+        assert "a" in store and "c" in store
+        assert "b" not in store
+        assert len(store) == 2
+
+    def test_idle_games_expire(self):
+        clock = FakeClock()
+        store = MemoryGameStore(ttl=10, clock=clock)
+        store.put("a", new_game())
+        store.put("b", new_game())
+        clock.now = 6
+        store.get("b")
+        clock.now = 12
+        assert store.get("a") is None
+        assert store.get("b") is not None
+        assert len(store) == 1
+
+    def test_membership_does_not_count_as_a_use(self):
+        clock = FakeClock()
+        store = MemoryGameStore(ttl=10, clock=clock)
+        store.put("a", new_game())
+        clock.now = 6
+        assert "a" in store
+        clock.now = 12
+        assert "a" not in store
+        assert store.get("a") is None
+
+    def test_delete(self):
+        store = MemoryGameStore()
+        store.put("a", new_game())
+        store.delete("a")
+        store.delete("missing")
+        assert len(store) == 0
+
+    def test_items_walk_in_batches_skipping_removed_games(self):
+        store = MemoryGameStore()
+        for game_id in "abcde":
+            store.put(game_id, new_game())
+        walk = store.items(batch=2)
+        assert next(walk)[0] == "a"
+        store.delete("d")
+        store.put("f", new_game())
+        assert [game_id for game_id, _ in walk] == ["b", "c", "e"]
+
+
+class TestSQLGameStore:
+    def test_game_round_trips(self, sql_store):
+        game = new_game()
+        sql_store.put("a", game)
+        loaded = sql_store.get("a")
+        assert loaded.get_game_state() == game.get_game_state()
+        assert loaded.deck == game.deck
+        assert sql_store.get("missing") is None
+
+    def test_put_replaces_game(self, sql_store):
+        game = new_game()
+        sql_store.put("a", game)
+        game.player_stick()
+        sql_store.put("a", game)
+        assert sql_store.get("a").game_over
+        assert len(sql_store) == 1
+
+    def test_put_many_and_delete(self, sql_store):
+        sql_store.put_many((str(i), new_game()) for i in range(5))
+        assert len(sql_store) == 5
+        sql_store.delete("3")
+        assert "3" not in sql_store
+        assert len(sql_store) == 4
+
+    def test_items_stream_every_game(self, sql_store):
+        sql_store.put_many((str(i), new_game()) for i in range(5))
+        items = dict(sql_store.items(batch=2))
+        assert sorted(items) == ["0", "1", "2", "3", "4"]
+        assert all(
+            len(game.player_hand) == 2 for game in items.values()
+        )
+
+    def test_postgres_urls_use_psycopg_3(self):
+        assert _database_url("postgresql://u:p@db/x") == (
+            "postgresql+psycopg://u:p@db/x"
+        )
+
+
+class TestWriteBehindStore:
+    def test_writes_are_batched(self):
+        backend = CountingStore()
+        store = WriteBehindStore(backend, flush_interval=60)
+        game = new_game()
+        for _ in range(3):
+            store.put("a", game)
+        store.put("b", new_game())
+        assert backend.batches == []
+        store.flush()
+        assert backend.batches == [["a", "b"]]
+        store.close()
+
+    def test_batches_are_capped(self):
+        backend = CountingStore()
+        store = WriteBehindStore(
+            backend, flush_interval=60, max_batch=2
+        )
+        for i in range(5):
+            store.put(str(i), new_game())
+        store.close()
+        assert [len(batch) for batch in backend.batches] == [2, 2, 1]
+        assert len(backend) == 5
+
+    def test_reads_fall_through_to_backend(self, sql_store):
+        game = new_game()
+        sql_store.put("a", game)
+        store = WriteBehindStore(sql_store, flush_interval=60)
+        loaded = store.get("a")
+        assert loaded.get_game_state() == game.get_game_state()
+        assert store.get("a") is loaded
+        store.close()
+
+    def test_evicted_dirty_games_are_not_lost(self, sql_store):
+        store = WriteBehindStore(
+            sql_store, cache=MemoryGameStore(max_games=1)
+        )
+        first, second = new_game(), new_game()
+        store.put("a", first)
+        store.put("b", second)
+        assert store.get("a") is first
+        store.flush()
+        assert len(store) == 2
+        store.close()
+
+    def test_background_thread_flushes(self):
+        backend = CountingStore()
+        store = WriteBehindStore(backend, flush_interval=0.01)
+        store.put("a", new_game())
+        store._stopped.wait(0.2)
+        assert "a" in backend
+        store.close()
+
+    def test_background_thread_retries_failed_writes(self, caplog):
+        class FailingOnce(CountingStore):
+            def put_many(self, items):
+                if not self.batches:
+                    self.batches.append(None)
+                    raise ConnectionError("database went away")
+                super().put_many(items)
+
+        backend = FailingOnce()
+        store = WriteBehindStore(backend, flush_interval=0.01)
+        store.put("a", new_game())
+        for _ in range(100):
+            if "a" in backend:
+                break
+            store._stopped.wait(0.01)
+        assert "a" in backend
+        assert store._thread.is_alive()
+        assert "database went away" in caplog.text
+        store.put("b", new_game())
+        store._stopped.wait(0.2)
+        assert "b" in backend
+        store.close()
+
+
+def test_create_store_defaults_to_memory():
+    assert isinstance(create_store({}), MemoryGameStore)
+
+
+def test_create_store_sql(tmp_path):
+    store = create_store(
+        {
+            "GAME_STORE": "sql",
+            "DATABASE_URL": f"sqlite:///{tmp_path / 'games.db'}",
+        }
+    )
+    assert isinstance(store, WriteBehindStore)
+    store.close()
+
+
+def test_create_store_rejects_unknown_backend():
+    with pytest.raises(ValueError):
+        create_store({"GAME_STORE": "redis"})
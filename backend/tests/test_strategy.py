@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+from src.simulation import StandOn, simulate
+from src.strategy import (
+    FULL_DECK,
+    StrategyTables,
+    dealer_outcomes,
+    load_tables,
+)
+
+
+@pytest.fixture(scope="module")
+def tables():
+    return load_tables()
+
+
+def test_dealer_outcomes_are_a_distribution(tables):
+    assert tables.dealer.sum(axis=1) == pytest.approx(np.ones(10))
+
+
+def test_dealer_on_hard_17_stands():
+    outcomes = dealer_outcomes(17, False, FULL_DECK)
+    assert outcomes == (1.0, 0.0, 0.0, 0.0, 0.0, 0.0)
+
+
+def test_dealer_on_16_with_only_tens_left_busts():
+    tens_only = (0,) * 9 + (16,)
+    assert dealer_outcomes(16, False, tens_only)[-1] == 1.0
+
+
+def test_obvious_decisions(tables):
+    for upcard in range(1, 14):
+        assert tables.recommend(8, False, upcard) == "hit"
+        assert tables.recommend(20, False, upcard) == "stick"
+        assert tables.recommend(21, True, upcard) == "stick"
+        assert tables.recommend(13, True, upcard) == "hit"
+
+
+def test_face_cards_share_the_ten_column(tables):
+    for total in range(4, 22):
+        assert tables.recommend(
+            total, False, 10
+        ) == tables.recommend(total, False, 13)
+
+
+def test_sticking_on_21_against_a_six_has_positive_ev(tables):
+    hint = tables.hint(21, False, 6)
+    assert hint["action"] == "stick"
+    assert hint["stick_ev"] > hint["hit_ev"]
+    assert hint["stick_ev"] > 0
+
+
+def test_tables_round_trip_through_bytes(tables, tmp_path):
+    path = tmp_path / "tables.bin"
+    tables.save(path)
+    loaded = StrategyTables.load(path)
+    assert np.array_equal(loaded.stick, tables.stick)
+    assert np.array_equal(loaded.hit, tables.hit)
+    assert np.array_equal(loaded.dealer, tables.dealer)
+
+
+def test_bad_file_is_rejected():
+    with pytest.raises(ValueError):
+        StrategyTables.from_bytes(b"NOPE" + bytes(8))
+
+
+def test_saved_tables_match_a_fresh_build(tables):
+    built = StrategyTables.build(upcards=[9])
+    assert np.allclose(built.stick[9], tables.stick[9], atol=1e-6)
+    assert np.array_equal(built.should_hit[9], tables.should_hit[9])
+
+
+def test_table_strategy_beats_mimicking_the_dealer(tables):
+    optimal = simulate(200_000, tables, workers=1, seed=2)
+    mimic = simulate(200_000, StandOn(17), workers=1, seed=2)
+    assert optimal.wins - optimal.losses > mimic.wins - mimic.losses
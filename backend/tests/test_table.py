@@ -0,0 +1,91 @@
+import random
+
+import pytest
+
+from src.cards import Card
+from src.hand_value import Hand
+from src.shoe import Shoe
+from src.table import Table
+
+
+def make_table(seats=3):
+    table = Table(seats=seats, shoe=Shoe(rng=random.Random(1)))
+    table.start_round()
+    return table
+
+
+def test_deals_two_cards_to_every_seat_and_the_dealer():
+    table = make_table()
+    assert [len(hand) for hand in table.hands] == [2, 2, 2]
+    assert len(table.dealer_hand) == 2
+    assert len(table.shoe) == 312 - 8
+    assert table.turn == 0
+
+
+def test_invalid_seat_count():
+    with pytest.raises(ValueError):
+        Table(seats=8)
+
+
+def test_seats_act_in_turn():
+    table = make_table()
+    assert table.player_hit(1)["status"] == "error"
+    assert table.player_stick(0)["status"] == "success"
+    assert table.turn == 1
+    assert table.player_stick(0)["message"] == "Not your turn."
+
+
+def test_bust_passes_the_turn():
+    table = make_table()
+    table.hands[0] = Hand([Card(10, 1), Card(10, 2)])
+    while table.turn == 0:
+        result = table.player_hit(0)
+    assert result["status"] == "busted"
+    assert table.turn == 1
+
+
+def test_dealer_plays_once_and_settles_every_seat():
+    table = make_table()
+    table.hands = [
+        Hand([Card(10, 1), Card(9, 1)]),
+        Hand([Card(10, 2), Card(6, 2)]),
+        Hand([Card(1, 3), Card(13, 3)]),
+    ]
+    table.dealer_hand = Hand([Card(10, 4), Card(8, 4)])
+    for seat in range(3):
+        result = table.player_stick(seat)
+    assert table.game_over
+    assert table.turn is None
+    assert len(table.dealer_hand) == 2
+    statuses = [seat["status"] for seat in result["results"]]
+    assert statuses == ["win", "loss", "win"]
+    assert table.player_hit(0)["message"] == "The round is over."
+
+
+def test_dealer_does_not_play_when_every_seat_busts():
+    table = make_table(seats=1)
+    table.hands[0] = Hand([Card(10, 1), Card(10, 2), Card(5, 3)])
+    table.dealer_hand = Hand([Card(2, 4), Card(3, 4)])
+    table._next_turn()
+    assert len(table.dealer_hand) == 2
+    assert table.results[0]["status"] == "loss"
+
+
+def test_rounds_share_the_shoe():
+    table = make_table(seats=2)
+    shoe = table.shoe
+    table.player_stick(0)
+    table.player_stick(1)
+    left = len(shoe)
+    table.start_round()
+    assert table.shoe is shoe
+    assert len(shoe) == left - 6
+    assert not table.game_over
+
+
+def test_state_hides_the_dealers_second_card():
+    state = make_table().get_table_state()
+    assert state["dealer_hand"][1] == "Hidden"
+    assert state["dealer_value"] == "Hidden"
+    assert len(state["seats"]) == 3
+    assert state["results"] is None
@@ -0,0 +1,196 @@
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from src.cards import Card, Deck
+from src.trumps import (
+    FULL_SUIT,
+    InvalidMoveException,
+    Solver,
+    Trumps,
+    _bits,
+    beats,
+    bit_card,
+    card_bit,
+    choose_move,
+)
+
+
+def make_game(hands, trump=0, leader=0):
+    game = Trumps(seed=0)
+    game.hands = [[0] * 4 for _ in range(4)]
+    for player, cards in enumerate(hands):
+        for card in cards:
+            suit, bit = card_bit(card)
+            game.hands[player][suit] |= bit
+    game.played = [
+        FULL_SUIT & ~(a | b | c | d)
+        for a, b, c, d in zip(*game.hands)
+    ]
+    game.trump = trump
+    game.leader = leader
+    game.tricks = [13 - len(hands[0]), 0]
+    return game
+
+
+def test_card_bits_round_trip():
+    for card in Deck():
+        assert bit_card(*card_bit(card)) == card
+    assert card_bit(Card(1, 2)) == (1, 1 << 12)
+    with pytest.raises(ValueError):
+        card_bit(Card(0, 1))
+
+
+def test_deal():
+    game = Trumps(seed=1)
+    hands = [game.hand(player) for player in range(4)]
+    assert [len(hand) for hand in hands] == [13] * 4
+    assert len({card.code for hand in hands for card in hand}) == 52
+
+
+def test_must_follow_suit():
+    game = make_game(
+        [
+            [Card(2, 1), Card(9, 2)],
+            [Card(5, 1), Card(13, 3)],
+            [Card(3, 2), Card(4, 2)],
+            [Card(6, 3), Card(7, 4)],
+        ]
+    )
+    game.play(0, Card(2, 1))
+    assert game.legal_moves(1) == [Card(5, 1)]
+    with pytest.raises(InvalidMoveException):
+        game.play(1, Card(13, 3))
+    assert len(game.legal_moves(2)) == 2
+    with pytest.raises(InvalidMoveException):
+        game.play(3, Card(6, 3))
+
+
+def test_trick_winner_and_voids():
+    game = make_game(
+        [
+            [Card(10, 2)],
+            [Card(1, 2)],
+            [Card(2, 1)],
+            [Card(13, 2)],
+        ],
+        trump=0,
+    )
+    for player, card in enumerate(
+        [Card(10, 2), Card(1, 2), Card(2, 1)]
+    ):
+        assert game.play(player, card) is None
+    # The two of trumps beats the ace of the suit led
+    assert game.play(3, Card(13, 2)) == 2
+    assert game.tricks == [13, 0]
+    assert game.voids[2] == 1 << 1
+    assert game.game_over
+    with pytest.raises(InvalidMoveException):
+        game.play(2, Card(2, 1))
+
+
+def test_beats():
+    assert beats(1, 1 << 5, 1, 1 << 3, trump=0)
+    assert not beats(2, 1 << 12, 1, 1 << 0, trump=0)
+    assert beats(0, 1 << 0, 1, 1 << 12, trump=0)
+
+
+def brute_force(hands, trump, team, leader, played, led, win, depth):
+    if played == 4:
+        gain = int(win[0] % 2 == team)
+        if depth == 1 or not any(hands[win[0]]):
+            return gain
+        return gain + brute_force(
+            hands, trump, team, win[0], 0, None, None, depth - 1
+        )
+    player = (leader + played) % 4
+    hand = hands[player]
+    suits = [led] if led is not None and hand[led] else range(4)
+    values = []
+    for suit in suits:
+        for bit in _bits(hand[suit]):
+            new_win = win
+            if not played or beats(suit, bit, win[1], win[2], trump):
+                new_win = (player, suit, bit)
+            hand[suit] ^= bit
+            values.append(
+                brute_force(
+                    hands,
+                    trump,
+                    team,
+                    leader,
+                    played + 1,
+                    suit if led is None else led,
+                    new_win,
+                    depth,
+                )
+            )
+            hand[suit] ^= bit
+    return max(values) if player % 2 == team else min(values)
+
+
+def test_solver_matches_brute_force():
+    rng = random.Random(0)
+    for seed in range(60):
+        game = Trumps(seed=seed)
+        while sum(game.tricks) < 10:
+            player = game.turn
+            game.play(player, rng.choice(game.legal_moves(player)))
+        hands = [list(hand) for hand in game.hands]
+        expected = brute_force(
+            hands, game.trump, 0, game.leader, 0, None, None, 3
+        )
+        solver = Solver(hands, game.trump, 0)
+        assert solver.trick_value(game.leader, 3, -1, 4) == expected
+
+
+def test_equal_cards_are_searched_once():
+    hands = [[0b1110, 0, 0, 0], [1, 0, 0, 0], [0] * 4, [0] * 4]
+    solver = Solver(hands, 3, 0)
+    assert list(solver.moves(0, None)) == [(0, 0b10)]
+    hands[1][0] = 0b10000
+    assert list(solver.moves(0, None)) == [(0, 0b10)]
+    hands[0][0] = 0b100110
+    assert list(solver.moves(0, None)) == [(0, 0b10), (0, 0b100000)]
+
+
+def test_ai_plays_a_legal_card():
+    game = Trumps(seed=3)
+    while not game.game_over:
+        player = game.turn
+        result = choose_move(game, player, budget=0.005, seed=1)
+        assert result.card in game.legal_moves(player)
+        game.play(player, result.card)
+    assert sum(game.tricks) == 13
+
+
+def test_ai_takes_a_certain_trick():
+    game = make_game(
+        [
+            [Card(1, 2), Card(2, 3)],
+            [Card(3, 2), Card(4, 3)],
+            [Card(5, 2), Card(6, 3)],
+            [Card(7, 2), Card(8, 3)],
+        ],
+        trump=3,
+    )
+    result = choose_move(game, 0, budget=0.05, seed=2)
+    assert result.card == Card(1, 2)
+    assert result.samples > 0
+    assert result.nodes_per_second > 0
+
+
+def test_ai_out_of_turn():
+    with pytest.raises(InvalidMoveException):
+        choose_move(Trumps(seed=4), 1)
+
+
+def test_ai_on_a_process_pool():
+    game = Trumps(seed=5)
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        result = choose_move(
+            game, 0, budget=0.05, executor=executor, jobs=2, seed=3
+        )
+    assert result.card in game.legal_moves(0)
+    assert result.samples >= 2